@@ -0,0 +1,266 @@
+"""
+Admission control for voice sessions
+Caps how many voice agent processes a host runs based on process count, CPU
+and memory, and holds excess sessions in a bounded FIFO queue instead of
+forking until the machine thrashes
+
+With Redis, slots are counted in one sorted set per host, so every gateway
+worker on the host shares the same `max_agents` cap.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional
+
+import psutil
+
+from latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# How often queued sessions re-check capacity (CPU/memory change without events)
+POLL_INTERVAL = 0.1
+
+# CPU utilisation is averaged over at least this many seconds
+CPU_SAMPLE_INTERVAL = 1.0
+
+KEY_PREFIX = "admission:"
+
+# Seconds a running agent's shared slot survives without a heartbeat, so the
+# slots of a crashed worker are freed
+SLOT_LEASE = 60.0
+HEARTBEAT_INTERVAL = 15.0
+
+# Drop expired slots, then take one if the host is below capacity.
+# KEYS[1] = slot set, ARGV = now, expires_at, max_agents, session_id.
+# Returns {admitted, occupied slots}.
+RESERVE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local count = redis.call('ZCARD', KEYS[1])
+if redis.call('ZSCORE', KEYS[1], ARGV[4]) then
+    return {1, count}
+end
+if count >= tonumber(ARGV[3]) then
+    return {0, count}
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+return {1, count + 1}
+"""
+
+
+class AdmissionRejected(Exception):
+    """Raised when a session cannot be admitted"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Voice capacity exhausted ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Capacity-aware admission for sessions that will run a voice agent
+
+    A session is admitted when the number of running agents plus outstanding
+    reservations is below `max_agents` and CPU and memory are below their
+    thresholds. An admitted session holds a reservation until its agent process
+    starts (or for `reservation_ttl` seconds), so a burst cannot overshoot the
+    cap. Sessions arriving without capacity wait in a FIFO queue of at most
+    `queue_size` entries for up to `queue_timeout` seconds; otherwise they are
+    rejected with a retry hint.
+
+    Call `attach()` with a Redis client to share slots with the other gateway
+    workers on the host; CPU and memory are host-wide readings either way.
+    """
+
+    def __init__(self,
+                 running_sessions: Callable[[], Iterable[str]],
+                 max_agents: Optional[int] = None,
+                 max_cpu_percent: Optional[float] = None,
+                 max_memory_percent: Optional[float] = None,
+                 queue_size: Optional[int] = None,
+                 queue_timeout: Optional[float] = None,
+                 reservation_ttl: Optional[float] = None):
+        """
+        Args:
+            running_sessions: Callable returning the session IDs with a running agent
+            max_agents: Maximum concurrent agents (defaults to ADMISSION_MAX_AGENTS, then CPU count)
+            max_cpu_percent: Host CPU threshold (defaults to ADMISSION_MAX_CPU_PERCENT, then 85)
+            max_memory_percent: Host memory threshold (defaults to ADMISSION_MAX_MEMORY_PERCENT, then 85)
+            queue_size: Maximum waiting sessions (defaults to ADMISSION_QUEUE_SIZE, then 50)
+            queue_timeout: Seconds a session may wait (defaults to ADMISSION_QUEUE_TIMEOUT, then 15)
+            reservation_ttl: Seconds an admitted session holds its slot before its agent
+                starts (defaults to ADMISSION_RESERVATION_TTL, then 30)
+        """
+        self.running_sessions = running_sessions
+        self.max_agents = (max_agents if max_agents is not None
+                           else int(os.getenv("ADMISSION_MAX_AGENTS", psutil.cpu_count() or 1)))
+        self.max_cpu_percent = (max_cpu_percent if max_cpu_percent is not None
+                                else float(os.getenv("ADMISSION_MAX_CPU_PERCENT", 85)))
+        self.max_memory_percent = (max_memory_percent if max_memory_percent is not None
+                                   else float(os.getenv("ADMISSION_MAX_MEMORY_PERCENT", 85)))
+        self.queue_size = queue_size if queue_size is not None else int(os.getenv("ADMISSION_QUEUE_SIZE", 50))
+        self.queue_timeout = (queue_timeout if queue_timeout is not None
+                              else float(os.getenv("ADMISSION_QUEUE_TIMEOUT", 15)))
+        self.reservation_ttl = (reservation_ttl if reservation_ttl is not None
+                                else float(os.getenv("ADMISSION_RESERVATION_TTL", 30)))
+
+        self.admitted_total = 0
+        self.rejected_total: Dict[str, int] = {}
+        self.queue_wait = LatencyHistogram()
+        self._reservations: Dict[str, float] = {}
+        self._waiters: deque = deque()
+        self._cpu_percent = 0.0
+        self._cpu_sampled_at = 0.0
+        self._redis = None
+        self._key = f"{KEY_PREFIX}{socket.gethostname()}"
+        self._shared_slots = 0
+        self._heartbeat: Optional[asyncio.Task] = None
+        # Prime psutil's CPU counters; the first reading is always 0
+        psutil.cpu_percent(interval=None)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def attach(self, redis_client):
+        """Count slots in Redis, shared by every worker on this host, and keep this worker's leases alive"""
+        self._redis = redis_client
+        if redis_client and self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._renew_leases())
+
+    async def close(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def _renew_leases(self):
+        while True:
+            try:
+                expires_at = time.time() + SLOT_LEASE
+                running = list(self.running_sessions())
+                if running:
+                    await self._redis.zadd(self._key, {session_id: expires_at for session_id in running})
+                await self._redis.zremrangebyscore(self._key, "-inf", time.time())
+                self._shared_slots = await self._redis.zcard(self._key)
+            except Exception as e:
+                logger.warning(f"Failed to renew admission leases: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def occupied_slots(self) -> int:
+        """Running agents plus reservations that have not started an agent yet"""
+        if self._redis:
+            # Last count seen by this worker; admission itself checks Redis atomically
+            return self._shared_slots
+        self._expire_reservations()
+        running = set(self.running_sessions())
+        return len(running) + sum(1 for session_id in self._reservations if session_id not in running)
+
+    def cpu_percent(self) -> float:
+        now = time.monotonic()
+        if now - self._cpu_sampled_at >= CPU_SAMPLE_INTERVAL:
+            self._cpu_percent = psutil.cpu_percent(interval=None)
+            self._cpu_sampled_at = now
+        return self._cpu_percent
+
+    def load(self) -> Dict[str, float]:
+        """Current load figures used for admission decisions"""
+        return {
+            "agents": self.occupied_slots(),
+            "max_agents": self.max_agents,
+            "cpu_percent": self.cpu_percent(),
+            "memory_percent": psutil.virtual_memory().percent,
+            "queue_depth": self.queue_depth,
+        }
+
+    def _blocking_reason(self) -> Optional[str]:
+        if not self._redis and self.occupied_slots() >= self.max_agents:
+            return "agents"
+        if self.cpu_percent() >= self.max_cpu_percent:
+            return "cpu"
+        if psutil.virtual_memory().percent >= self.max_memory_percent:
+            return "memory"
+        return None
+
+    def _expire_reservations(self):
+        now = time.monotonic()
+        for session_id in [s for s, expires in self._reservations.items() if expires <= now]:
+            del self._reservations[session_id]
+
+    async def _reserve(self, session_id: str, hold_for: float) -> bool:
+        """Take a slot for the session for `hold_for` seconds if the host has capacity"""
+        if self._blocking_reason() is not None:
+            return False
+        if not self._redis:
+            self._reservations[session_id] = time.monotonic() + hold_for
+            return True
+        now = time.time()
+        admitted, self._shared_slots = await self._redis.eval(
+            RESERVE_SCRIPT, 1, self._key, now, now + hold_for, self.max_agents, session_id
+        )
+        return bool(admitted)
+
+    def _admit(self, waited: float) -> float:
+        self.admitted_total += 1
+        self.queue_wait.observe(waited)
+        return waited
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected_total[reason] = self.rejected_total.get(reason, 0) + 1
+        return AdmissionRejected(reason, retry_after=max(1, int(self.queue_timeout)))
+
+    async def is_admitted(self, session_id: str) -> bool:
+        if self._redis:
+            expires_at = await self._redis.zscore(self._key, session_id)
+            return expires_at is not None and expires_at > time.time()
+        self._expire_reservations()
+        return session_id in self._reservations
+
+    async def admit(self, session_id: str, hold_for: Optional[float] = None) -> float:
+        """
+        Reserve capacity for a session, waiting in the queue if necessary
+
+        Args:
+            session_id: Session taking the slot
+            hold_for: Seconds the slot is held unless released or claimed by a
+                running agent (defaults to reservation_ttl)
+
+        Returns:
+            Seconds spent queued
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        if hold_for is None:
+            hold_for = self.reservation_ttl
+        if not self._waiters and await self._reserve(session_id, hold_for):
+            return self._admit(0.0)
+
+        if len(self._waiters) >= self.queue_size:
+            raise self._reject("queue_full")
+
+        ticket = object()
+        self._waiters.append(ticket)
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        try:
+            while True:
+                # FIFO: only the head of the queue may take freed capacity
+                if self._waiters[0] is ticket and await self._reserve(session_id, hold_for):
+                    return self._admit(time.monotonic() - start)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._reject("queue_timeout")
+                await asyncio.sleep(min(POLL_INTERVAL, remaining))
+        finally:
+            self._waiters.remove(ticket)
+
+    async def release(self, session_id: str):
+        """Give back a session's slot (its agent stopped or it ended)"""
+        self._reservations.pop(session_id, None)
+        if self._redis:
+            await self._redis.zrem(self._key, session_id)
@@ -0,0 +1,246 @@
+"""
+Metadata filtering for knowledge base searches
+Parses filter expressions (category/type equality, tag containment, added_at
+range), keeps an in-memory inverted index over metadata values for fast
+candidate narrowing, and translates filters into ChromaDB `where` clauses.
+"""
+
+import bisect
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Metadata fields filterable by equality
+EQUALITY_FIELDS = ("category", "type")
+
+# Internal metadata keys written at ingestion so filters can be pushed down
+# into ChromaDB, which only stores scalar metadata values. User metadata keys
+# must not start with the reserved prefix.
+RESERVED_KEY_PREFIX = "__kb_"
+TAG_KEY_PREFIX = f"{RESERVED_KEY_PREFIX}tag:"
+ADDED_TS_KEY = f"{RESERVED_KEY_PREFIX}added_ts"
+
+
+def _as_tuple(value: Any) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(str(v) for v in value))
+    return (str(value),)
+
+
+def _parse_timestamp(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    """
+    Filter applied to a knowledge base search
+
+    `category` and `type` match any of the given values, `tags` requires every
+    given tag, and `added_after`/`added_before` bound the added_at timestamp.
+    """
+    category: Tuple[str, ...] = ()
+    type: Tuple[str, ...] = ()
+    tags: Tuple[str, ...] = ()
+    added_after: Optional[float] = None
+    added_before: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["SearchFilter"]:
+        """
+        Build a filter from a plain dict, e.g.
+        {"category": "products", "tags": ["trail"], "added_after": "2025-01-01"}
+
+        Returns:
+            SearchFilter, or None if the dict has no constraints
+        """
+        if not data:
+            return None
+        if isinstance(data, SearchFilter):
+            return data
+
+        unknown = set(data) - {"category", "type", "tags", "tag", "added_after", "added_before"}
+        if unknown:
+            raise ValueError(f"Unknown filter fields: {sorted(unknown)}")
+
+        search_filter = cls(
+            category=_as_tuple(data.get("category")),
+            type=_as_tuple(data.get("type")),
+            tags=_as_tuple(data.get("tags") or data.get("tag")),
+            added_after=_parse_timestamp(data.get("added_after")),
+            added_before=_parse_timestamp(data.get("added_before")),
+        )
+        return search_filter if not search_filter.is_empty else None
+
+    @property
+    def uses_internal_keys(self) -> bool:
+        """Whether to_chroma_where matches on keys only encode_metadata writes"""
+        return bool(self.tags) or self.added_after is not None or self.added_before is not None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.category or self.type or self.tags
+                    or self.added_after is not None or self.added_before is not None)
+
+    def to_chroma_where(self) -> Dict[str, Any]:
+        """Translate into a ChromaDB `where` clause over the stored metadata"""
+        clauses: List[Dict[str, Any]] = []
+        for field in EQUALITY_FIELDS:
+            values = getattr(self, field)
+            if len(values) == 1:
+                clauses.append({field: values[0]})
+            elif values:
+                clauses.append({field: {"$in": list(values)}})
+        for tag in self.tags:
+            clauses.append({f"{TAG_KEY_PREFIX}{tag}": True})
+        if self.added_after is not None:
+            clauses.append({ADDED_TS_KEY: {"$gte": self.added_after}})
+        if self.added_before is not None:
+            clauses.append({ADDED_TS_KEY: {"$lte": self.added_before}})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def encode_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Prepare metadata for storage
+
+    Adds a numeric added_at timestamp and one boolean key per tag, and stores
+    list values as comma-separated strings (ChromaDB only accepts scalars).
+
+    Raises:
+        ValueError: If a metadata key uses the reserved internal prefix
+    """
+    encoded: Dict[str, Any] = {}
+    for key, value in metadata.items():
+        if key.startswith(RESERVED_KEY_PREFIX):
+            raise ValueError(f"Metadata key {key!r} uses the reserved prefix {RESERVED_KEY_PREFIX!r}")
+        if isinstance(value, (list, tuple, set)):
+            encoded[key] = ",".join(str(v) for v in value)
+        elif value is not None:
+            encoded[key] = value
+    for tag in _as_tuple(metadata.get("tags")):
+        encoded[f"{TAG_KEY_PREFIX}{tag}"] = True
+    if "added_at" in metadata and ADDED_TS_KEY not in metadata:
+        encoded[ADDED_TS_KEY] = _parse_timestamp(metadata["added_at"])
+    return encoded
+
+
+def decode_metadata(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Inverse of encode_metadata: restore the tags list and hide internal keys
+
+    Documents stored before the internal keys existed keep comma-separated
+    tags as written; they are split the same way.
+    """
+    if not metadata:
+        return {}
+    decoded = {key: value for key, value in metadata.items() if not key.startswith(RESERVED_KEY_PREFIX)}
+    tags = [key[len(TAG_KEY_PREFIX):] for key in metadata if key.startswith(TAG_KEY_PREFIX)]
+    if tags:
+        decoded["tags"] = sorted(tags)
+    elif isinstance(decoded.get("tags"), str):
+        decoded["tags"] = sorted(tag.strip() for tag in decoded["tags"].split(",") if tag.strip())
+    return decoded
+
+
+class MetadataIndex:
+    """
+    Inverted index from metadata values to document IDs
+
+    Used to narrow a filtered search to its candidate documents before the
+    vector lookup (and to skip the lookup entirely when nothing matches).
+    Tags and added_at are read from the decoded metadata, so documents
+    stored without the internal keys match the same way; their IDs are kept
+    in `unencoded_ids` because a ChromaDB `where` clause cannot match them.
+    """
+
+    def __init__(self):
+        self.all_ids: Set[str] = set()
+        self.unencoded_ids: Set[str] = set()
+        self.by_field: Dict[str, Dict[str, Set[str]]] = {field: defaultdict(set) for field in EQUALITY_FIELDS}
+        self.by_tag: Dict[str, Set[str]] = defaultdict(set)
+        self.added: Dict[str, float] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._added_sorted: Optional[List[Tuple[float, str]]] = None
+
+    def __len__(self) -> int:
+        return len(self.all_ids)
+
+    def build(self, ids: Iterable[str], metadatas: Iterable[Dict[str, Any]]):
+        for doc_id, metadata in zip(ids, metadatas):
+            self.add(doc_id, metadata)
+
+    def add(self, doc_id: str, metadata: Optional[Dict[str, Any]]):
+        """Index a document's stored metadata"""
+        if ADDED_TS_KEY not in (metadata or {}):
+            self.unencoded_ids.add(doc_id)
+        metadata = decode_metadata(metadata)
+        self.all_ids.add(doc_id)
+        self._metadata[doc_id] = metadata
+        for field in EQUALITY_FIELDS:
+            value = metadata.get(field)
+            if value is not None:
+                self.by_field[field][str(value)].add(doc_id)
+        for tag in _as_tuple(metadata.get("tags")):
+            self.by_tag[tag].add(doc_id)
+        try:
+            added = _parse_timestamp(metadata.get("added_at"))
+        except ValueError:
+            added = None
+        if added is not None:
+            self.added[doc_id] = added
+            self._added_sorted = None
+
+    def remove(self, doc_id: str):
+        metadata = self._metadata.pop(doc_id, None)
+        if metadata is None:
+            return
+        self.all_ids.discard(doc_id)
+        self.unencoded_ids.discard(doc_id)
+        for field in EQUALITY_FIELDS:
+            value = metadata.get(field)
+            if value is not None:
+                self.by_field[field][str(value)].discard(doc_id)
+        for tag in _as_tuple(metadata.get("tags")):
+            self.by_tag[tag].discard(doc_id)
+        if self.added.pop(doc_id, None) is not None:
+            self._added_sorted = None
+
+    def candidates(self, search_filter: SearchFilter) -> Set[str]:
+        """IDs of documents matching the filter"""
+        sets: List[Set[str]] = []
+        for field in EQUALITY_FIELDS:
+            values = getattr(search_filter, field)
+            if values:
+                index = self.by_field[field]
+                sets.append(set().union(*(index.get(v, set()) for v in values)))
+        for tag in search_filter.tags:
+            sets.append(self.by_tag.get(tag, set()))
+        if search_filter.added_after is not None or search_filter.added_before is not None:
+            sets.append(self._added_range(search_filter.added_after, search_filter.added_before))
+
+        if not sets:
+            return set(self.all_ids)
+        # Intersect starting from the most selective set
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+            if not result:
+                break
+        return result
+
+    def _added_range(self, after: Optional[float], before: Optional[float]) -> Set[str]:
+        if self._added_sorted is None:
+            self._added_sorted = sorted((ts, doc_id) for doc_id, ts in self.added.items())
+        timestamps = self._added_sorted
+        lo = 0 if after is None else bisect.bisect_left(timestamps, (after, ""))
+        hi = len(timestamps) if before is None else bisect.bisect_right(timestamps, (before, "\uffff"))
+        return {doc_id for _, doc_id in timestamps[lo:hi]}
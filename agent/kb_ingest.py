@@ -0,0 +1,503 @@
+"""
+Streaming document readers for knowledge base ingestion
+Parses JSON arrays and newline-delimited JSON incrementally so a load never
+holds more than one read chunk plus the current batch in memory, and extracts
+chunked text from a directory of HTML, Markdown, JSON and plain text files
+in a process pool
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+logger = logging.getLogger("livekit.agents")
+
+# Characters read from the file per step
+READ_CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\r\n"
+
+# Corpus file types by extension
+CORPUS_FORMATS = {
+    ".html": "html", ".htm": "html",
+    ".md": "markdown", ".markdown": "markdown",
+    ".json": "json", ".ndjson": "json", ".jsonl": "json",
+    ".txt": "text", ".text": "text", ".rst": "text",
+}
+
+# Default chunking for extracted text (characters; ~4 characters per token)
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_CHUNK_OVERLAP = 200
+
+
+@dataclass
+class IngestStats:
+    """Progress of a streaming load"""
+    documents: int = 0
+    batches: int = 0
+    skipped: int = 0
+    files: int = 0
+    bytes: int = 0
+    resumed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def documents_per_second(self) -> float:
+        seconds = self.seconds
+        return self.documents / seconds if seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "documents": self.documents,
+            "batches": self.batches,
+            "skipped": self.skipped,
+            "files": self.files,
+            "bytes": self.bytes,
+            "resumed": self.resumed,
+            "seconds": round(self.seconds, 3),
+            "documents_per_second": round(self.documents_per_second, 1),
+        }
+
+
+def _iter_json_values(f: TextIO) -> Iterator[Any]:
+    """
+    Yield top-level values from a stream of JSON
+
+    Accepts either one JSON array (its elements are yielded) or a sequence
+    of whitespace-separated values such as NDJSON. In the latter, a line that
+    is not valid JSON is yielded as its json.JSONDecodeError and reading
+    resumes on the next line.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    in_array: Optional[bool] = None
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = f.read(READ_CHUNK_SIZE)
+        if not chunk:
+            eof = True
+            return False
+        # Drop everything already consumed so the buffer stays one value wide
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if eof or not fill():
+                break
+            continue
+
+        if in_array is None:
+            in_array = buffer[pos] == "["
+            if in_array:
+                pos += 1
+            continue
+        if in_array and buffer[pos] == ",":
+            pos += 1
+            continue
+        if in_array and buffer[pos] == "]":
+            break
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            newline = buffer.find("\n", e.pos)
+            if not in_array and (newline != -1 or eof):
+                # The whole line is in the buffer, so it is invalid rather than cut short
+                pos = newline + 1 if newline != -1 else len(buffer)
+                yield e
+                continue
+            # Most likely the value continues in the next chunk
+            if (eof or not fill()) and in_array:
+                raise
+            continue
+        if end == len(buffer) and not eof:
+            # A number or literal at the chunk edge may be cut short
+            if fill():
+                continue
+        pos = end
+        yield value
+
+    if in_array and (pos >= len(buffer) or buffer[pos] != "]"):
+        raise ValueError("Unterminated JSON array")
+
+
+def iter_documents(file_path: str, stats: Optional[IngestStats] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream documents from a JSON array or NDJSON file
+
+    Entries must be objects with a "content" string and optional "metadata";
+    anything else (including NDJSON lines that are not valid JSON) is logged,
+    counted in `stats.skipped` and skipped.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for index, value in enumerate(_iter_json_values(f)):
+            if isinstance(value, json.JSONDecodeError):
+                logger.warning(f"Skipping entry {index} in {file_path}: invalid JSON ({value.msg})")
+                if stats is not None:
+                    stats.skipped += 1
+                continue
+            if not isinstance(value, dict) or not isinstance(value.get("content"), str):
+                logger.warning(f"Skipping entry {index} in {file_path}: expected an object with 'content'")
+                if stats is not None:
+                    stats.skipped += 1
+                continue
+            yield value
+
+
+def batched(documents: Iterator[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group a document stream into lists of at most `batch_size`"""
+    batch: List[Dict[str, Any]] = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# -- Resumable loads -----------------------------------------------------------
+
+class IngestJournalError(Exception):
+    """The journal does not match the source file or the knowledge base"""
+
+
+def content_hash(content: str) -> str:
+    """Short content fingerprint recorded per document in the journal"""
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+
+class IngestJournal:
+    """
+    Append-only checkpoint journal for a streaming load
+
+    The first line records the source, batch size and the document ID prefix;
+    every later line records one batch written to the knowledge base (its
+    position in the source and the content hash of each document). A rerun
+    with the same journal skips the recorded documents, after checking their
+    hashes still match, and continues with the same IDs, so a partial load
+    is completed rather than duplicated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header: Dict[str, Any] = {}
+        self.batches: List[Dict[str, Any]] = []
+
+    @property
+    def id_prefix(self) -> str:
+        return self.header["id_prefix"]
+
+    @property
+    def batch_size(self) -> int:
+        return self.header["batch_size"]
+
+    @property
+    def completed_documents(self) -> int:
+        return sum(batch["count"] for batch in self.batches)
+
+    def start(self, source: str, batch_size: int, collection: str):
+        """Begin a new journal, replacing any previous one"""
+        self.header = {
+            "source": os.path.abspath(source),
+            "batch_size": batch_size,
+            "collection": collection,
+            "id_prefix": f"doc_{int(time.time() * 1e6)}",
+            "started_at": time.time(),
+        }
+        self.batches = []
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.header) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self, source: str, collection: str):
+        """
+        Read an existing journal for resuming
+
+        Raises:
+            IngestJournalError: If it is missing or belongs to another source or collection
+        """
+        if not os.path.exists(self.path):
+            raise IngestJournalError(f"No journal at {self.path}; run without --resume first")
+        with open(self.path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        self.header = json.loads(lines[0])
+        self.batches = []
+        for line in lines[1:]:
+            try:
+                self.batches.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-append: that batch is redone
+                logger.warning(f"Ignoring incomplete journal entry in {self.path}")
+                break
+
+        if self.header.get("source") != os.path.abspath(source):
+            raise IngestJournalError(f"Journal {self.path} was written for {self.header.get('source')}")
+        if self.header.get("collection") != collection:
+            raise IngestJournalError(
+                f"Journal {self.path} was written for collection {self.header.get('collection')}"
+            )
+        expected = 0
+        for batch in self.batches:
+            if batch["start"] != expected or batch["count"] != len(batch["hashes"]):
+                raise IngestJournalError(f"Journal {self.path} is inconsistent at batch {batch['batch']}")
+            expected += batch["count"]
+
+    def document_ids(self, start: int, count: int) -> List[str]:
+        """Deterministic IDs for source positions [start, start + count)"""
+        return [f"{self.id_prefix}_{index}" for index in range(start, start + count)]
+
+    def record(self, start: int, documents: List[Dict[str, Any]]):
+        """Append a written batch (after the knowledge base accepted it)"""
+        entry = {
+            "batch": len(self.batches),
+            "start": start,
+            "count": len(documents),
+            "hashes": [content_hash(doc.get("content", "")) for doc in documents],
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.batches.append(entry)
+
+    def skip_completed(self, documents: Iterable[Dict[str, Any]],
+                       stats: Optional[IngestStats] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Drop the documents already recorded, verifying their content hashes
+
+        Raises:
+            IngestJournalError: If the source changed since the journal was written
+        """
+        hashes = [h for batch in self.batches for h in batch["hashes"]]
+        iterator = iter(documents)
+        for position, expected in enumerate(hashes):
+            doc = next(iterator, None)
+            if doc is None:
+                raise IngestJournalError(
+                    f"Source ended after {position} documents but the journal records {len(hashes)}"
+                )
+            if content_hash(doc.get("content", "")) != expected:
+                raise IngestJournalError(f"Document {position} changed since it was loaded; start a fresh load")
+            if stats is not None:
+                stats.resumed += 1
+        yield from iterator
+
+
+# -- Directory corpora ---------------------------------------------------------
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collects visible text and the <title> of an HTML page"""
+
+    SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+    BLOCK_TAGS = {"p", "div", "section", "article", "li", "br", "tr", "h1", "h2", "h3",
+                  "h4", "h5", "h6", "header", "footer", "blockquote", "pre", "table"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self.parts.append(data)
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse runs of spaces within lines and of blank lines between paragraphs"""
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def extract_html(text: str):
+    """Return (title, visible text) of an HTML document"""
+    parser = _HTMLTextExtractor()
+    parser.feed(text)
+    parser.close()
+    return " ".join(parser.title.split()), _normalize_whitespace("".join(parser.parts))
+
+
+_MD_HEADING = re.compile(r"^#{1,6}\s+(.*?)\s*#*\s*$", re.MULTILINE)
+_MD_FENCE = re.compile(r"^```.*$", re.MULTILINE)
+_MD_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_MD_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_MD_EMPHASIS = re.compile(r"(\*\*|__|\*|`)")
+
+
+def extract_markdown(text: str):
+    """Return (first heading, text with Markdown syntax removed)"""
+    heading = _MD_HEADING.search(text)
+    text = _MD_FENCE.sub("", text)
+    text = _MD_HEADING.sub(r"\1", text)
+    text = _MD_IMAGE.sub(r"\1", text)
+    text = _MD_LINK.sub(r"\1", text)
+    text = _MD_EMPHASIS.sub("", text)
+    return (heading.group(1) if heading else ""), _normalize_whitespace(text)
+
+
+def chunk_text(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               overlap: int = DEFAULT_CHUNK_OVERLAP) -> List[str]:
+    """
+    Split text into chunks of at most `chunk_size` characters
+
+    Paragraphs are kept together where possible; consecutive chunks share up
+    to `overlap` trailing characters so context is not cut mid-thought.
+    """
+    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+    chunks: List[str] = []
+    current = ""
+    for paragraph in paragraphs:
+        # Hard-split paragraphs that alone exceed the chunk size
+        while len(paragraph) > chunk_size:
+            cut = paragraph.rfind(" ", 0, chunk_size)
+            cut = cut if cut > chunk_size // 2 else chunk_size
+            piece = paragraph[:cut].strip()
+            paragraph = paragraph[cut:].strip()
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(piece)
+        if current and len(current) + 2 + len(paragraph) > chunk_size:
+            chunks.append(current)
+            tail = current[-overlap:] if overlap else ""
+            # Start the overlap on a word boundary
+            tail = tail[tail.find(" ") + 1:] if " " in tail else tail
+            current = f"{tail}\n\n{paragraph}" if tail and len(tail) + 2 + len(paragraph) <= chunk_size else paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def extract_file(path: str, root: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 overlap: int = DEFAULT_CHUNK_OVERLAP) -> Dict[str, Any]:
+    """
+    Extract and chunk one corpus file (runs in a worker process)
+
+    Returns:
+        {"path", "bytes", "documents": [...], "error"} for the file
+    """
+    source = os.path.relpath(path, root)
+    result: Dict[str, Any] = {"path": source, "bytes": 0, "documents": [], "error": None}
+    file_format = CORPUS_FORMATS.get(os.path.splitext(path)[1].lower())
+    try:
+        result["bytes"] = os.path.getsize(path)
+        if file_format == "json":
+            # Already split into documents; keep them as they are
+            for doc in iter_documents(path):
+                metadata = dict(doc.get("metadata") or {})
+                metadata.setdefault("source", source)
+                result["documents"].append({"content": doc["content"], "metadata": metadata})
+            return result
+
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        if file_format == "html":
+            title, text = extract_html(text)
+        elif file_format == "markdown":
+            title, text = extract_markdown(text)
+        else:
+            title, text = "", _normalize_whitespace(text)
+        title = title or os.path.splitext(os.path.basename(path))[0]
+
+        chunks = chunk_text(text, chunk_size, overlap)
+        for index, chunk in enumerate(chunks):
+            result["documents"].append({
+                "content": chunk,
+                "metadata": {
+                    "title": title if len(chunks) == 1 else f"{title} ({index + 1}/{len(chunks)})",
+                    "source": source,
+                    "format": file_format,
+                    "chunk": index,
+                },
+            })
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def find_corpus_files(root: str) -> List[str]:
+    """Supported files under `root`, skipping hidden and dependency directories"""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames
+                             if not d.startswith(".") and d not in ("node_modules", "__pycache__"))
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in CORPUS_FORMATS:
+                paths.append(os.path.join(dirpath, filename))
+    return paths
+
+
+def iter_corpus(root: str, workers: Optional[int] = None, stats: Optional[IngestStats] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE,
+                overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[Dict[str, Any]]:
+    """
+    Stream chunked documents from every supported file under `root`
+
+    Files are extracted in a process pool; at most a few files per worker
+    are in flight, so a slow consumer (embedding) bounds memory. Documents
+    come out in file order.
+    """
+    paths = find_corpus_files(root)
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        next_path = 0
+        while pending or next_path < len(paths):
+            while next_path < len(paths) and len(pending) < window:
+                pending.append(pool.submit(extract_file, paths[next_path], root, chunk_size, overlap))
+                next_path += 1
+            result = pending.popleft().result()
+            if stats is not None:
+                stats.files += 1
+                stats.bytes += result["bytes"]
+            if result["error"]:
+                logger.warning(f"Skipping {result['path']}: {result['error']}")
+                if stats is not None:
+                    stats.skipped += 1
+                continue
+            yield from result["documents"]
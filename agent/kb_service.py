@@ -0,0 +1,210 @@
+"""
+Shared knowledge base retrieval service
+Lets agent processes query one KnowledgeBase hosted by the API gateway instead of
+each opening its own ChromaDB client and index
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from knowledge_base import KnowledgeBase, format_context
+from reranker import create_rerank_stage
+
+logger = logging.getLogger("livekit.agents")
+
+# Header carrying the shared secret on internal requests
+SERVICE_KEY_HEADER = "X-KB-Service-Key"
+
+
+class KnowledgeBaseClient:
+    """
+    Read-only KnowledgeBase stand-in backed by the gateway's retrieval service
+
+    Exposes the subset of the KnowledgeBase API used by the agent. A single
+    pooled HTTP session keeps the connection to the gateway alive across turns.
+    """
+
+    def __init__(self, base_url: str, service_key: Optional[str] = None, timeout: float = 2.0,
+                 tenant: Optional[str] = None):
+        """
+        Args:
+            base_url: Gateway base URL, e.g. http://127.0.0.1:8000
+            service_key: Shared secret sent in the service key header
+            timeout: Per-request timeout in seconds
+            tenant: Tenant whose collection is searched (None: the default one)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.tenant = tenant
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        if service_key:
+            self.session.headers[SERVICE_KEY_HEADER] = service_key
+        self.rerank_stage = create_rerank_stage()
+
+    def search(self, query: str, n_results: int = 3,
+               filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search the shared knowledge base; returns [] if the service is unavailable"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/internal/kb/search",
+                json={"query": query, "n_results": n_results, "filter": filter, "tenant": self.tenant},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return response.json()["results"]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.warning(f"Shared knowledge base search failed: {e}")
+            return []
+
+    def get_context_for_query(self, query: str, max_tokens: int = 1000,
+                              filter: Optional[Dict[str, Any]] = None) -> str:
+        """Get formatted LLM context for a query from the shared knowledge base"""
+        if self.rerank_stage is not None:
+            candidates = self.search(query, n_results=self.rerank_stage.candidates, filter=filter)
+            documents = self.rerank_stage.rerank(query, candidates)
+        else:
+            documents = self.search(query, n_results=5, filter=filter)
+        return format_context(documents, max_tokens=max_tokens)
+
+    def lookup_answer(self, query: str, scope: str = "") -> Tuple[Optional[str], Optional[str]]:
+        """Cached answer from the gateway's response cache (see KnowledgeBase.lookup_answer)"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/internal/kb/answers/lookup",
+                json={"query": query, "scope": scope, "tenant": self.tenant},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            data = response.json()
+            return data["answer"], data["version"]
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.warning(f"Shared response cache lookup failed: {e}")
+            return None, None
+    
+    def store_answer(self, query: str, answer: str, version: str, scope: str = ""):
+        """Cache an answer in the gateway's response cache"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/internal/kb/answers/store",
+                json={"query": query, "answer": answer, "version": version,
+                      "scope": scope, "tenant": self.tenant},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"Shared response cache store failed: {e}")
+
+    def close(self):
+        self.session.close()
+
+
+def create_knowledge_base():
+    """
+    Build the knowledge base used by an agent process
+
+    Uses the shared gateway service when KB_SERVICE_URL is set, otherwise opens a
+    local KnowledgeBase as before. Agents launched for a tenant's session get
+    KB_TENANT / KB_COLLECTION and only see that tenant's documents.
+    """
+    service_url = os.getenv("KB_SERVICE_URL")
+    tenant = os.getenv("KB_TENANT") or None
+    if service_url:
+        logger.info(f"Using shared knowledge base service at {service_url}")
+        return KnowledgeBaseClient(service_url, service_key=os.getenv("KB_SERVICE_KEY"), tenant=tenant)
+    collection = os.getenv("KB_COLLECTION")
+    if collection:
+        logger.info(f"Using knowledge base collection {collection} for tenant {tenant}")
+        # Tenant collections never come from the default KB_SNAPSHOT
+        return KnowledgeBase(collection_name=collection, snapshot="")
+    return KnowledgeBase()
+
+
+@dataclass
+class _PendingQuery:
+    query: str
+    n_results: int
+    future: asyncio.Future = field(repr=False)
+
+
+class SearchBatcher:
+    """
+    Coalesces concurrent searches from different sessions into one vector query
+
+    Requests arriving within `max_wait` seconds of each other (up to `max_batch`)
+    are deduplicated and answered with a single KnowledgeBase.search_many call,
+    which embeds all texts in one provider call.
+    """
+
+    def __init__(self, kb, max_batch: int = 32, max_wait: float = 0.005):
+        """
+        Args:
+            kb: KnowledgeBase to query
+            max_batch: Maximum number of queries per batch
+            max_wait: Seconds to wait for more queries before flushing
+        """
+        self.kb = kb
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.batched_queries = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def search(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
+        """Queue a search and wait for its batch to complete"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingQuery(query, n_results, future))
+        return await future
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await asyncio.to_thread(self._query_batch, batch)
+            except Exception as e:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                continue
+
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_result(results[pending.query][:pending.n_results])
+
+    def _query_batch(self, batch: List[_PendingQuery]) -> Dict[str, List[Dict[str, Any]]]:
+        """Run one multi-query search for all distinct texts in the batch"""
+        texts = list(dict.fromkeys(pending.query for pending in batch))
+        n_results = max(pending.n_results for pending in batch)
+        results = self.kb.search_many(texts, n_results=n_results)
+
+        self.batches += 1
+        self.batched_queries += len(batch)
+        return dict(zip(texts, results))
@@ -0,0 +1,234 @@
+"""
+Prebuilt knowledge base snapshots
+A snapshot is a directory holding a numpy vector index (embeddings, documents
+and metadata) plus a manifest with a format version, the embedding model and
+a SHA-256 checksum per file. It is exported once (e.g. in CI or before
+building the image) and opened read-only at startup instead of re-embedding
+DEFAULT_KB_FILE on every deploy.
+
+Each export is written to its own versioned directory next to the snapshot
+path, which is a symlink switched to the new version in one os.replace.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+import numpy as np
+
+from vector_index import SUPPORTED_DTYPES, NumpyVectorIndex
+
+logger = logging.getLogger("livekit.agents")
+
+MANIFEST_FILE = "manifest.json"
+SNAPSHOT_FORMAT = "voice-agent-kb-snapshot"
+# Version 2 stores the index as segments; version 1 snapshots (one matrix) still open
+SNAPSHOT_FORMAT_VERSION = 2
+READABLE_FORMAT_VERSIONS = (1, 2)
+
+# Documents read from ChromaDB per page while exporting
+EXPORT_PAGE_SIZE = 5000
+
+# Markers of snapshots whose checksums were verified, shared by the processes on a host
+VERIFIED_DIR = os.path.join(tempfile.gettempdir(), "kb_snapshot_verified")
+
+
+class SnapshotError(Exception):
+    """The snapshot is missing, corrupt or incompatible"""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_embeddings(kb):
+    """All (ids, documents, metadatas, float32 embeddings) stored in a knowledge base"""
+    if kb.storage_backend == "numpy":
+        return kb.collection.read_all()
+
+    ids, documents, metadatas, pages = [], [], [], []
+    offset = 0
+    while True:
+        page = kb.collection.get(
+            limit=EXPORT_PAGE_SIZE, offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        pages.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+    embeddings = np.concatenate(pages) if pages else np.zeros((0, 0), dtype=np.float32)
+    return ids, documents, metadatas, embeddings
+
+
+def export_snapshot(kb, path: str, dtype: str = "float32", rescore: bool = False) -> Dict[str, Any]:
+    """
+    Write a knowledge base's documents and embeddings as a snapshot directory
+
+    The snapshot is assembled in a versioned directory next to `path`, then
+    the `path` symlink is atomically switched to it, so a reader never sees a
+    half-written or missing snapshot. The previous version is kept for
+    readers that resolved the link just before the switch; older ones are
+    removed.
+
+    Args:
+        kb: Source KnowledgeBase (either storage backend)
+        path: Snapshot directory to create or replace
+        dtype: Vector dtype stored in the snapshot (float32, float16 or int8)
+        rescore: Also store float32 vectors so a compact snapshot can be
+            opened with full-precision rescoring (KB_RESCORE_FACTOR)
+
+    Returns:
+        The snapshot manifest
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported snapshot dtype: {dtype}. Expected one of {SUPPORTED_DTYPES}")
+
+    ids, documents, metadatas, embeddings = _read_embeddings(kb)
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=f".{os.path.basename(path)}.")
+    try:
+        index = NumpyVectorIndex(path=staging, name=kb.collection.name, embedding_function=None,
+                                 dtype=dtype, rescore_factor=1 if rescore else 0)
+        index.replace_all(embeddings, documents, metadatas, ids)
+
+        files = {}
+        for filename in sorted(os.listdir(staging)):
+            file_path = os.path.join(staging, filename)
+            files[filename] = {"sha256": _sha256(file_path), "bytes": os.path.getsize(file_path)}
+        snapshot_id = hashlib.sha256(
+            "".join(f"{name}:{info['sha256']}" for name, info in files.items()).encode()
+        ).hexdigest()[:12]
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "snapshot_id": snapshot_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "collection": kb.collection.name,
+            "embedding_model": getattr(kb, "embedding_model", None),
+            "dim": int(embeddings.shape[1]) if len(ids) else None,
+            "dtype": dtype,
+            "count": len(ids),
+            "files": files,
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        version_dir = os.path.join(parent, f".{os.path.basename(path)}.{snapshot_id}")
+        if os.path.isdir(version_dir):
+            # Same content as an existing version
+            shutil.rmtree(staging)
+        else:
+            os.replace(staging, version_dir)
+        _switch_link(path, version_dir)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(f"Exported snapshot {manifest['snapshot_id']} with {len(ids)} documents to {path}")
+    return manifest
+
+
+def _switch_link(path: str, version_dir: str):
+    """Point the `path` symlink at `version_dir` and drop versions older than the previous one"""
+    parent = os.path.dirname(version_dir)
+    previous = os.path.realpath(path) if os.path.islink(path) else None
+    link = f"{version_dir}.link"
+    if os.path.lexists(link):
+        os.remove(link)
+    os.symlink(os.path.basename(version_dir), link)
+    if os.path.isdir(path) and not os.path.islink(path):
+        # Snapshot exported by an older release as a plain directory: moved aside once
+        shutil.rmtree(f"{path}.old", ignore_errors=True)
+        os.replace(path, f"{path}.old")
+        os.replace(link, path)
+        shutil.rmtree(f"{path}.old", ignore_errors=True)
+    else:
+        os.replace(link, path)
+
+    keep = {version_dir, previous}
+    version_name = re.compile(re.escape(f".{os.path.basename(path)}.") + r"[0-9a-f]{12}")
+    for name in os.listdir(parent):
+        candidate = os.path.join(parent, name)
+        if version_name.fullmatch(name) and candidate not in keep:
+            shutil.rmtree(candidate, ignore_errors=True)
+
+
+def _verified_marker(path: str, manifest: Dict[str, Any]) -> str:
+    """Marker file recording that this exact snapshot on disk passed its checksums"""
+    key = [os.path.realpath(path), manifest["snapshot_id"]]
+    for filename in sorted(manifest["files"]):
+        stat = os.stat(os.path.join(path, filename))
+        key.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}")
+    digest = hashlib.sha256("\n".join(key).encode()).hexdigest()[:32]
+    return os.path.join(VERIFIED_DIR, f"{manifest['snapshot_id']}-{digest}")
+
+
+def verify_snapshot(path: str, check_files: bool = True) -> Dict[str, Any]:
+    """
+    Read a snapshot manifest and check it against the files on disk
+
+    Checksums are computed once per snapshot version and host: later opens
+    of the same, unchanged files (e.g. by every agent process) find the
+    verified marker and only check sizes.
+
+    Args:
+        path: Snapshot directory (resolve the symlink first so the manifest
+            and the files opened afterwards come from the same version)
+        check_files: Recompute file checksums (sizes are always checked)
+
+    Returns:
+        The snapshot manifest
+
+    Raises:
+        SnapshotError: If the snapshot is missing, corrupt or of an unknown format
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise SnapshotError(f"Cannot read snapshot manifest {manifest_path}: {e}")
+
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"{path} is not a knowledge base snapshot")
+    if manifest.get("format_version") not in READABLE_FORMAT_VERSIONS:
+        raise SnapshotError(
+            f"Snapshot format version {manifest.get('format_version')} is not supported "
+            f"(expected {SNAPSHOT_FORMAT_VERSION}); re-export it with this release"
+        )
+
+    for filename, info in manifest["files"].items():
+        file_path = os.path.join(path, filename)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) != info["bytes"]:
+            raise SnapshotError(f"Snapshot file {filename} is missing or truncated")
+    if not check_files:
+        return manifest
+
+    marker = _verified_marker(path, manifest)
+    if os.path.exists(marker):
+        return manifest
+    for filename, info in manifest["files"].items():
+        if _sha256(os.path.join(path, filename)) != info["sha256"]:
+            raise SnapshotError(f"Snapshot file {filename} fails its checksum")
+    try:
+        os.makedirs(VERIFIED_DIR, exist_ok=True)
+        with open(marker, "w", encoding="utf-8"):
+            pass
+    except OSError as e:
+        logger.warning(f"Cannot record verified snapshot {manifest['snapshot_id']}: {e}")
+    return manifest
@@ -4,17 +4,35 @@ Implements RAG (Retrieval Augmented Generation) for contextual responses
 """
 
 import os
+import base64
 import json
-from typing import List, Dict, Any, Optional
+import logging
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
 from dataclasses import dataclass
-import numpy as np
 from datetime import datetime
 
-# We'll use ChromaDB for vector storage - it's lightweight and serverless
-import chromadb
-from chromadb.utils import embedding_functions
-import openai
-from livekit.agents.log import logger
+import numpy as np
+
+from latency import LatencyHistogram
+from kb_ingest import IngestJournal, IngestJournalError, IngestStats, batched, iter_documents
+from kb_filters import MetadataIndex, SearchFilter, decode_metadata, encode_metadata
+from reranker import create_rerank_stage
+from response_cache import SemanticResponseCache, create_response_cache
+
+# Same logger as livekit.agents.log, without importing the agents framework
+# (this module is also loaded by the API gateway)
+logger = logging.getLogger("livekit.agents")
+
+# Storage engines: "chroma" (ChromaDB, default) or "numpy" (memory-mapped exact index)
+STORAGE_BACKENDS = ("chroma", "numpy")
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Fields that list_documents projections may select
+DOCUMENT_FIELDS = ("id", "content", "metadata")
 
 
 @dataclass
@@ -34,38 +52,203 @@ class KnowledgeBase:
     
     def __init__(self, 
                  collection_name: str = "voice_agent_kb",
-                 persist_directory: str = "./chroma_db"):
+                 persist_directory: str = "./chroma_db",
+                 storage_backend: Optional[str] = None,
+                 index_dtype: Optional[str] = None,
+                 reranker: Optional[str] = None,
+                 embedding_function=None,
+                 read_only: Optional[bool] = None,
+                 snapshot: Optional[str] = None,
+                 embedding_dimensions: Optional[int] = None,
+                 rescore_factor: Optional[int] = None,
+                 response_cache: Optional[SemanticResponseCache] = None):
         """
         Initialize the knowledge base
         
         Args:
             collection_name: Name of the ChromaDB collection
             persist_directory: Directory to persist the database
+            storage_backend: "chroma" or "numpy" (defaults to KB_STORAGE_BACKEND, then "chroma")
+            index_dtype: Vector dtype for the numpy backend: float32, float16 or int8
+                (defaults to KB_INDEX_DTYPE, then float32)
+            reranker: Rerank stage for get_context_for_query: none, lexical or
+                cross-encoder (defaults to KB_RERANKER, then none)
+            embedding_function: Optional embedding callable used instead of OpenAI
+                (texts -> vectors, with the parameter named `input` for ChromaDB)
+            read_only: Reject mutations, e.g. in gateway workers sharing one index
+                (defaults to KB_READ_ONLY, then False)
+            snapshot: Directory of a snapshot exported with load_knowledge.py export;
+                it is verified and opened read-only with the numpy backend
+                (defaults to KB_SNAPSHOT; pass "" to ignore it)
+            embedding_dimensions: Request shortened embeddings from the model
+                (defaults to KB_EMBEDDING_DIMENSIONS, then the model's full 1536)
+            rescore_factor: For float16/int8 numpy indexes, keep float32 vectors on
+                disk and rescore `n_results * rescore_factor` compact hits with them
+                (defaults to KB_RESCORE_FACTOR, then 0 = off)
+            response_cache: Semantic cache of generated answers, shared by several
+                knowledge bases in the gateway (defaults to one configured by
+                RESPONSE_CACHE, which is off unless enabled)
         """
-        # Use simple ChromaDB client configuration
-        self.client = chromadb.PersistentClient(path=persist_directory)
+        if embedding_dimensions is None:
+            embedding_dimensions = int(os.getenv("KB_EMBEDDING_DIMENSIONS", 0)) or None
+        if rescore_factor is None:
+            rescore_factor = int(os.getenv("KB_RESCORE_FACTOR", 0))
+        self.embedding_dimensions = embedding_dimensions
+        # Vectors from different dimensions of the same model are not comparable
+        self.embedding_model = None
+        if embedding_function is None:
+            self.embedding_model = EMBEDDING_MODEL + (f":{embedding_dimensions}" if embedding_dimensions else "")
+        
+        if snapshot is None:
+            snapshot = os.getenv("KB_SNAPSHOT") or None
+        self.snapshot_manifest: Optional[Dict[str, Any]] = None
+        if snapshot:
+            from kb_snapshot import SnapshotError, verify_snapshot
+            
+            # Pin the version the snapshot link points at now; a later export switches the link
+            snapshot = os.path.realpath(snapshot)
+            self.snapshot_manifest = verify_snapshot(
+                snapshot,
+                check_files=os.getenv("KB_SNAPSHOT_VERIFY", "true").lower() not in ("0", "false", "no")
+            )
+            if embedding_function is None and self.snapshot_manifest.get("embedding_model") != self.embedding_model:
+                raise SnapshotError(
+                    f"Snapshot {snapshot} was embedded with {self.snapshot_manifest.get('embedding_model')}, "
+                    f"but queries use {self.embedding_model}"
+                )
+            storage_backend = "numpy"
+            read_only = True
+        
+        self.storage_backend = (storage_backend or os.getenv("KB_STORAGE_BACKEND", "chroma")).lower()
+        if self.storage_backend not in STORAGE_BACKENDS:
+            raise ValueError(
+                f"Unknown knowledge base storage backend: {self.storage_backend}. "
+                f"Expected one of {STORAGE_BACKENDS}"
+            )
+        
+        if read_only is None:
+            read_only = os.getenv("KB_READ_ONLY", "").lower() in ("1", "true", "yes")
+        self.read_only = read_only
+        self._last_refresh_check = 0.0
         
         # Use OpenAI embeddings for consistency with the LLM
         openai_key = os.getenv("OPENAI_API_KEY")
-        if not openai_key:
+        if not openai_key and embedding_function is None:
             raise ValueError(
                 "OPENAI_API_KEY environment variable is required for KnowledgeBase. "
                 "Please set it in Railway environment variables."
             )
         
-        self.embedding_function = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=openai_key,
-            model_name="text-embedding-3-small"
-        )
+        if self.storage_backend == "numpy":
+            # Memory-mapped exact index; avoids importing ChromaDB entirely
+            from vector_index import NumpyVectorIndex, OpenAIEmbedder
+            
+            self.client = None
+            self.embedding_function = embedding_function or OpenAIEmbedder(
+                api_key=openai_key, model_name=EMBEDDING_MODEL, dimensions=embedding_dimensions
+            )
+            if self.snapshot_manifest is not None:
+                index_path = snapshot
+                collection_name = self.snapshot_manifest["collection"]
+            else:
+                index_path = os.path.join(persist_directory, f"{collection_name}_vectors")
+            self.collection = NumpyVectorIndex(
+                path=index_path,
+                name=collection_name,
+                embedding_function=self.embedding_function,
+                dtype=index_dtype or os.getenv("KB_INDEX_DTYPE", "float32"),
+                rescore_factor=rescore_factor
+            )
+            stored_dim = self.collection.dim
+            if embedding_dimensions and stored_dim is not None and stored_dim != embedding_dimensions:
+                raise ValueError(
+                    f"Index at {index_path} holds {stored_dim}-dim vectors but "
+                    f"KB_EMBEDDING_DIMENSIONS is {embedding_dimensions}; rebuild the index"
+                )
+        else:
+            # We'll use ChromaDB for vector storage - it's lightweight and serverless
+            import chromadb
+            from chromadb.utils import embedding_functions
+            
+            # Use simple ChromaDB client configuration
+            self.client = chromadb.PersistentClient(path=persist_directory)
+            
+            # Shortened embeddings need a ChromaDB release whose OpenAI function takes `dimensions`
+            dimension_kwargs = {"dimensions": embedding_dimensions} if embedding_dimensions else {}
+            self.embedding_function = embedding_function or embedding_functions.OpenAIEmbeddingFunction(
+                api_key=openai_key,
+                model_name=EMBEDDING_MODEL,
+                **dimension_kwargs
+            )
+            
+            # Get or create collection
+            self.collection = self.client.get_or_create_collection(
+                name=collection_name,
+                embedding_function=self.embedding_function
+            )
         
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            embedding_function=self.embedding_function
-        )
+        # Search instrumentation
+        self.search_latency = LatencyHistogram()
+        
+        # Inverted index over metadata for filtered searches (built on first use)
+        self._metadata_index: Optional[MetadataIndex] = None
+        
+        # Answers cached for this content version only; the instance token keeps
+        # versions of a reopened collection from matching older ones
+        self.response_cache = response_cache if response_cache is not None else create_response_cache()
+        self._instance_token = uuid.uuid4().hex[:8]
+        self._content_changes = 0
+        
+        # Optional over-fetch + rerank stage for LLM context
+        self.rerank_stage = create_rerank_stage(reranker)
         
+        if self.snapshot_manifest is not None:
+            logger.info(f"Opened knowledge base snapshot {self.snapshot_manifest['snapshot_id']} from {snapshot}")
         logger.info(f"Knowledge base initialized with {self.collection.count()} documents")
     
+    def _content_changed(self):
+        """Record a collection mutation (moves content_version on)"""
+        self._content_changes += 1
+    
+    @property
+    def content_version(self) -> str:
+        """Changes whenever the stored documents change (including reloads)"""
+        if self._follows_other_writers():
+            self._refresh_if_changed()
+        return f"{self._instance_token}.{self._content_changes}"
+    
+    def _follows_other_writers(self) -> bool:
+        """Read-only numpy index that another process may rewrite"""
+        return self.read_only and self.storage_backend == "numpy" and self.snapshot_manifest is None
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(
+                "Knowledge base is read-only in this process (KB_READ_ONLY). "
+                "Load documents with load_knowledge.py or a single-worker gateway."
+            )
+    
+    def _refresh_if_changed(self):
+        """Pick up index generations written by another process (numpy backend)"""
+        now = time.monotonic()
+        if now - self._last_refresh_check < 1.0:
+            return
+        self._last_refresh_check = now
+        if self.collection.reload_if_changed():
+            self._content_changed()
+            self._metadata_index = None
+            logger.info(f"Reloaded knowledge base index ({self.collection.count()} documents)")
+    
+    def _get_metadata_index(self) -> MetadataIndex:
+        """Build the metadata inverted index from the collection on first use"""
+        if self._metadata_index is None:
+            index = MetadataIndex()
+            stored = self.collection.get(include=["metadatas"])
+            index.build(stored["ids"], stored["metadatas"])
+            self._metadata_index = index
+            logger.info(f"Built metadata index over {len(index)} documents")
+        return self._metadata_index
+    
     def add_document(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """
         Add a document to the knowledge base
@@ -77,6 +260,7 @@ class KnowledgeBase:
         Returns:
             The ID of the added document
         """
+        self._check_writable()
         if metadata is None:
             metadata = {}
         
@@ -89,9 +273,12 @@ class KnowledgeBase:
         # Add to collection
         self.collection.add(
             documents=[content],
-            metadatas=[metadata],
+            metadatas=[encode_metadata(metadata)],
             ids=[doc_id]
         )
+        self._content_changed()
+        if self._metadata_index is not None:
+            self._metadata_index.add(doc_id, metadata)
         
         logger.info(f"Added document {doc_id} to knowledge base")
         return doc_id
@@ -106,6 +293,12 @@ class KnowledgeBase:
         Returns:
             List of document IDs
         """
+        self._check_writable()
+        return self._add_batch(documents, f"doc_{datetime.now().timestamp()}", 0)
+    
+    def _add_batch(self, documents: List[Dict[str, Any]], id_prefix: str, start: int,
+                   embeddings: Optional[List[Any]] = None) -> List[str]:
+        """Embed (unless precomputed) and store one batch; IDs are `{id_prefix}_{start + i}`"""
         contents = []
         metadatas = []
         ids = []
@@ -115,116 +308,371 @@ class KnowledgeBase:
             metadata = doc.get("metadata", {})
             metadata["added_at"] = datetime.now().isoformat()
             
-            doc_id = f"doc_{datetime.now().timestamp()}_{len(ids)}"
+            doc_id = f"{id_prefix}_{start + len(ids)}"
             
             contents.append(content)
-            metadatas.append(metadata)
+            metadatas.append(encode_metadata(metadata))
             ids.append(doc_id)
         
         # Add batch to collection
+        add_kwargs: Dict[str, Any] = {}
+        if embeddings is not None:
+            add_kwargs["embeddings"] = [v.tolist() if hasattr(v, "tolist") else list(v) for v in embeddings]
         self.collection.add(
             documents=contents,
             metadatas=metadatas,
-            ids=ids
+            ids=ids,
+            **add_kwargs
         )
+        self._content_changed()
+        if self._metadata_index is not None:
+            self._metadata_index.build(ids, metadatas)
         
         logger.info(f"Added {len(documents)} documents to knowledge base")
         return ids
     
-    def search(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
+    def add_documents_stream(self, documents: Iterable[Dict[str, Any]],
+                             batch_size: int = 256,
+                             stats: Optional[IngestStats] = None,
+                             on_batch: Optional[Callable[[IngestStats], None]] = None,
+                             embed_workers: int = 1,
+                             journal: Optional[IngestJournal] = None) -> IngestStats:
+        """
+        Add documents from an iterable in bounded batches
+        
+        Each batch is embedded and written before more than `embed_workers`
+        further batches are read, so parsing and embedding memory stays
+        proportional to `batch_size * embed_workers` rather than the input
+        size. The numpy backend writes each batch as a new segment; the index
+        itself keeps every document's text and metadata in memory.
+        
+        Args:
+            documents: Iterable of documents with 'content' and optional 'metadata'
+            batch_size: Documents embedded and written per step
+            stats: Stats object to update (e.g. one shared with iter_documents)
+            on_batch: Called with the running stats after each batch
+            embed_workers: Batches embedded concurrently (embedding calls are
+                network-bound); writes stay sequential and in input order
+            journal: Checkpoint journal; each written batch is recorded and
+                document IDs continue from its recorded batches
+            
+        Returns:
+            Ingestion stats (documents, batches, elapsed time, throughput)
+        """
+        self._check_writable()
+        stats = stats or IngestStats()
+        id_prefix = f"doc_{datetime.now().timestamp()}"
+        if journal is not None:
+            id_prefix = journal.id_prefix
+            self._check_journal(journal)
+        # A crash between a write and its journal entry leaves that batch
+        # stored but unrecorded; its IDs are dropped before it is rewritten
+        clear_first = journal is not None
+        
+        def write(batch, embeddings=None):
+            nonlocal clear_first
+            if journal is None:
+                self._add_batch(batch, id_prefix, stats.documents, embeddings)
+            else:
+                start = journal.completed_documents
+                if clear_first:
+                    self.collection.delete(ids=journal.document_ids(start, len(batch)))
+                    clear_first = False
+                self._add_batch(batch, id_prefix, start, embeddings)
+                journal.record(start, batch)
+            stats.documents += len(batch)
+            stats.batches += 1
+            if on_batch is not None:
+                on_batch(stats)
+        
+        if embed_workers <= 1:
+            for batch in batched(iter(documents), batch_size):
+                write(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=embed_workers) as pool:
+                pending: deque = deque()
+                for batch in batched(iter(documents), batch_size):
+                    texts = [doc.get("content", "") for doc in batch]
+                    pending.append((batch, pool.submit(self.embedding_function, texts)))
+                    if len(pending) > embed_workers:
+                        batch, future = pending.popleft()
+                        write(batch, future.result())
+                while pending:
+                    batch, future = pending.popleft()
+                    write(batch, future.result())
+        stats.finished_at = time.perf_counter()
+        return stats
+    
+    def search(self, query: str, n_results: int = 3,
+               filter: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Search the knowledge base for relevant documents
         
         Args:
             query: The search query
             n_results: Number of results to return
+            filter: Optional metadata filter, e.g.
+                {"category": "products", "tags": ["trail"], "added_after": "2025-01-01"}
             
         Returns:
             List of relevant documents with content and metadata
         """
+        documents = self.search_many([query], n_results=n_results, filter=filter)[0]
+        logger.info(f"Found {len(documents)} relevant documents for query: {query}")
+        return documents
+    
+    def search_many(self, queries: List[str], n_results: int = 3,
+                    filter: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search the knowledge base for several queries at once
+        
+        Cached queries are answered from memory; the remaining distinct queries
+        are embedded in one provider call and looked up in one vector query.
+        
+        Args:
+            queries: The search queries
+            n_results: Number of results to return per query
+            filter: Optional metadata filter applied to every query (see search)
+            
+        Returns:
+            One list of documents per query, in the same order as `queries`
+        """
+        if self._follows_other_writers():
+            self._refresh_if_changed()
+        
+        search_filter = SearchFilter.from_dict(filter)
+        found = self._query_collection(list(dict.fromkeys(queries)), n_results, search_filter)
+        return [list(found[query]) for query in queries]
+    
+    def _query_collection(self, queries: List[str], n_results: int,
+                          search_filter: Optional[SearchFilter]) -> Dict[str, List[Dict[str, Any]]]:
+        """Run one vector query for `queries`"""
+        query_kwargs: Dict[str, Any] = {}
+        limit = n_results
+        if search_filter is not None:
+            # Narrow to matching documents before touching the vector index
+            candidates = self._get_metadata_index().candidates(search_filter)
+            if not candidates:
+                logger.info(f"No documents match filter {search_filter}")
+                return {query: [] for query in queries}
+            limit = min(n_results, len(candidates))
+            if self.storage_backend == "numpy":
+                query_kwargs["ids"] = candidates
+            elif search_filter.uses_internal_keys and self._get_metadata_index().unencoded_ids:
+                # Documents stored before the filter keys existed would never
+                # match a where clause: score the candidates directly instead
+                start = time.perf_counter()
+                results = self._query_candidates(queries, limit, candidates)
+                self.search_latency.observe(time.perf_counter() - start)
+                return {query: parse_query_results(results, row) for row, query in enumerate(queries)}
+            else:
+                query_kwargs["where"] = search_filter.to_chroma_where()
+        
+        start = time.perf_counter()
         results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
+            query_texts=queries,
+            n_results=limit,
+            **query_kwargs
         )
+        self.search_latency.observe(time.perf_counter() - start)
         
-        documents = []
-        for i in range(len(results['ids'][0])):
-            doc = {
-                'id': results['ids'][0][i],
-                'content': results['documents'][0][i],
-                'metadata': results['metadatas'][0][i],
-                'distance': results['distances'][0][i] if 'distances' in results else None
-            }
-            documents.append(doc)
-        
-        logger.info(f"Found {len(documents)} relevant documents for query: {query}")
-        return documents
+        return {query: parse_query_results(results, row) for row, query in enumerate(queries)}
     
-    def get_context_for_query(self, query: str, max_tokens: int = 1000) -> str:
+    def _query_candidates(self, queries: List[str], n_results: int,
+                          candidates: Iterable[str]) -> Dict[str, List[List[Any]]]:
+        """Exact search over candidate documents, shaped like a ChromaDB query result"""
+        stored = self.collection.get(ids=sorted(candidates), include=["embeddings", "documents", "metadatas"])
+        vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+        query_vectors = np.asarray(self.embedding_function(list(queries)), dtype=np.float32)
+        # Squared L2, ChromaDB's default distance
+        distances = ((query_vectors ** 2).sum(axis=1)[:, None] - 2 * query_vectors @ vectors.T
+                     + (vectors ** 2).sum(axis=1)[None, :])
+        results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for row in distances:
+            top = np.argsort(row)[:n_results]
+            results["ids"].append([stored["ids"][i] for i in top])
+            results["documents"].append([stored["documents"][i] for i in top])
+            results["metadatas"].append([stored["metadatas"][i] for i in top])
+            results["distances"].append([float(row[i]) for i in top])
+        return results
+    
+    def get_context_for_query(self, query: str, max_tokens: int = 1000,
+                              filter: Optional[Dict[str, Any]] = None) -> str:
         """
         Get relevant context for a query to inject into the LLM prompt
         
         Args:
             query: The user's query
             max_tokens: Maximum tokens to include in context
+            filter: Optional metadata filter (see search)
             
         Returns:
             Formatted context string
         """
         # Search for relevant documents
-        documents = self.search(query, n_results=5)
-        
-        if not documents:
-            return ""
+        if self.rerank_stage is not None:
+            candidates = self.search(query, n_results=self.rerank_stage.candidates, filter=filter)
+            documents = self.rerank_stage.rerank(query, candidates)
+        else:
+            documents = self.search(query, n_results=5, filter=filter)
+        return format_context(documents, max_tokens=max_tokens)
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """L2-normalized embeddings of `queries` from the knowledge base's model"""
+        from vector_index import normalize_rows
         
-        # Format context
-        context_parts = ["Here is relevant information from the knowledge base:\n"]
+        return normalize_rows(np.asarray(self.embedding_function(queries), dtype=np.float32))
+    
+    def lookup_answer(self, query: str, scope: str = "") -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look up a previously generated answer to a similar question
         
-        for doc in documents:
-            # Estimate tokens (rough approximation)
-            doc_text = f"\n[Document: {doc['metadata'].get('title', 'Untitled')}]\n{doc['content']}\n"
+        Args:
+            query: The user's question
+            scope: Partition within this collection, e.g. the retrieval filter
             
-            # Simple token estimation (1 token ≈ 4 characters)
-            if len(" ".join(context_parts)) + len(doc_text) > max_tokens * 4:
-                break
-                
-            context_parts.append(doc_text)
-        
-        return "\n".join(context_parts)
+        Returns:
+            (answer or None, content version to store a new answer under);
+            the version is None when answer caching is off
+        """
+        if self.response_cache is None:
+            return None, None
+        version = self.content_version
+        vector = self.embed_queries([query])[0]
+        answer = self.response_cache.lookup(query, vector, f"{self.collection.name}|{scope}", version)
+        return answer, version
+    
+    def store_answer(self, query: str, answer: str, version: str, scope: str = ""):
+        """Cache an answer generated from content `version` (dropped if the content changed since)"""
+        if self.response_cache is None or version != self.content_version:
+            return
+        cache_scope = f"{self.collection.name}|{scope}"
+        vector = self.response_cache.pending_vector(query, cache_scope)
+        if vector is None:
+            vector = self.embed_queries([query])[0]
+        self.response_cache.store(query, vector, answer, cache_scope, version)
     
     def delete_document(self, doc_id: str):
         """Delete a document from the knowledge base"""
+        self._check_writable()
         self.collection.delete(ids=[doc_id])
+        self._content_changed()
+        if self._metadata_index is not None:
+            self._metadata_index.remove(doc_id)
         logger.info(f"Deleted document {doc_id} from knowledge base")
     
     def clear_all(self):
         """Clear all documents from the knowledge base"""
-        # Delete and recreate the collection
-        self.client.delete_collection(name=self.collection.name)
-        self.collection = self.client.create_collection(
-            name=self.collection.name,
-            embedding_function=self.embedding_function
-        )
+        self._check_writable()
+        if self.storage_backend == "numpy":
+            self.collection.clear()
+        else:
+            # Delete and recreate the collection
+            self.client.delete_collection(name=self.collection.name)
+            self.collection = self.client.create_collection(
+                name=self.collection.name,
+                embedding_function=self.embedding_function
+            )
+        self._content_changed()
+        self._metadata_index = None
         logger.info("Cleared all documents from knowledge base")
     
     def list_documents(self, limit: int = 100) -> List[Dict[str, Any]]:
         """List all documents in the knowledge base"""
-        results = self.collection.get(limit=limit)
+        return self.page_documents(limit=limit)[0]
+    
+    def page_documents(self, limit: int = 100, cursor: Optional[str] = None,
+                       fields: Optional[Iterable[str]] = None,
+                       max_content_chars: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of documents in insertion order
+        
+        Args:
+            limit: Maximum documents in the page
+            cursor: `next_cursor` of the previous page (None starts at the beginning)
+            fields: Subset of id, content and metadata to return (default: all)
+            max_content_chars: Truncate content to this many characters
+                (truncated documents are marked with "truncated": true)
+            
+        Returns:
+            (documents, next_cursor); next_cursor is None after the last page
+            
+        Raises:
+            ValueError: On an invalid cursor or field name
+        """
+        fields = tuple(fields) if fields else DOCUMENT_FIELDS
+        unknown = set(fields) - set(DOCUMENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown document fields: {sorted(unknown)}. Expected some of {DOCUMENT_FIELDS}")
+        
+        offset = self._cursor_offset(cursor)
+        include = []
+        if "content" in fields:
+            include.append("documents")
+        if "metadata" in fields:
+            include.append("metadatas")
+        results = self.collection.get(limit=limit, offset=offset, include=include)
         
         documents = []
         for i in range(len(results['ids'])):
-            doc = {
-                'id': results['ids'][i],
-                'content': results['documents'][i],
-                'metadata': results['metadatas'][i]
-            }
+            doc: Dict[str, Any] = {}
+            if "id" in fields:
+                doc['id'] = results['ids'][i]
+            if "content" in fields:
+                content = results['documents'][i]
+                if max_content_chars is not None and len(content) > max_content_chars:
+                    content = content[:max_content_chars]
+                    doc['truncated'] = True
+                doc['content'] = content
+            if "metadata" in fields:
+                doc['metadata'] = decode_metadata(results['metadatas'][i])
             documents.append(doc)
         
-        return documents
+        next_cursor = None
+        if len(results['ids']) == limit and limit > 0:
+            next_cursor = _encode_cursor(offset + limit, results['ids'][-1])
+        return documents, next_cursor
+    
+    def iter_all_documents(self, page_size: int = 500,
+                           fields: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield every document page by page (for exports)"""
+        cursor = None
+        while True:
+            documents, cursor = self.page_documents(limit=page_size, cursor=cursor, fields=fields)
+            yield from documents
+            if cursor is None:
+                return
     
-    def load_from_file(self, file_path: str):
+    def _cursor_offset(self, cursor: Optional[str]) -> int:
+        """Position a cursor points at, corrected for deletions where the backend allows"""
+        if not cursor:
+            return 0
+        offset, last_id = _decode_cursor(cursor)
+        # The numpy index knows every ID's row, so deletions before the
+        # cursor do not make the next page skip documents
+        row_of = getattr(self.collection, "row_of", None)
+        row = row_of(last_id) if row_of is not None else None
+        if row is not None:
+            return row + 1
+        return offset
+    
+    def _check_journal(self, journal: IngestJournal):
+        """Make sure the batches a journal records are actually stored"""
+        if not journal.batches:
+            return
+        last = journal.batches[-1]
+        expected = journal.document_ids(last["start"], last["count"])
+        stored = self.collection.get(ids=expected, include=[])["ids"]
+        if len(stored) != len(expected):
+            raise IngestJournalError(
+                f"Journal {journal.path} records {journal.completed_documents} documents but the "
+                f"knowledge base is missing {len(expected) - len(stored)} of its last batch "
+                "(was it cleared?); start a fresh load"
+            )
+    
+    def load_from_file(self, file_path: str, batch_size: int = 256) -> Optional[IngestStats]:
         """
-        Load documents from a JSON file
+        Load documents from a JSON array or NDJSON file, streaming in batches
         
         Expected format:
         [
@@ -234,18 +682,90 @@ class KnowledgeBase:
             },
             ...
         ]
+        or one such object per line (NDJSON).
+        
+        Returns:
+            Ingestion stats, or None if the load failed
         """
+        stats = IngestStats()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                documents = json.load(f)
-            
-            if isinstance(documents, list):
-                self.add_documents_batch(documents)
-                logger.info(f"Loaded {len(documents)} documents from {file_path}")
-            else:
-                logger.error(f"Invalid format in {file_path}. Expected a list of documents.")
+            self.add_documents_stream(iter_documents(file_path, stats), batch_size=batch_size, stats=stats)
         except Exception as e:
-            logger.error(f"Error loading documents from {file_path}: {e}")
+            logger.error(f"Error loading documents from {file_path} after {stats.documents} documents: {e}")
+            return None
+        logger.info(
+            f"Loaded {stats.documents} documents from {file_path} "
+            f"({stats.documents_per_second:.0f} docs/s, {stats.skipped} skipped)"
+        )
+        return stats
+
+
+def _encode_cursor(offset: int, last_id: str) -> str:
+    payload = json.dumps({"o": offset, "id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(payload["o"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def parse_query_results(results: Dict[str, Any], row: int = 0) -> List[Dict[str, Any]]:
+    """
+    Convert one row of a ChromaDB query result into document dicts
+    
+    Args:
+        results: Result of collection.query
+        row: Index of the query text within the batch
+        
+    Returns:
+        List of documents with id, content, metadata and distance
+    """
+    documents = []
+    distances = results.get('distances')
+    for i in range(len(results['ids'][row])):
+        doc = {
+            'id': results['ids'][row][i],
+            'content': results['documents'][row][i],
+            'metadata': decode_metadata(results['metadatas'][row][i]),
+            'distance': distances[row][i] if distances else None
+        }
+        documents.append(doc)
+    return documents
+
+
+def format_context(documents: List[Dict[str, Any]], max_tokens: int = 1000) -> str:
+    """
+    Format retrieved documents as context for the LLM prompt
+    
+    Args:
+        documents: Documents returned by a search
+        max_tokens: Maximum tokens to include in context
+        
+    Returns:
+        Formatted context string (empty if there are no documents)
+    """
+    if not documents:
+        return ""
+    
+    # Format context
+    context_parts = ["Here is relevant information from the knowledge base:\n"]
+    
+    for doc in documents:
+        # Estimate tokens (rough approximation)
+        doc_text = f"\n[Document: {doc['metadata'].get('title', 'Untitled')}]\n{doc['content']}\n"
+        
+        # Simple token estimation (1 token ≈ 4 characters)
+        if len(" ".join(context_parts)) + len(doc_text) > max_tokens * 4:
+            break
+            
+        context_parts.append(doc_text)
+    
+    return "\n".join(context_parts)
 
 
 # Example usage and testing
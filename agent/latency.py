@@ -0,0 +1,324 @@
+"""
+Latency tracing for the voice agent
+Records per-turn stage timings (STT -> retrieval -> LLM -> TTS) with monotonic
+timestamps and aggregates them into histograms exportable as Prometheus text
+"""
+
+import bisect
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Iterable
+
+# Bucket upper bounds in seconds, tuned for conversational latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0)
+
+# Stages recorded for every voice turn
+TURN_STAGES = (
+    "end_of_utterance",   # user stopped speaking -> turn detector committed the turn
+    "stt_final",          # user stopped speaking -> final Deepgram transcript
+    "retrieval",          # get_context_for_query duration
+    "llm_ttft",           # LLM request -> first token
+    "tts_ttfb",           # TTS request -> first audio byte
+    "turn_total",         # user stopped speaking -> agent started speaking
+)
+
+# Stages the framework reports when its LLM/TTS stream finishes, usually after
+# the agent started speaking; a turn is exported once these have arrived
+LATE_STAGES = ("llm_ttft", "tts_ttfb")
+
+
+def _nearest_rank(sorted_samples: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    rank = int(round(q / 100.0 * len(sorted_samples))) - 1
+    return sorted_samples[max(0, min(len(sorted_samples) - 1, rank))]
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram with a bounded sample window for percentiles
+
+    Bucket counts are cumulative over the process lifetime (Prometheus semantics),
+    while p50/p95/p99 are computed from the most recent `window` observations.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, window: int = 2048, labels: str = ""):
+        """
+        Args:
+            buckets: Sorted bucket upper bounds in seconds
+            window: Number of recent observations kept for percentile estimates
+            labels: Pre-rendered Prometheus label string, e.g. 'stage="retrieval"'
+        """
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """Record a single observation in seconds"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            self._recent.append(seconds)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Fold another histogram with the same buckets into this one"""
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        with other._lock:
+            counts = list(other.bucket_counts)
+            count, total, recent = other.count, other.total, list(other._recent)
+        with self._lock:
+            self.bucket_counts = [a + b for a, b in zip(self.bucket_counts, counts)]
+            self.count += count
+            self.total += total
+            self._recent.extend(recent)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile (0-100) over the recent window"""
+        with self._lock:
+            samples = sorted(self._recent)
+        return _nearest_rank(samples, q)
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Count, mean and p50/p95/p99 in seconds"""
+        with self._lock:
+            samples = sorted(self._recent)
+            count = self.count
+            total = self.total
+        return {
+            "count": count,
+            "mean": total / count if count else None,
+            "p50": _nearest_rank(samples, 50),
+            "p95": _nearest_rank(samples, 95),
+            "p99": _nearest_rank(samples, 99),
+        }
+
+    def render_samples(self, name: str) -> List[str]:
+        """Render bucket/sum/count sample lines in Prometheus text format"""
+        with self._lock:
+            counts = list(self.bucket_counts)
+            count = self.count
+            total = self.total
+
+        prefix = f"{self.labels}," if self.labels else ""
+        suffix = f"{{{self.labels}}}" if self.labels else ""
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+        lines.append(f"{name}_sum{suffix} {total}")
+        lines.append(f"{name}_count{suffix} {count}")
+        return lines
+
+
+def render_histogram_family(name: str, help_text: str, histograms: Iterable[LatencyHistogram]) -> List[str]:
+    """Render a HELP/TYPE header followed by the samples of every histogram in the family"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for histogram in histograms:
+        lines.extend(histogram.render_samples(name))
+    return lines
+
+
+class TurnTrace:
+    """Stage timings for a single user -> agent turn"""
+
+    def __init__(self, started_at: float):
+        self.turn_id = uuid.uuid4().hex[:16]
+        self.started_at = started_at
+        self.ended_at: Optional[float] = None
+        # Speech handle of the agent's reply, matched against metrics' speech_id
+        self.speech_id: Optional[str] = None
+        self.marks: Dict[str, float] = {}
+        self.durations: Dict[str, float] = {}
+
+
+class TurnLatencyTracker:
+    """
+    Collects per-turn spans from agent session events and the RAG LLM wrapper
+
+    A turn starts when the user stops speaking and ends when the agent starts
+    speaking. Framework-measured durations (LLM TTFT, TTS TTFB, end-of-utterance
+    delay) and our own retrieval timing are attached to their turn: by speech
+    ID when the metrics carry one, otherwise to the latest turn. LLM and TTS
+    metrics usually arrive after the agent started speaking, so an ended turn
+    is exported once they have arrived, or when the next turn starts.
+    """
+
+    def __init__(self, session_id: Optional[str] = None, trace_file: Optional[str] = None):
+        """
+        Args:
+            session_id: Identifier attached to exported spans
+            trace_file: Optional path; finished turns are appended as JSON lines
+        """
+        self.session_id = session_id or ""
+        self.trace_file = trace_file
+        self.histograms: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram(labels=f'stage="{stage}"') for stage in TURN_STAGES
+        }
+        self.current: Optional[TurnTrace] = None
+        self.completed_turns = 0
+        # Events marked while no turn was open, attached to the next turn (latest wins)
+        self._pending_marks: Dict[str, float] = {}
+        # Ended turns still waiting for LATE_STAGES, oldest first
+        self._ending: "OrderedDict[str, TurnTrace]" = OrderedDict()
+        # Offset used to convert monotonic timestamps to wall-clock for export
+        self._wall_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def start_turn(self):
+        """User stopped speaking: open a new turn"""
+        self.flush()
+        turn = TurnTrace(started_at=time.monotonic())
+        self.current = turn
+        pending, self._pending_marks = self._pending_marks, {}
+        for event, at in pending.items():
+            self._attach_mark(turn, event, at)
+
+    def bind_speech(self, speech_id: str):
+        """The agent created its reply to the open turn"""
+        turn = self.current
+        if turn is not None and turn.speech_id is None:
+            turn.speech_id = speech_id
+
+    def mark(self, event: str):
+        """
+        Record the monotonic time of an event relative to the open turn
+
+        Deepgram can finalize a transcript before the VAD reports the end of
+        speech, so an event marked while no turn is open is kept for the next one.
+        """
+        now = time.monotonic()
+        turn = self.current
+        if turn is None:
+            self._pending_marks[event] = now
+            return
+        self._attach_mark(turn, event, now)
+
+    def _attach_mark(self, turn: TurnTrace, event: str, at: float):
+        if event in turn.marks:
+            return
+        turn.marks[event] = at
+        if event == "stt_final":
+            # A transcript finalized before the turn opened added no latency
+            self.record_duration("stt_final", max(0.0, at - turn.started_at))
+
+    def _turn_for(self, speech_id: Optional[str]) -> Optional[TurnTrace]:
+        turns = list(self._ending.values())
+        if self.current is not None:
+            turns.append(self.current)
+        if speech_id is not None:
+            for turn in turns:
+                if turn.speech_id == speech_id:
+                    return turn
+            # Not bound (e.g. no speech_created event): fall back to the open turn
+            return self.current
+        return turns[-1] if turns else None
+
+    def record_duration(self, stage: str, seconds: Optional[float], speech_id: Optional[str] = None):
+        """Attach a measured stage duration to its turn"""
+        if seconds is None or seconds < 0:
+            return
+        turn = self._turn_for(speech_id)
+        if turn is None:
+            histogram = self.histograms.get(stage)
+            if histogram is not None:
+                histogram.observe(seconds)
+            return
+        # Keep the first measurement per turn (e.g. the first TTS segment)
+        turn.durations.setdefault(stage, seconds)
+        if turn.ended_at is not None and all(s in turn.durations for s in LATE_STAGES):
+            self._finish(self._ending.pop(turn.turn_id))
+
+    def end_turn(self):
+        """Agent started speaking: close the turn, exporting it once its late metrics arrive"""
+        turn = self.current
+        if turn is None:
+            return
+        self.current = None
+
+        turn.ended_at = time.monotonic()
+        turn.durations["turn_total"] = turn.ended_at - turn.started_at
+        if all(stage in turn.durations for stage in LATE_STAGES):
+            self._finish(turn)
+        else:
+            self._ending[turn.turn_id] = turn
+
+    def flush(self):
+        """Export ended turns without waiting for their remaining metrics"""
+        while self._ending:
+            _, turn = self._ending.popitem(last=False)
+            self._finish(turn)
+
+    def _finish(self, turn: TurnTrace):
+        for stage, seconds in turn.durations.items():
+            histogram = self.histograms.get(stage)
+            if histogram is not None:
+                histogram.observe(seconds)
+        self.completed_turns += 1
+
+        if self.trace_file:
+            self._append_spans(turn, turn.ended_at)
+
+    def to_spans(self, turn: TurnTrace, ended_at: float) -> List[Dict]:
+        """Export a turn as OpenTelemetry-style span dicts (parent turn span + stage spans)"""
+        def to_unix_ns(monotonic_seconds: float) -> int:
+            return int(monotonic_seconds * 1e9) + self._wall_offset_ns
+
+        start_ns = to_unix_ns(turn.started_at)
+        spans = [{
+            "trace_id": turn.turn_id,
+            "name": "voice.turn",
+            "start_time_unix_nano": start_ns,
+            "end_time_unix_nano": to_unix_ns(ended_at),
+            "attributes": {"session.id": self.session_id},
+        }]
+        for stage, seconds in turn.durations.items():
+            if stage == "turn_total":
+                continue
+            # Stage spans are anchored at their mark when we have one, otherwise at turn start
+            stage_end = turn.marks.get(stage)
+            stage_end_ns = to_unix_ns(stage_end) if stage_end is not None else start_ns + int(seconds * 1e9)
+            spans.append({
+                "trace_id": turn.turn_id,
+                "name": f"voice.{stage}",
+                "start_time_unix_nano": stage_end_ns - int(seconds * 1e9),
+                "end_time_unix_nano": stage_end_ns,
+                "attributes": {"session.id": self.session_id},
+            })
+        return spans
+
+    def _append_spans(self, turn: TurnTrace, ended_at: float):
+        try:
+            with open(self.trace_file, "a", encoding="utf-8") as f:
+                for span in self.to_spans(turn, ended_at):
+                    f.write(json.dumps(span) + "\n")
+        except OSError:
+            # Tracing must never break the conversation
+            pass
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Per-stage count, mean and p50/p95/p99"""
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition of all stage histograms"""
+        lines = render_histogram_family(
+            "voice_turn_stage_seconds",
+            "Per-turn voice pipeline stage latency in seconds",
+            self.histograms.values(),
+        )
+        lines.append("# HELP voice_turns_total Completed voice turns")
+        lines.append("# TYPE voice_turns_total counter")
+        lines.append(f"voice_turns_total {self.completed_turns}")
+        return "\n".join(lines) + "\n"
@@ -5,8 +5,13 @@ Script to load documents into the knowledge base
 
 import json
 import os
+import resource
 import sys
+import time
+from typing import Optional
 from knowledge_base import KnowledgeBase
+from kb_snapshot import export_snapshot
+from kb_ingest import IngestJournal, IngestStats, iter_corpus, iter_documents, DEFAULT_CHUNK_SIZE
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -96,23 +101,110 @@ Users can adjust sensitivity from 10% to 200% and upload a face image to appear
             print(f"  Result {i+1}: {result['content'][:100]}...")
 
 
-def load_from_json(file_path: str):
-    """Load documents from a JSON file"""
+def _print_progress(stats: IngestStats):
+    files = f"{stats.files:,} files, " if stats.files else ""
+    print(f"\r  {files}{stats.documents:,} documents in {stats.batches} batches "
+          f"({stats.documents_per_second:,.0f} docs/s)", end="", flush=True)
+
+
+def _print_peak_memory():
+    # ru_maxrss is reported in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Peak memory: {peak_mb:.0f} MB")
+
+
+def load_from_json(file_path: str, batch_size: int = 256, resume: bool = False,
+                   journal_path: Optional[str] = None):
+    """Stream documents from a JSON array or NDJSON file, checkpointing each batch"""
     kb = KnowledgeBase()
+    stats = IngestStats()
+    journal = IngestJournal(journal_path or f"{file_path}.journal")
     
     try:
-        kb.load_from_file(file_path)
-        print(f"Successfully loaded documents from {file_path}")
+        documents = iter_documents(file_path, stats)
+        if resume:
+            journal.load(file_path, kb.collection.name)
+            batch_size = journal.batch_size
+            print(f"Resuming from {journal.path}: {journal.completed_documents:,} documents already loaded")
+            documents = journal.skip_completed(documents, stats)
+        else:
+            journal.start(file_path, batch_size, kb.collection.name)
+        
+        kb.add_documents_stream(
+            documents,
+            batch_size=batch_size,
+            stats=stats,
+            on_batch=_print_progress,
+            journal=journal
+        )
+        print()
+        print(f"Successfully loaded {stats.documents:,} documents from {file_path}"
+              + (f" (skipped {stats.resumed:,} already loaded)" if stats.resumed else ""))
+        print(f"Throughput: {stats.documents_per_second:,.0f} docs/s over {stats.seconds:.1f}s "
+              f"({stats.skipped} skipped)")
+        _print_peak_memory()
         
         # Show document count
         doc_count = kb.collection.count()
         print(f"Total documents in knowledge base: {doc_count}")
         
     except Exception as e:
-        print(f"Error loading documents: {e}")
+        print()
+        print(f"Error loading documents after {stats.documents:,}: {e}")
+        print(f"Rerun with --resume to continue from the last checkpoint in {journal.path}")
+        sys.exit(1)
+
+
+def ingest_directory(root: str, workers: int = 0, batch_size: int = 128,
+                     embed_workers: int = 4, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Extract, chunk and load every HTML/Markdown/JSON/text file under a directory"""
+    if not os.path.isdir(root):
+        print(f"Not a directory: {root}")
+        sys.exit(1)
+    
+    kb = KnowledgeBase()
+    stats = IngestStats()
+    
+    print(f"Ingesting {root} ({workers or os.cpu_count()} extract workers, {embed_workers} embed workers)...")
+    try:
+        kb.add_documents_stream(
+            iter_corpus(root, workers=workers or None, stats=stats, chunk_size=chunk_size),
+            batch_size=batch_size,
+            stats=stats,
+            on_batch=_print_progress,
+            embed_workers=embed_workers
+        )
+        print()
+        print(f"Successfully loaded {stats.documents:,} chunks from {stats.files:,} files "
+              f"({stats.bytes / 1e6:.1f} MB, {stats.skipped} skipped)")
+        print(f"Throughput: {stats.documents_per_second:,.0f} chunks/s, "
+              f"{stats.bytes / 1e6 / max(stats.seconds, 1e-9):.2f} MB/s over {stats.seconds:.1f}s")
+        _print_peak_memory()
+        print(f"Total documents in knowledge base: {kb.collection.count()}")
+    except Exception as e:
+        print()
+        print(f"Error ingesting {root} after {stats.documents:,} chunks: {e}")
         sys.exit(1)
 
 
+def export_knowledge_base(path: str, dtype: str = "float32", rescore: bool = False):
+    """Export the knowledge base as a checksummed snapshot for read-only deploys"""
+    kb = KnowledgeBase()
+    
+    start = time.perf_counter()
+    manifest = export_snapshot(kb, path, dtype=dtype, rescore=rescore)
+    size_mb = sum(info["bytes"] for info in manifest["files"].values()) / 1e6
+    print(f"Exported snapshot {manifest['snapshot_id']} to {path} in {time.perf_counter() - start:.1f}s")
+    print(f"  {manifest['count']:,} documents, dim {manifest['dim']}, {manifest['dtype']}, {size_mb:.1f} MB")
+    
+    # Time what a deploy pays to open it (checksums included)
+    start = time.perf_counter()
+    snapshot_kb = KnowledgeBase(snapshot=path)
+    print(f"Opened and verified in {time.perf_counter() - start:.2f}s "
+          f"({snapshot_kb.collection.count():,} documents)")
+    print(f"Deploy with KB_SNAPSHOT={path}")
+
+
 def clear_knowledge_base():
     """Clear all documents from the knowledge base"""
     kb = KnowledgeBase()
@@ -139,12 +231,49 @@ def list_documents():
         print(f"Content preview: {doc['content'][:100]}...")
 
 
+def dump_documents(output_path: str):
+    """Write every document to an NDJSON file (loadable again with `load`)"""
+    kb = KnowledgeBase()
+    
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        for doc in kb.iter_all_documents(fields=("content", "metadata")):
+            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            count += 1
+    print(f"Wrote {count} documents to {output_path}")
+
+
+def _int_option(name: str, default: int) -> int:
+    """Value of `--name N` on the command line, or the default"""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return int(sys.argv[index + 1])
+    return default
+
+
+def _str_option(name: str) -> Optional[str]:
+    """Value of `--name VALUE` on the command line, if given"""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+
 def main():
     """Main function to handle command line arguments"""
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python load_knowledge.py sample     - Load sample documents")
-        print("  python load_knowledge.py load <file.json> - Load from JSON file")
+        print("  python load_knowledge.py load <file.json|file.ndjson> [--batch-size N] [--resume] [--journal PATH]")
+        print("                                      - Stream from a JSON/NDJSON file (resumable)")
+        print("  python load_knowledge.py ingest <dir> [--workers N] [--embed-workers N] [--batch-size N] [--chunk-size N]")
+        print("                                      - Load HTML/Markdown/JSON/text files from a directory")
+        print("  python load_knowledge.py export <dir> [--dtype float32|float16|int8] [--rescore]")
+        print("                                      - Export a snapshot to open with KB_SNAPSHOT")
+        print("  python load_knowledge.py dump <file.ndjson>")
+        print("                                      - Write all documents as NDJSON")
         print("  python load_knowledge.py list       - List all documents")
         print("  python load_knowledge.py clear      - Clear all documents")
         sys.exit(1)
@@ -154,7 +283,24 @@ def main():
     if command == "sample":
         load_sample_documents()
     elif command == "load" and len(sys.argv) > 2:
-        load_from_json(sys.argv[2])
+        load_from_json(
+            sys.argv[2],
+            _int_option("--batch-size", 256),
+            resume="--resume" in sys.argv,
+            journal_path=_str_option("--journal")
+        )
+    elif command == "ingest" and len(sys.argv) > 2:
+        ingest_directory(
+            sys.argv[2],
+            workers=_int_option("--workers", 0),
+            batch_size=_int_option("--batch-size", 128),
+            embed_workers=_int_option("--embed-workers", 4),
+            chunk_size=_int_option("--chunk-size", DEFAULT_CHUNK_SIZE)
+        )
+    elif command == "export" and len(sys.argv) > 2:
+        export_knowledge_base(sys.argv[2], _str_option("--dtype") or "float32", rescore="--rescore" in sys.argv)
+    elif command == "dump" and len(sys.argv) > 2:
+        dump_documents(sys.argv[2])
     elif command == "list":
         list_documents()
     elif command == "clear":
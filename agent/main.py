@@ -1,17 +1,18 @@
 import asyncio
 import json
 import os
-import requests
 
 from livekit import rtc
 from livekit.agents import JobContext, WorkerOptions, cli, JobProcess, Agent, AgentSession, RoomInputOptions
 from livekit.agents.log import logger
 from livekit.plugins import deepgram, silero, cartesia, openai
+import random
 import time
 import asyncio
 from typing import List, Any
 
 from dotenv import load_dotenv
+from voice_catalog import VoiceCatalog
 
 load_dotenv()
 
@@ -21,8 +22,8 @@ class Assistant(Agent):
         super().__init__(instructions="You are a voice assistant created by LiveKit. Your interface with users will be voice. Pretend we're having a conversation, no special formatting or headings, just natural speech.")
 
 
-def create_deepgram_stt_with_retry(max_retries=3, base_delay=1.0):
-    """Create Deepgram STT instance with retry logic and error handling"""
+async def create_deepgram_stt_with_retry(max_retries=3, base_delay=1.0):
+    """Create Deepgram STT instance with retry logic and error handling (backoff does not block the event loop)"""
     
     deepgram_key = os.getenv("DEEPGRAM_API_KEY")
     if not deepgram_key:
@@ -55,10 +56,10 @@ def create_deepgram_stt_with_retry(max_retries=3, base_delay=1.0):
                 logger.error("❌ All attempts to create Deepgram STT failed")
                 raise Exception(f"Failed to initialize Deepgram STT after {max_retries} attempts: {e}")
             
-            # Exponential backoff
-            delay = base_delay * (2 ** attempt)
-            logger.info(f"⏳ Retrying in {delay} seconds...")
-            time.sleep(delay)
+            # Exponential backoff with jitter, so agents started together do not retry in lockstep
+            delay = base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+            logger.info(f"⏳ Retrying in {delay:.2f} seconds...")
+            await asyncio.sleep(delay)
     
     # This should never be reached, but just in case
     raise Exception("Failed to create Deepgram STT instance")
@@ -68,26 +69,16 @@ def prewarm(proc: JobProcess):
     # preload models when process starts to speed up first interaction
     proc.userdata["vad"] = silero.VAD.load()
 
-    # fetch cartesia voices
-
-    headers = {
-        "X-API-Key": os.getenv("CARTESIA_API_KEY", ""),
-        "Cartesia-Version": "2024-08-01",
-        "Content-Type": "application/json",
-    }
-    response = requests.get("https://api.cartesia.ai/voices", headers=headers)
-    if response.status_code == 200:
-        proc.userdata["cartesia_voices"] = response.json()
-    else:
-        logger.warning(f"Failed to fetch Cartesia voices: {response.status_code}")
+    # Load cartesia voices from the shared on-disk cache (refreshed in the background when stale)
+    proc.userdata["voice_catalog"] = VoiceCatalog().load()
 
 
 async def entrypoint(ctx: JobContext):
-    cartesia_voices: List[dict[str, Any]] = ctx.proc.userdata["cartesia_voices"]
+    voice_catalog: VoiceCatalog = ctx.proc.userdata["voice_catalog"]
 
     # Create Deepgram STT with retry logic and error handling
     try:
-        stt = create_deepgram_stt_with_retry()
+        stt = await create_deepgram_stt_with_retry()
     except Exception as e:
         logger.error(f"❌ Failed to initialize Deepgram STT: {e}")
         logger.error("❌ Voice agent cannot continue without STT")
@@ -112,17 +103,8 @@ async def entrypoint(ctx: JobContext):
 
     await ctx.connect()
 
-    # Set voice listing as attribute for UI
-    voices = []
-    for voice in cartesia_voices:
-        voices.append(
-            {
-                "id": voice["id"],
-                "name": voice["name"],
-            }
-        )
-    voices.sort(key=lambda x: x["name"])
-    await ctx.room.local_participant.set_attributes({"voices": json.dumps(voices)})
+    # Set voice listing as attribute for UI (pre-serialized by the catalog)
+    await ctx.room.local_participant.set_attributes({"voices": voice_catalog.attribute_payload})
 
     # Generate initial greeting
     await session.generate_reply(
@@ -1,24 +1,49 @@
 import asyncio
 import json
 import os
-import requests
 
 from livekit import rtc
 from livekit.agents import JobContext, WorkerOptions, cli, JobProcess, Agent, AgentSession, RoomInputOptions
-from livekit.agents.llm import (
-    ChatContext,
-    ChatMessage,
-)
 from livekit.agents.log import logger
+from livekit.agents import metrics
 from livekit.plugins import deepgram, silero, cartesia, openai
+import random
 import time
-from typing import List, Any
+from typing import List, Any, Dict, Optional
 
 from dotenv import load_dotenv
+from voice_catalog import VoiceCatalog
 from knowledge_base import KnowledgeBase
+from kb_service import create_knowledge_base
+from latency import TurnLatencyTracker
+from rag_llm import RAGEnabledLLM
+from tts_cache import TTSAudioCache, audio_frames
 
 load_dotenv()
 
+TTS_MODEL = "sonic-2"
+# Optional Cartesia voice ID (the plugin's default voice otherwise)
+TTS_VOICE = os.getenv("CARTESIA_VOICE") or None
+
+# Spoken verbatim at session start; override with AGENT_GREETINGS='["...", "..."]'
+DEFAULT_GREETINGS = [
+    "Hi there! I have access to a specialized knowledge base. What can I help you with today?",
+    "Hello! I can answer questions using a specialized knowledge base. How can I help?",
+    "Hey! Ask me anything, I can look things up in my knowledge base for you.",
+]
+
+
+def create_tts():
+    """Cartesia TTS for the session (also synthesizes uncached greetings)"""
+    kwargs: Dict[str, Any] = {"model": TTS_MODEL}
+    if TTS_VOICE:
+        kwargs["voice"] = TTS_VOICE
+    return cartesia.TTS(**kwargs)
+
+
+def greetings_enabled() -> bool:
+    return os.getenv("TTS_CACHE", "").lower() in ("1", "true", "yes")
+
 
 class Assistant(Agent):
     def __init__(self) -> None:
@@ -34,8 +59,8 @@ When answering questions, you should:
 Remember, you're having a voice conversation, so avoid lengthy responses or complex formatting.""")
 
 
-def create_deepgram_stt_with_retry(max_retries=3, base_delay=1.0):
-    """Create Deepgram STT instance with retry logic and error handling"""
+async def create_deepgram_stt_with_retry(max_retries=3, base_delay=1.0):
+    """Create Deepgram STT instance with retry logic and error handling (backoff does not block the event loop)"""
     
     deepgram_key = os.getenv("DEEPGRAM_API_KEY")
     if not deepgram_key:
@@ -68,10 +93,10 @@ def create_deepgram_stt_with_retry(max_retries=3, base_delay=1.0):
                 logger.error("❌ All attempts to create Deepgram STT failed")
                 raise Exception(f"Failed to initialize Deepgram STT after {max_retries} attempts: {e}")
             
-            # Exponential backoff
-            delay = base_delay * (2 ** attempt)
-            logger.info(f"⏳ Retrying in {delay} seconds...")
-            time.sleep(delay)
+            # Exponential backoff with jitter, so agents started together do not retry in lockstep
+            delay = base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+            logger.info(f"⏳ Retrying in {delay:.2f} seconds...")
+            await asyncio.sleep(delay)
     
     # This should never be reached, but just in case
     raise Exception("Failed to create Deepgram STT instance")
@@ -81,101 +106,117 @@ def prewarm(proc: JobProcess):
     # preload models when process starts to speed up first interaction
     proc.userdata["vad"] = silero.VAD.load()
     
-    # Initialize knowledge base
-    proc.userdata["knowledge_base"] = KnowledgeBase()
-
-    # fetch cartesia voices
-    headers = {
-        "X-API-Key": os.getenv("CARTESIA_API_KEY", ""),
-        "Cartesia-Version": "2024-08-01",
-        "Content-Type": "application/json",
-    }
-    response = requests.get("https://api.cartesia.ai/voices", headers=headers)
-    if response.status_code == 200:
-        proc.userdata["cartesia_voices"] = response.json()
-    else:
-        logger.warning(f"Failed to fetch Cartesia voices: {response.status_code}")
+    # Initialize knowledge base (local, or the gateway's shared service if configured)
+    proc.userdata["knowledge_base"] = create_knowledge_base()
+
+    # Load cartesia voices from the shared on-disk cache (refreshed in the background when stale)
+    proc.userdata["voice_catalog"] = VoiceCatalog().load()
+
+    # Greeting audio: read from the shared on-disk cache so the greeting skips
+    # the LLM and TTS round trips (missing variants are synthesized by the job)
+    if greetings_enabled():
+        greetings = json.loads(os.getenv("AGENT_GREETINGS", "null")) or DEFAULT_GREETINGS
+        tts_cache = TTSAudioCache()
+        proc.userdata["greetings"] = greetings
+        proc.userdata["tts_cache"] = tts_cache
 
 
 async def entrypoint(ctx: JobContext):
     # Get knowledge base instance
     kb: KnowledgeBase = ctx.proc.userdata["knowledge_base"]
     
-    cartesia_voices: List[dict[str, Any]] = ctx.proc.userdata["cartesia_voices"]
+    voice_catalog: VoiceCatalog = ctx.proc.userdata["voice_catalog"]
 
     # Create Deepgram STT with retry logic and error handling
     try:
-        stt = create_deepgram_stt_with_retry()
+        stt = await create_deepgram_stt_with_retry()
     except Exception as e:
         logger.error(f"❌ Failed to initialize Deepgram STT: {e}")
         logger.error("❌ Voice agent cannot continue without STT")
         raise e
     
-    # Create a custom LLM wrapper that includes RAG
-    class RAGEnabledLLM:
-        def __init__(self, kb: KnowledgeBase, base_llm):
-            self.kb = kb
-            self.base_llm = base_llm
-        
-        async def chat(self, ctx: ChatContext, **kwargs):
-            # Get the last user message
-            last_user_message = None
-            for msg in reversed(ctx.messages):
-                if msg.role == "user":
-                    last_user_message = msg.content
-                    break
-            
-            # If we have a user message, search the knowledge base
-            if last_user_message:
-                # Get relevant context from knowledge base
-                kb_context = self.kb.get_context_for_query(last_user_message)
-                
-                if kb_context:
-                    # Create a new context with the knowledge base information
-                    enhanced_messages = ctx.messages.copy()
-                    
-                    # Insert knowledge base context before the last user message
-                    kb_message = ChatMessage(
-                        role="system",
-                        content=f"Knowledge Base Context:\n{kb_context}\n\nUse this information to answer the user's question if relevant."
-                    )
-                    
-                    # Find where to insert the KB context (right before the last user message)
-                    insert_index = len(enhanced_messages) - 1
-                    for i in range(len(enhanced_messages) - 1, -1, -1):
-                        if enhanced_messages[i].role == "user":
-                            insert_index = i
-                            break
-                    
-                    enhanced_messages.insert(insert_index, kb_message)
-                    
-                    # Create new context with enhanced messages
-                    enhanced_ctx = ChatContext(messages=enhanced_messages)
-                    
-                    logger.info(f"Added knowledge base context for query: {last_user_message[:50]}...")
-                    
-                    # Call the base LLM with enhanced context
-                    return await self.base_llm.chat(enhanced_ctx, **kwargs)
-            
-            # If no KB context needed, just use the base LLM
-            return await self.base_llm.chat(ctx, **kwargs)
-        
-        # Delegate other methods to base LLM
-        def __getattr__(self, name):
-            return getattr(self.base_llm, name)
+    # Per-turn latency tracing (exported on shutdown)
+    tracker = TurnLatencyTracker(
+        session_id=os.getenv("SESSION_ID", ctx.room.name),
+        trace_file=os.getenv("TURN_TRACE_FILE"),
+    )
     
     # Create RAG-enabled LLM
     base_llm = openai.LLM(model="gpt-4o-mini")
-    rag_llm = RAGEnabledLLM(kb, base_llm)
+    # Optional metadata filter restricting which documents the agent retrieves,
+    # e.g. KB_CONTEXT_FILTER='{"category": "products"}'
+    kb_filter = json.loads(os.getenv("KB_CONTEXT_FILTER", "null"))
+    # Optional semantic answer cache (RESPONSE_CACHE, hosted by the gateway with KB_SHARED_SERVICE)
+    rag_llm = RAGEnabledLLM(
+        kb, base_llm, tracker, kb_filter=kb_filter,
+        cache_answers=os.getenv("RESPONSE_CACHE", "").lower() in ("1", "true", "yes"),
+        cache_min_words=int(os.getenv("RESPONSE_CACHE_MIN_WORDS", 3)),
+    )
     
     # Create the agent session with all components
+    tts = create_tts()
     session = AgentSession(
         stt=stt,
         llm=rag_llm,
-        tts=cartesia.TTS(model="sonic-2"),
+        tts=tts,
         vad=ctx.proc.userdata["vad"],
     )
 
+    # Turn boundaries: user stops speaking -> agent starts speaking
+    @session.on("user_state_changed")
+    def _on_user_state_changed(ev):
+        if ev.old_state == "speaking" and ev.new_state == "listening":
+            tracker.start_turn()
+
+    @session.on("user_input_transcribed")
+    def _on_user_input_transcribed(ev):
+        if ev.is_final:
+            tracker.mark("stt_final")
+
+    @session.on("speech_created")
+    def _on_speech_created(ev):
+        tracker.bind_speech(ev.speech_handle.id)
+
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(ev):
+        if ev.new_state == "speaking":
+            tracker.end_turn()
+
+    # Stage durations measured by the framework itself, matched to their turn
+    # by speech ID (LLM and TTS metrics arrive after the agent starts speaking)
+    @session.on("metrics_collected")
+    def _on_metrics_collected(ev):
+        m = ev.metrics
+        if isinstance(m, metrics.EOUMetrics):
+            tracker.record_duration("end_of_utterance", m.end_of_utterance_delay, m.speech_id)
+        elif isinstance(m, metrics.LLMMetrics):
+            tracker.record_duration("llm_ttft", m.ttft, m.speech_id)
+        elif isinstance(m, metrics.TTSMetrics):
+            tracker.record_duration("tts_ttfb", m.ttfb, m.speech_id)
+
+    async def _export_turn_metrics():
+        tracker.flush()
+        for stage, stats in tracker.summary().items():
+            if stats["count"]:
+                logger.info(
+                    f"⏱️ {stage}: n={stats['count']} p50={stats['p50']:.3f}s "
+                    f"p95={stats['p95']:.3f}s p99={stats['p99']:.3f}s"
+                )
+        if rag_llm.cache_answers:
+            logger.info(f"💾 response cache: {rag_llm.cached_turns} turns answered from cache")
+            local_cache = getattr(kb, "response_cache", None)
+            if local_cache is not None:
+                logger.info(f"💾 response cache stats: {local_cache.stats()}")
+        metrics_file = os.getenv("TURN_METRICS_FILE")
+        if metrics_file:
+            try:
+                with open(metrics_file, "w", encoding="utf-8") as f:
+                    f.write(tracker.render_prometheus())
+            except OSError as e:
+                logger.warning(f"Failed to write turn metrics to {metrics_file}: {e}")
+
+    ctx.add_shutdown_callback(_export_turn_metrics)
+
     # Create the assistant agent
     assistant = Assistant()
 
@@ -187,22 +228,35 @@ async def entrypoint(ctx: JobContext):
 
     await ctx.connect()
 
-    # Set voice listing as attribute for UI
-    voices = []
-    for voice in cartesia_voices:
-        voices.append(
-            {
-                "id": voice["id"],
-                "name": voice["name"],
-            }
+    # Set voice listing as attribute for UI (pre-serialized by the catalog)
+    await ctx.room.local_participant.set_attributes({"voices": voice_catalog.attribute_payload})
+
+    tts_cache: Optional[TTSAudioCache] = ctx.proc.userdata.get("tts_cache")
+    if tts_cache is not None:
+        # Fixed greeting, played from pre-synthesized audio when available
+        greeting = random.choice(ctx.proc.userdata["greetings"])
+        audio = tts_cache.get(TTS_VOICE or "default", TTS_MODEL, greeting)
+        if audio is not None:
+            logger.info(f"🔊 Playing cached greeting ({audio.duration:.1f}s)")
+            session.say(greeting, audio=audio_frames(audio))
+        else:
+            session.say(greeting)
+
+        # Synthesize the variants not cached yet for later sessions, in this job's event loop
+        fill_task = asyncio.create_task(
+            tts_cache.fill(tts, TTS_VOICE or "default", TTS_MODEL, ctx.proc.userdata["greetings"]),
+            name="tts-cache-fill",
         )
-    voices.sort(key=lambda x: x["name"])
-    await ctx.room.local_participant.set_attributes({"voices": json.dumps(voices)})
 
-    # Generate initial greeting with knowledge base mention
-    await session.generate_reply(
-        instructions="Greet the user and mention that you have access to a specialized knowledge base. Offer your assistance."
-    )
+        async def _stop_fill():
+            fill_task.cancel()
+
+        ctx.add_shutdown_callback(_stop_fill)
+    else:
+        # Generate initial greeting with knowledge base mention
+        await session.generate_reply(
+            instructions="Greet the user and mention that you have access to a specialized knowledge base. Offer your assistance."
+        )
 
 
 if __name__ == "__main__":
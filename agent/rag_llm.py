@@ -0,0 +1,215 @@
+"""
+RAG-enabled LLM wrapper for the knowledge base voice agent
+Retrieves knowledge base context for the latest user message and forwards an
+enhanced chat context to the base LLM. With answer caching on, questions close
+to one answered before (for the same knowledge base content) are answered from
+the knowledge base's response cache without calling the LLM.
+"""
+
+import asyncio
+import json
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from livekit.agents.llm import (
+    ChatChunk,
+    ChatContext,
+    ChatMessage,
+    ChoiceDelta,
+)
+from livekit.agents.log import logger
+
+from latency import TurnLatencyTracker
+
+# Cached answers are streamed to TTS a sentence at a time
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class CachedResponseStream:
+    """LLM stream replaying a cached answer as assistant chunks"""
+    
+    def __init__(self, answer: str):
+        self.request_id = f"cached_{uuid.uuid4().hex[:12]}"
+        self._pieces = iter(_SENTENCE_END.split(answer))
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> ChatChunk:
+        for piece in self._pieces:
+            if piece:
+                return ChatChunk(id=self.request_id, delta=ChoiceDelta(role="assistant", content=piece + " "))
+        raise StopAsyncIteration
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.aclose()
+    
+    async def aclose(self):
+        self._pieces = iter(())
+
+
+class _RecordingStream:
+    """
+    Passes a base LLM stream through and reports the full answer once it completes
+    
+    Interrupted answers and answers that call tools are not reported.
+    """
+    
+    def __init__(self, stream, on_complete: Callable[[str], None]):
+        self._stream = stream
+        self._on_complete = on_complete
+        self._parts = []
+        self._used_tools = False
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            answer = "".join(self._parts).strip()
+            if answer and not self._used_tools:
+                self._on_complete(answer)
+            raise
+        delta = getattr(chunk, "delta", None)
+        if delta is not None:
+            if getattr(delta, "tool_calls", None):
+                self._used_tools = True
+            if delta.content:
+                self._parts.append(delta.content)
+        return chunk
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.aclose()
+    
+    async def aclose(self):
+        await self._stream.aclose()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class RAGEnabledLLM:
+    """
+    LLM wrapper that injects knowledge base context before the last user message
+    """
+    
+    def __init__(self, kb, base_llm, tracker: Optional[TurnLatencyTracker] = None,
+                 kb_filter: Optional[Dict[str, Any]] = None,
+                 cache_answers: bool = False, cache_min_words: int = 3):
+        """
+        Args:
+            kb: KnowledgeBase (or shared-service client) used for retrieval
+            base_llm: LLM the enhanced chat context is forwarded to
+            tracker: Optional per-turn latency tracker receiving retrieval timings
+            kb_filter: Optional metadata filter applied to every retrieval
+            cache_answers: Look up and store answers in the knowledge base's
+                response cache (see response_cache.py)
+            cache_min_words: Shorter user turns ("yes", "tell me more") depend on
+                the conversation so far and are never cached
+        """
+        self.kb = kb
+        self.base_llm = base_llm
+        self.tracker = tracker
+        self.kb_filter = kb_filter
+        self.cache_answers = cache_answers
+        self.cache_min_words = cache_min_words
+        # Answers generated under one filter are not valid for another
+        self.cache_scope = json.dumps(kb_filter, sort_keys=True) if kb_filter else ""
+        self.cached_turns = 0
+        self._store_tasks = set()
+    
+    def retrieve_context(self, query: str) -> str:
+        """Fetch formatted knowledge base context for a user message (timed)"""
+        retrieval_start = time.monotonic()
+        kb_context = self.kb.get_context_for_query(query, filter=self.kb_filter)
+        if self.tracker is not None:
+            self.tracker.record_duration("retrieval", time.monotonic() - retrieval_start)
+        return kb_context
+    
+    def _is_cacheable(self, message: str) -> bool:
+        return self.cache_answers and len(message.split()) >= self.cache_min_words
+    
+    def _store_answer(self, question: str, version: str, answer: str):
+        """Store a completed answer in the background"""
+        task = asyncio.create_task(
+            asyncio.to_thread(self.kb.store_answer, question, answer, version, self.cache_scope)
+        )
+        self._store_tasks.add(task)
+        task.add_done_callback(self._store_tasks.discard)
+    
+    async def chat(self, ctx: ChatContext, **kwargs):
+        # Get the last user message
+        last_user_message = None
+        for msg in reversed(ctx.messages):
+            if msg.role == "user":
+                last_user_message = msg.content
+                break
+        
+        # If we have a user message, search the knowledge base
+        if last_user_message:
+            cache_version = None
+            # After a tool call the answer depends on the tool output, not just the question
+            if ctx.messages[-1].role == "user" and self._is_cacheable(last_user_message):
+                # Retrieval runs alongside the cache lookup, so a miss costs no extra latency
+                (cached_answer, cache_version), kb_context = await asyncio.gather(
+                    asyncio.to_thread(self.kb.lookup_answer, last_user_message, self.cache_scope),
+                    asyncio.to_thread(self.retrieve_context, last_user_message),
+                )
+                if cached_answer is not None:
+                    self.cached_turns += 1
+                    logger.info(f"Answered from response cache: {last_user_message[:50]}...")
+                    return CachedResponseStream(cached_answer)
+            else:
+                # Get relevant context from knowledge base (off the event loop:
+                # the shared-service client and local index both block)
+                kb_context = await asyncio.to_thread(self.retrieve_context, last_user_message)
+            
+            if kb_context:
+                # Create a new context with the knowledge base information
+                enhanced_messages = ctx.messages.copy()
+                
+                # Insert knowledge base context before the last user message
+                kb_message = ChatMessage(
+                    role="system",
+                    content=f"Knowledge Base Context:\n{kb_context}\n\nUse this information to answer the user's question if relevant."
+                )
+                
+                # Find where to insert the KB context (right before the last user message)
+                insert_index = len(enhanced_messages) - 1
+                for i in range(len(enhanced_messages) - 1, -1, -1):
+                    if enhanced_messages[i].role == "user":
+                        insert_index = i
+                        break
+                
+                enhanced_messages.insert(insert_index, kb_message)
+                
+                # Create new context with enhanced messages
+                enhanced_ctx = ChatContext(messages=enhanced_messages)
+                
+                logger.info(f"Added knowledge base context for query: {last_user_message[:50]}...")
+                
+                # Call the base LLM with enhanced context
+                stream = await self.base_llm.chat(enhanced_ctx, **kwargs)
+                if cache_version is not None:
+                    # Only answers grounded in knowledge base context are cached
+                    return _RecordingStream(
+                        stream, lambda answer: self._store_answer(last_user_message, cache_version, answer)
+                    )
+                return stream
+        
+        # If no KB context needed, just use the base LLM
+        return await self.base_llm.chat(ctx, **kwargs)
+    
+    # Delegate other methods to base LLM
+    def __getattr__(self, name):
+        return getattr(self.base_llm, name)
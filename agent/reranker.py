@@ -0,0 +1,212 @@
+"""
+Reranking of retrieved knowledge base candidates
+Over-fetched vector search results are rescored by a cheap lexical-overlap
+scorer or a local CPU cross-encoder so fewer, better documents reach the LLM.
+A latency cap falls back to the original distance order if the reranker is slow.
+"""
+
+import logging
+import math
+import os
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("livekit.agents")
+
+RERANKERS = ("none", "lexical", "cross-encoder")
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Without KB_RERANK_TIMEOUT_MS the latency cap is this multiple of the scorer's
+# measured latency on this host, and never below MIN_TIMEOUT
+TIMEOUT_HEADROOM = 2.0
+MIN_TIMEOUT = 0.05
+CALIBRATION_RUNS = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it me my of on or our "
+    "the to we what when where which who why with you your".split()
+)
+
+
+def _tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class LexicalReranker:
+    """
+    Combines vector similarity with IDF-weighted query term overlap
+
+    IDF is computed over the candidate set only, so no corpus statistics are
+    needed and scoring 20 candidates takes well under a millisecond.
+    """
+
+    name = "lexical"
+
+    def __init__(self, lexical_weight: float = 0.5):
+        """
+        Args:
+            lexical_weight: Weight of the normalized overlap score relative to similarity
+        """
+        self.lexical_weight = lexical_weight
+
+    def score(self, query: str, documents: List[Dict[str, Any]]) -> List[float]:
+        query_terms = set(_tokenize(query))
+        doc_terms = [set(_tokenize(doc.get("content", ""))) for doc in documents]
+        n_docs = len(documents)
+
+        idf = {}
+        for term in query_terms:
+            df = sum(1 for terms in doc_terms if term in terms)
+            idf[term] = math.log(1.0 + n_docs / (1.0 + df))
+        max_overlap = sum(idf.values()) or 1.0
+
+        scores = []
+        for doc, terms in zip(documents, doc_terms):
+            overlap = sum(weight for term, weight in idf.items() if term in terms) / max_overlap
+            distance = doc.get("distance")
+            similarity = -distance if distance is not None else 0.0
+            scores.append(similarity + self.lexical_weight * overlap)
+        return scores
+
+
+class CrossEncoderReranker:
+    """Scores (query, document) pairs with a local sentence-transformers cross-encoder"""
+
+    name = "cross-encoder"
+
+    def __init__(self, model_name: str = DEFAULT_CROSS_ENCODER):
+        # Optional dependency: only needed when this reranker is selected
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, query: str, documents: List[Dict[str, Any]]) -> List[float]:
+        pairs = [(query, doc.get("content", "")) for doc in documents]
+        return [float(s) for s in self.model.predict(pairs)]
+
+
+class RerankStage:
+    """
+    Over-fetch, rerank and truncate retrieved documents under a latency cap
+
+    If scoring does not finish within `timeout` seconds (or fails), the
+    candidates are returned in their original distance order instead. A
+    timed-out call keeps the scoring thread busy until it finishes; queries
+    arriving meanwhile skip reranking rather than queue behind it.
+    """
+
+    def __init__(self, scorer, candidates: int = 20, top_k: int = 3, timeout: float = MIN_TIMEOUT):
+        """
+        Args:
+            scorer: Object with score(query, documents) -> List[float]
+            candidates: Number of documents to fetch from the vector search
+            top_k: Number of documents kept after reranking
+            timeout: Latency cap in seconds
+        """
+        self.scorer = scorer
+        self.candidates = candidates
+        self.top_k = top_k
+        self.timeout = timeout
+        self.fallbacks = 0
+        self.skipped = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-rerank")
+        self._running: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def calibrate(self) -> float:
+        """
+        Measure the scorer on a full candidate set and derive the latency cap
+
+        The first call also loads the model's weights into the cache, so
+        queries do not pay for it. Returns the median latency in seconds.
+        """
+        query = "how do I reset my password"
+        documents = [
+            {"content": f"Document {i} explains account settings, billing and password recovery steps.",
+             "distance": i / self.candidates}
+            for i in range(self.candidates)
+        ]
+        self.scorer.score(query, documents)
+        samples = []
+        for _ in range(CALIBRATION_RUNS):
+            start = time.perf_counter()
+            self.scorer.score(query, documents)
+            samples.append(time.perf_counter() - start)
+        measured = statistics.median(samples)
+        self.timeout = max(MIN_TIMEOUT, measured * TIMEOUT_HEADROOM)
+        logger.info(f"{self.scorer.name} reranker scores {self.candidates} candidates in "
+                    f"{measured * 1000:.1f}ms; latency cap {self.timeout * 1000:.0f}ms")
+        return measured
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if len(documents) <= 1:
+            return documents[:self.top_k]
+
+        start = time.perf_counter()
+        with self._lock:
+            if self._running is not None and not self._running.done():
+                self.skipped += 1
+                logger.warning("Reranker still busy with an earlier query; using distance order")
+                return documents[:self.top_k]
+            future = self._executor.submit(self.scorer.score, query, documents)
+            self._running = future
+        try:
+            scores = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.fallbacks += 1
+            logger.warning(f"Reranker exceeded {self.timeout * 1000:.0f}ms; using distance order")
+            return documents[:self.top_k]
+        except Exception as e:
+            self.fallbacks += 1
+            logger.warning(f"Reranker failed ({e}); using distance order")
+            return documents[:self.top_k]
+
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+        reranked = []
+        for i in order[:self.top_k]:
+            doc = dict(documents[i])
+            doc["rerank_score"] = scores[i]
+            reranked.append(doc)
+        logger.debug(f"Reranked {len(documents)} candidates in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return reranked
+
+
+def create_rerank_stage(kind: Optional[str] = None) -> Optional[RerankStage]:
+    """
+    Build the rerank stage configured by the environment
+
+    KB_RERANKER selects none (default), lexical or cross-encoder;
+    KB_RERANK_CANDIDATES, KB_RERANK_TOP_K and KB_RERANK_TIMEOUT_MS tune it.
+    Without KB_RERANK_TIMEOUT_MS the latency cap is measured on this host.
+    """
+    kind = (kind or os.getenv("KB_RERANKER", "none")).lower()
+    if kind not in RERANKERS:
+        raise ValueError(f"Unknown reranker: {kind}. Expected one of {RERANKERS}")
+    if kind == "none":
+        return None
+
+    if kind == "cross-encoder":
+        try:
+            scorer = CrossEncoderReranker(os.getenv("KB_CROSS_ENCODER_MODEL", DEFAULT_CROSS_ENCODER))
+        except ImportError:
+            logger.warning("sentence-transformers is not installed; falling back to lexical reranking")
+            scorer = LexicalReranker()
+    else:
+        scorer = LexicalReranker()
+
+    stage = RerankStage(
+        scorer,
+        candidates=int(os.getenv("KB_RERANK_CANDIDATES", 20)),
+        top_k=int(os.getenv("KB_RERANK_TOP_K", 3)),
+    )
+    timeout_ms = os.getenv("KB_RERANK_TIMEOUT_MS")
+    if timeout_ms:
+        stage.timeout = float(timeout_ms) / 1000.0
+    else:
+        stage.calibrate()
+    return stage
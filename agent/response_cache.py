@@ -0,0 +1,170 @@
+"""
+Semantic response cache for the knowledge base voice agent
+Stores LLM answers keyed by the embedding of the user turn that produced them,
+so a near-identical question asked again (by any session) is answered from
+memory instead of another LLM call. Entries are scoped (collection plus
+retrieval filter), expire after a TTL and are only served for the knowledge
+base version they were generated from.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("livekit.agents")
+
+# Query vectors kept between a lookup and the store of its answer
+PENDING_VECTORS = 256
+
+
+@dataclass
+class _Entry:
+    vector: np.ndarray
+    answer: str
+    version: str
+    created_at: float
+
+
+class SemanticResponseCache:
+    """
+    Answers indexed by normalized query embeddings
+
+    A lookup returns the answer whose query is most similar to the new one,
+    if the cosine similarity reaches `threshold`. Entries from another
+    knowledge base version or older than `ttl` seconds are dropped when their
+    scope is next looked up. Thread-safe: the gateway serves lookups from
+    worker threads.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl: float = 3600.0, max_entries: int = 1000):
+        """
+        Args:
+            threshold: Minimum cosine similarity between questions to reuse an answer
+            ttl: Seconds an answer may be served after it was generated
+            max_entries: Answers kept across all scopes (least recently used dropped first)
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        # Per-scope (keys, stacked vectors), rebuilt after the scope changes
+        self._matrices: Dict[str, Tuple[List[Tuple[str, str]], np.ndarray]] = {}
+        self._pending: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def lookup(self, query: str, vector: np.ndarray, scope: str, version: str) -> Optional[str]:
+        """
+        Cached answer for a question, or None
+
+        Args:
+            query: The user's question (remembered with `vector` for a later store)
+            vector: L2-normalized embedding of the question
+            scope: Cache partition, e.g. collection and retrieval filter
+            version: Current knowledge base version
+        """
+        with self._lock:
+            self._pending[(scope, query)] = vector
+            while len(self._pending) > PENDING_VECTORS:
+                self._pending.popitem(last=False)
+
+            self._drop_stale(scope, version)
+            matrix = self._scope_matrix(scope)
+            if matrix is not None:
+                keys, vectors = matrix
+                scores = vectors @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]].answer
+            self.misses += 1
+            return None
+
+    def pending_vector(self, query: str, scope: str) -> Optional[np.ndarray]:
+        """Embedding computed for `query` by its lookup, if still remembered"""
+        with self._lock:
+            return self._pending.pop((scope, query), None)
+
+    def store(self, query: str, vector: np.ndarray, answer: str, scope: str, version: str):
+        """Remember the answer generated for a question"""
+        with self._lock:
+            key = (scope, query)
+            self._entries[key] = _Entry(vector, answer, version, time.monotonic())
+            self._entries.move_to_end(key)
+            self._matrices.pop(scope, None)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                (evicted_scope, _), _ = self._entries.popitem(last=False)
+                self._matrices.pop(evicted_scope, None)
+                self.evictions += 1
+
+    def invalidate(self, scope: Optional[str] = None):
+        """Drop every answer (or those of one scope)"""
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+                self._matrices.clear()
+                return
+            for key in [key for key in self._entries if key[0] == scope]:
+                del self._entries[key]
+            self._matrices.pop(scope, None)
+
+    def _drop_stale(self, scope: str, version: str):
+        expires_before = time.monotonic() - self.ttl
+        stale = [
+            key for key, entry in self._entries.items()
+            if key[0] == scope and (entry.version != version or entry.created_at < expires_before)
+        ]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._matrices.pop(scope, None)
+
+    def _scope_matrix(self, scope: str) -> Optional[Tuple[List[Tuple[str, str]], np.ndarray]]:
+        matrix = self._matrices.get(scope)
+        if matrix is None:
+            keys = [key for key in self._entries if key[0] == scope]
+            if not keys:
+                return None
+            matrix = (keys, np.stack([self._entries[key].vector for key in keys]))
+            self._matrices[scope] = matrix
+        return matrix
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+def create_response_cache() -> Optional[SemanticResponseCache]:
+    """Response cache configured by RESPONSE_CACHE* environment variables (None unless enabled)"""
+    if os.getenv("RESPONSE_CACHE", "").lower() not in ("1", "true", "yes"):
+        return None
+    return SemanticResponseCache(
+        threshold=float(os.getenv("RESPONSE_CACHE_THRESHOLD", 0.92)),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", 3600)),
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", 1000)),
+    )
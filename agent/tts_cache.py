@@ -0,0 +1,191 @@
+"""
+Pre-synthesized TTS audio for fixed utterances
+Greetings and other phrases the agent says verbatim are synthesized once,
+stored as WAV files shared by every agent process on the host and kept in a
+small in-memory LRU, then played straight into the session. The first audio
+of a session no longer waits for an LLM generation and a TTS round trip.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import wave
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Optional
+
+from livekit import rtc
+
+logger = logging.getLogger("livekit.agents")
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "tts_cache")
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+
+# Duration of each frame pushed into the session when playing cached audio
+FRAME_MS = 20
+
+
+@dataclass
+class CachedAudio:
+    """16-bit PCM audio of one utterance"""
+    pcm: bytes
+    sample_rate: int
+    num_channels: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (2 * self.num_channels * self.sample_rate)
+
+
+class TTSAudioCache:
+    """
+    Synthesized utterances keyed by (voice, model, text)
+
+    Lookups check the in-memory LRU, then the cache directory. Files are
+    written to a temp name and renamed, so concurrent agent processes never
+    read a partial file.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_memory_bytes: Optional[int] = None):
+        """
+        Args:
+            directory: Cache directory shared by all processes on the host
+                (defaults to TTS_CACHE_DIR, then <tmpdir>/tts_cache)
+            max_memory_bytes: Audio kept in memory (defaults to TTS_CACHE_MEMORY_MB, then 32 MB)
+        """
+        self.directory = directory or os.getenv("TTS_CACHE_DIR", DEFAULT_CACHE_DIR)
+        if max_memory_bytes is None:
+            max_memory_bytes = int(float(os.getenv("TTS_CACHE_MEMORY_MB", 0)) * 1024 * 1024) or DEFAULT_MEMORY_BYTES
+        self.max_memory_bytes = max_memory_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, CachedAudio]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(voice: str, model: str, text: str) -> str:
+        return hashlib.sha256(json.dumps([voice, model, text.strip()]).encode("utf-8")).hexdigest()[:32]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, voice: str, model: str, text: str) -> Optional[CachedAudio]:
+        """Cached audio for an utterance, or None"""
+        key = self.key(voice, model, text)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        audio = self._read(key)
+        if audio is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, audio)
+        return audio
+
+    def put(self, voice: str, model: str, text: str, audio: CachedAudio):
+        """Store an utterance in memory and on disk"""
+        key = self.key(voice, model, text)
+        self._remember(key, audio)
+        self._write(key, audio)
+
+    def _remember(self, key: str, audio: CachedAudio):
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous.pcm)
+            self._memory[key] = audio
+            self._memory_bytes += len(audio.pcm)
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted.pcm)
+
+    def _read(self, key: str) -> Optional[CachedAudio]:
+        path = self._path(key)
+        try:
+            with wave.open(path, "rb") as f:
+                if f.getsampwidth() != 2:
+                    raise wave.Error(f"unexpected sample width {f.getsampwidth()}")
+                return CachedAudio(f.readframes(f.getnframes()), f.getframerate(), f.getnchannels())
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, wave.Error) as e:
+            logger.warning(f"Ignoring unreadable TTS cache file {path}: {e}")
+            return None
+
+    def _write(self, key: str, audio: CachedAudio):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{key}.")
+            with os.fdopen(fd, "wb") as raw, wave.open(raw, "wb") as f:
+                f.setnchannels(audio.num_channels)
+                f.setsampwidth(2)
+                f.setframerate(audio.sample_rate)
+                f.writeframes(audio.pcm)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.warning(f"Failed to write TTS cache file for {key}: {e}")
+
+    async def synthesize(self, tts, voice: str, model: str, text: str) -> CachedAudio:
+        """Return cached audio for `text`, synthesizing and storing it on a miss"""
+        audio = self.get(voice, model, text)
+        if audio is not None:
+            return audio
+
+        chunks = []
+        sample_rate, num_channels = tts.sample_rate, tts.num_channels
+        async with tts.synthesize(text) as stream:
+            async for event in stream:
+                chunks.append(bytes(event.frame.data))
+                sample_rate, num_channels = event.frame.sample_rate, event.frame.num_channels
+        audio = CachedAudio(b"".join(chunks), sample_rate, num_channels)
+        self.put(voice, model, text, audio)
+        return audio
+
+    async def fill(self, tts, voice: str, model: str, texts: Iterable[str]) -> int:
+        """
+        Synthesize the utterances not cached yet
+
+        Args:
+            tts: TTS to synthesize with, bound to the running event loop
+            voice: Voice identifier used in the cache key
+            model: TTS model used in the cache key
+            texts: Utterances to have ready
+
+        Returns:
+            Number of utterances synthesized
+        """
+        synthesized = 0
+        for text in texts:
+            if self.get(voice, model, text) is not None:
+                continue
+            try:
+                await self.synthesize(tts, voice, model, text)
+                synthesized += 1
+            except Exception as e:
+                logger.warning(f"Failed to pre-synthesize {text[:40]!r}: {e}")
+        if synthesized:
+            logger.info(f"Pre-synthesized {synthesized} utterances into {self.directory}")
+        return synthesized
+
+
+async def audio_frames(audio: CachedAudio, frame_ms: int = FRAME_MS) -> AsyncIterator[rtc.AudioFrame]:
+    """Cached audio as a stream of fixed-size frames for AgentSession.say(audio=...)"""
+    samples_per_channel = audio.sample_rate * frame_ms // 1000
+    step = samples_per_channel * audio.num_channels * 2
+    for start in range(0, len(audio.pcm), step):
+        chunk = audio.pcm[start:start + step]
+        yield rtc.AudioFrame(
+            data=chunk,
+            sample_rate=audio.sample_rate,
+            num_channels=audio.num_channels,
+            samples_per_channel=len(chunk) // (2 * audio.num_channels),
+        )
@@ -0,0 +1,700 @@
+"""
+Memory-mapped exact vector index backed by NumPy
+A lightweight alternative to ChromaDB for small to mid-sized knowledge bases:
+normalized embeddings live in contiguous .npy matrices (float32, float16 or
+int8 with per-vector scales) opened with mmap, next to JSON metadata sidecars.
+Compact indexes can keep a float32 copy on disk to rescore a shortlist.
+Implements the subset of the ChromaDB Collection API used by KnowledgeBase.
+
+Each add writes its rows as a new immutable segment; deletions are recorded
+as row tombstones. The index file lists the live segments and is replaced
+with a single os.replace, so it is the commit point of every generation.
+Tail segments are merged as they grow (and tombstoned rows purged), keeping
+O(log n) segments without rewriting the whole index on every write.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+INDEX_FILE = "index.json"
+INDEX_FORMAT_VERSION = 2
+
+# Single-matrix layout written by earlier releases; opened as one segment
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+FULL_VECTORS_FILE = "vectors_full.npy"
+METADATA_FILE = "meta.json"
+LEGACY_SEGMENT = "legacy"
+
+# Rows scored per step when the stored dtype has to be widened to float32
+SCORE_CHUNK_ROWS = 16384
+
+# Rows copied per step when segments are merged
+COPY_CHUNK_ROWS = 16384
+
+# Share of tombstoned rows above which every segment is rewritten
+MAX_DELETED_FRACTION = 0.25
+
+# Attempts to open a generation whose segments a concurrent merge removed
+OPEN_ATTEMPTS = 3
+
+
+class OpenAIEmbedder:
+    """Embedding function calling the OpenAI embeddings API directly"""
+
+    # Maximum number of inputs accepted per embeddings request
+    MAX_BATCH = 2048
+
+    def __init__(self, api_key: str, model_name: str = "text-embedding-3-small",
+                 dimensions: Optional[int] = None):
+        import openai
+
+        self.client = openai.OpenAI(api_key=api_key)
+        self.model_name = model_name
+        # text-embedding-3 models can return shortened embeddings
+        self.dimensions = dimensions
+
+    def __call__(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = []
+        for start in range(0, len(texts), self.MAX_BATCH):
+            kwargs = {"dimensions": self.dimensions} if self.dimensions else {}
+            response = self.client.embeddings.create(
+                model=self.model_name,
+                input=list(texts[start:start + self.MAX_BATCH]),
+                **kwargs
+            )
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row (zero rows are left as zeros)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray, dtype: str):
+    """
+    Convert normalized float32 rows to the storage dtype
+
+    Returns:
+        (stored_matrix, per_row_scales or None)
+    """
+    if dtype == "float32":
+        return vectors.astype(np.float32), None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        stored = np.round(vectors / scales[:, None]).astype(np.int8)
+        return stored, scales.astype(np.float32)
+    raise ValueError(f"Unsupported index dtype: {dtype}. Expected one of {SUPPORTED_DTYPES}")
+
+
+def segment_files(name: str) -> Dict[str, str]:
+    """File names holding a segment's vectors, scales, float32 copy and metadata"""
+    if name == LEGACY_SEGMENT:
+        return {"vectors": VECTORS_FILE, "scales": SCALES_FILE,
+                "full": FULL_VECTORS_FILE, "meta": METADATA_FILE}
+    return {kind: f"seg-{name}.{kind}.{'json' if kind == 'meta' else 'npy'}"
+            for kind in ("vectors", "scales", "full", "meta")}
+
+
+def _write_atomically(directory: str, filename: str, write: Callable[[str], None]):
+    """Write a file under a temporary name and move it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{filename}.")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, os.path.join(directory, filename))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _save_array(array: np.ndarray) -> Callable[[str], None]:
+    def write(path: str):
+        with open(path, "wb") as f:
+            np.save(f, np.ascontiguousarray(array))
+    return write
+
+
+def _save_json(value: Any) -> Callable[[str], None]:
+    def write(path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            # json.dumps uses the C encoder; json.dump to a file does not
+            f.write(json.dumps(value))
+    return write
+
+
+class Segment(NamedTuple):
+    """Rows written together; files never change once the segment is published"""
+    name: str
+    vectors: np.ndarray
+    scales: Optional[np.ndarray]
+    full: Optional[np.ndarray]
+    ids: List[str]
+    documents: List[str]
+    metadatas: List[Dict[str, Any]]
+    # Rows that are not tombstoned, ascending (None: every row)
+    live: Optional[np.ndarray]
+
+    @property
+    def live_count(self) -> int:
+        return len(self.ids) if self.live is None else len(self.live)
+
+    def live_rows(self) -> np.ndarray:
+        return np.arange(len(self.ids)) if self.live is None else self.live
+
+
+class IndexGeneration(NamedTuple):
+    """One committed version of the index; replaced as a whole, never mutated"""
+    manifest: Dict[str, Any]
+    segments: Tuple[Segment, ...]
+    # Live documents in insertion order; a document's position indexes all three
+    ids: List[str]
+    documents: List[str]
+    metadatas: List[Dict[str, Any]]
+    rows: Dict[str, int]
+    # Position of each segment's first live row (one extra entry: the total)
+    offsets: np.ndarray
+
+
+def _empty_manifest(dtype: str) -> Dict[str, Any]:
+    return {"format_version": INDEX_FORMAT_VERSION, "dtype": dtype, "dim": None,
+            "next_segment": 1, "segments": []}
+
+
+class NumpyVectorIndex:
+    """
+    Exact cosine-similarity index over memory-mapped embedding segments
+
+    Reads are served from the mmaps (shared page cache across processes).
+    Writes add a segment or tombstone rows and publish a new index file;
+    readers never see a generation half written.
+
+    With a compact dtype and `rescore_factor` > 0, a float32 copy of every
+    vector is also written. A query then scans the compact matrices for the
+    best `n_results * rescore_factor` rows and reorders only those by their
+    float32 vectors. The full-precision files stay on disk; only the pages
+    of shortlisted rows are read.
+    """
+
+    def __init__(self,
+                 path: str,
+                 name: str,
+                 embedding_function: Callable[[Sequence[str]], Any],
+                 dtype: str = "float32",
+                 rescore_factor: int = 0):
+        """
+        Args:
+            path: Directory holding the segment and index files
+            name: Collection name (reported like a ChromaDB collection)
+            embedding_function: Callable mapping a list of texts to vectors
+            dtype: Storage dtype for new indexes (float32, float16 or int8)
+            rescore_factor: Shortlist size per result for full-precision
+                rescoring of compact indexes (0 disables)
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported index dtype: {dtype}. Expected one of {SUPPORTED_DTYPES}")
+
+        self.path = path
+        self.name = name
+        self.embedding_function = embedding_function
+        self.dtype = dtype
+        self.rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+
+        self._set_state(_empty_manifest(dtype), ())
+        self._open()
+
+    def _set_state(self, manifest: Dict[str, Any], segments: Tuple[Segment, ...]):
+        # Readers take `_state` once, so they never mix two generations
+        previous = getattr(self, "_state", None)
+        if (previous is not None and previous.segments and len(segments) > len(previous.segments)
+                and all(new is old for new, old in zip(segments, previous.segments))):
+            # Appended segments only: extend copies of the previous generation's lists
+            ids, documents, metadatas = list(previous.ids), list(previous.documents), list(previous.metadatas)
+            rows = previous.rows.copy()
+            offsets = previous.offsets.tolist()
+            for segment in segments[len(previous.segments):]:
+                rows.update(zip(segment.ids, range(len(ids), len(ids) + len(segment.ids))))
+                ids += segment.ids
+                documents += segment.documents
+                metadatas += segment.metadatas
+                offsets.append(len(ids))
+            self._state = IndexGeneration(manifest, segments, ids, documents, metadatas, rows,
+                                          np.asarray(offsets, dtype=np.int64))
+            return
+
+        ids = []
+        documents = []
+        metadatas = []
+        offsets = [0]
+        for segment in segments:
+            if segment.live is None:
+                ids += segment.ids
+                documents += segment.documents
+                metadatas += segment.metadatas
+            else:
+                for row in segment.live:
+                    ids.append(segment.ids[row])
+                    documents.append(segment.documents[row])
+                    metadatas.append(segment.metadatas[row])
+            offsets.append(len(ids))
+        rows = dict(zip(ids, range(len(ids))))
+        self._state = IndexGeneration(manifest, segments, ids, documents, metadatas, rows,
+                                      np.asarray(offsets, dtype=np.int64))
+
+    @property
+    def generation(self) -> IndexGeneration:
+        """The current generation (read it once and use its fields together)"""
+        return self._state
+
+    @property
+    def keeps_full_precision(self) -> bool:
+        return self.rescore_factor > 0 and self.dtype != "float32"
+
+    @property
+    def dim(self) -> Optional[int]:
+        """Embedding dimensions of the stored vectors (None while empty)"""
+        return self._state.manifest["dim"]
+
+    @property
+    def ids(self) -> List[str]:
+        return self._state.ids
+
+    def row_of(self, doc_id: str) -> Optional[int]:
+        """Position of a document in the current generation"""
+        return self._state.rows.get(doc_id)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the mapped matrices and their scales (full-precision files are read on demand)"""
+        return sum(
+            segment.vectors.nbytes + (segment.scales.nbytes if segment.scales is not None else 0)
+            for segment in self._state.segments
+        )
+
+    # -- Persistence --------------------------------------------------------
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        """Identity of the committed index file (each publish creates a new inode)"""
+        for filename in (INDEX_FILE, METADATA_FILE):
+            try:
+                stat = os.stat(os.path.join(self.path, filename))
+            except FileNotFoundError:
+                continue
+            return stat.st_mtime_ns, stat.st_ino
+        return None
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        """The committed index file, or one describing a single-matrix index of an earlier release"""
+        try:
+            with open(os.path.join(self.path, INDEX_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+        try:
+            with open(os.path.join(self.path, METADATA_FILE), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        manifest = _empty_manifest(meta.get("dtype", self.dtype))
+        manifest.update(format_version=1, dim=meta.get("dim"))
+        if meta["ids"]:
+            manifest["segments"] = [{"name": LEGACY_SEGMENT, "rows": len(meta["ids"]),
+                                     "full_precision": bool(meta.get("full_precision")), "deleted": []}]
+        return manifest
+
+    def _load_segment(self, entry: Dict[str, Any], opened: Dict[str, Segment]) -> Segment:
+        live = None
+        if entry.get("deleted"):
+            live = np.setdiff1d(np.arange(entry["rows"]), entry["deleted"])
+        if entry["name"] in opened:
+            # Segment files never change: only its tombstones can be new
+            segment = opened[entry["name"]]
+            if live is None and segment.live is None:
+                return segment
+            return segment._replace(live=live)
+
+        files = segment_files(entry["name"])
+        with open(os.path.join(self.path, files["meta"]), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(os.path.join(self.path, files["vectors"]), mmap_mode="r")
+        scales = full = None
+        if self.dtype == "int8":
+            scales = np.load(os.path.join(self.path, files["scales"]), mmap_mode="r")
+        if entry.get("full_precision"):
+            full = np.load(os.path.join(self.path, files["full"]), mmap_mode="r")
+        return Segment(entry["name"], vectors, scales, full, meta["ids"], meta["documents"],
+                       meta["metadatas"], live)
+
+    def _open(self):
+        """Open the committed generation (if any) read-only via mmap"""
+        for attempt in range(OPEN_ATTEMPTS):
+            stamp = self._file_stamp()
+            manifest = self._read_manifest()
+            if manifest is None:
+                return
+            self.dtype = manifest["dtype"]
+            opened = {segment.name: segment for segment in self._state.segments}
+            try:
+                segments = tuple(self._load_segment(entry, opened) for entry in manifest["segments"])
+            except FileNotFoundError:
+                # A merge in another process removed segments of the index just read
+                if attempt == OPEN_ATTEMPTS - 1:
+                    raise
+                continue
+            self._stamp = stamp
+            self._set_state(manifest, segments)
+            return
+
+    def reload_if_changed(self) -> bool:
+        """Re-open the index if another process committed a new generation"""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        with self._lock:
+            self._open()
+        return True
+
+    def _write_segment(self, manifest: Dict[str, Any], vectors: np.ndarray, scales: Optional[np.ndarray],
+                       full: Optional[np.ndarray], ids: List[str], documents: List[str],
+                       metadatas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Write rows as a new segment (not yet published); returns its index entry"""
+        name = f"{manifest['next_segment']:08d}"
+        manifest["next_segment"] += 1
+        files = segment_files(name)
+        _write_atomically(self.path, files["vectors"], _save_array(vectors))
+        if scales is not None:
+            _write_atomically(self.path, files["scales"], _save_array(scales))
+        if full is not None:
+            _write_atomically(self.path, files["full"], _save_array(full))
+        _write_atomically(self.path, files["meta"], _save_json(
+            {"ids": ids, "documents": documents, "metadatas": metadatas}
+        ))
+        return {"name": name, "rows": len(ids), "full_precision": full is not None, "deleted": []}
+
+    def _merge_segments(self, manifest: Dict[str, Any], segments: Sequence[Segment]) -> Dict[str, Any]:
+        """Write the live rows of `segments` as one new segment, copying in bounded chunks"""
+        name = f"{manifest['next_segment']:08d}"
+        manifest["next_segment"] += 1
+        files = segment_files(name)
+        count = sum(segment.live_count for segment in segments)
+        keep_full = all(segment.full is not None for segment in segments)
+
+        def copy_rows(field: str):
+            def write(path: str):
+                first = getattr(segments[0], field)
+                out = np.lib.format.open_memmap(path, mode="w+", dtype=first.dtype,
+                                                shape=(count,) + first.shape[1:])
+                position = 0
+                for segment in segments:
+                    source, live = getattr(segment, field), segment.live_rows()
+                    for start in range(0, len(live), COPY_CHUNK_ROWS):
+                        rows = live[start:start + COPY_CHUNK_ROWS]
+                        out[position:position + len(rows)] = source[rows]
+                        position += len(rows)
+                out.flush()
+                del out
+            _write_atomically(self.path, files[field], write)
+
+        copy_rows("vectors")
+        if segments[0].scales is not None:
+            copy_rows("scales")
+        if keep_full:
+            copy_rows("full")
+        meta = {"ids": [], "documents": [], "metadatas": []}
+        for segment in segments:
+            for row in segment.live_rows():
+                meta["ids"].append(segment.ids[row])
+                meta["documents"].append(segment.documents[row])
+                meta["metadatas"].append(segment.metadatas[row])
+        _write_atomically(self.path, files["meta"], _save_json(meta))
+        return {"name": name, "rows": count, "full_precision": keep_full, "deleted": []}
+
+    def _publish(self, manifest: Dict[str, Any]):
+        """Commit a new generation with one os.replace of the index file, then drop unused segments"""
+        previous = self._state.manifest
+        manifest["format_version"] = INDEX_FORMAT_VERSION
+        _write_atomically(self.path, INDEX_FILE, _save_json(manifest))
+        self._open()
+
+        # Processes still reading these keep their mmaps; later opens retry
+        kept = {entry["name"] for entry in manifest["segments"]}
+        obsolete = [entry["name"] for entry in previous["segments"] if entry["name"] not in kept]
+        if previous.get("format_version") == 1 and LEGACY_SEGMENT not in kept | set(obsolete):
+            obsolete.append(LEGACY_SEGMENT)
+        for name in obsolete:
+            for filename in segment_files(name).values():
+                try:
+                    os.remove(os.path.join(self.path, filename))
+                except FileNotFoundError:
+                    pass
+
+    def _compact(self):
+        """
+        Merge tail segments into one while the segment before them is no larger
+
+        Segment sizes then at least double towards the head, so there are
+        O(log n) segments and each row is rewritten O(log n) times. Once more
+        than MAX_DELETED_FRACTION of the stored rows are tombstoned, every
+        segment is rewritten instead.
+        """
+        state = self._state
+        segments = state.segments
+        if not segments:
+            return
+        stored = sum(len(segment.ids) for segment in segments)
+        if stored - len(state.ids) > MAX_DELETED_FRACTION * stored:
+            start = 0
+        else:
+            start = len(segments) - 1
+            tail = segments[start].live_count
+            while start > 0 and segments[start - 1].live_count <= tail:
+                start -= 1
+                tail += segments[start].live_count
+            if start == len(segments) - 1:
+                return
+        manifest = json.loads(json.dumps(state.manifest))
+        merged = self._merge_segments(manifest, segments[start:])
+        manifest["segments"] = manifest["segments"][:start] + [merged]
+        self._publish(manifest)
+
+    # -- ChromaDB Collection compatible API ----------------------------------
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def add(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str],
+            embeddings: Optional[Any] = None):
+        """Embed (unless `embeddings` are given) and append documents as a new segment"""
+        if not ids:
+            return
+        if embeddings is None:
+            embeddings = self.embedding_function(list(documents))
+        embeddings = normalize_rows(embeddings)
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            manifest = json.loads(json.dumps(self._state.manifest))
+            if manifest["dim"] is not None and embeddings.shape[1] != manifest["dim"]:
+                raise ValueError(
+                    f"Cannot add {embeddings.shape[1]}-dim vectors to an index of {manifest['dim']}-dim vectors"
+                )
+            vectors, scales = quantize(embeddings, self.dtype)
+            # Rescoring needs a float32 copy of every row, so only keep one if older rows have it
+            keep_full = self.keeps_full_precision and all(
+                entry.get("full_precision") for entry in manifest["segments"]
+            )
+            manifest["dim"] = int(embeddings.shape[1])
+            manifest["segments"].append(self._write_segment(
+                manifest, vectors, scales, embeddings if keep_full else None,
+                list(ids), list(documents), list(metadatas)
+            ))
+            self._publish(manifest)
+            self._compact()
+
+    def replace_all(self, embeddings: Any, documents: List[str],
+                    metadatas: List[Dict[str, Any]], ids: List[str]):
+        """Write precomputed embeddings as the entire index in one generation"""
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            manifest = json.loads(json.dumps(self._state.manifest))
+            manifest.update(dtype=self.dtype, dim=None, segments=[])
+            if len(ids):
+                embeddings = normalize_rows(embeddings)
+                vectors, scales = quantize(embeddings, self.dtype)
+                manifest["dim"] = int(embeddings.shape[1])
+                manifest["segments"].append(self._write_segment(
+                    manifest, vectors, scales, embeddings if self.keeps_full_precision else None,
+                    list(ids), list(documents), list(metadatas)
+                ))
+            self._publish(manifest)
+
+    def delete(self, ids: List[str]):
+        """Tombstone documents by ID"""
+        drop = set(ids)
+        with self._lock:
+            state = self._state
+            positions = np.asarray([p for p, doc_id in enumerate(state.ids) if doc_id in drop], dtype=np.int64)
+            if not len(positions):
+                return
+            manifest = json.loads(json.dumps(state.manifest))
+            entries = []
+            owners = np.searchsorted(state.offsets, positions, side="right") - 1
+            for index, (segment, entry) in enumerate(zip(state.segments, manifest["segments"])):
+                local = positions[owners == index] - state.offsets[index]
+                if len(local):
+                    entry["deleted"] = sorted(entry["deleted"] + segment.live_rows()[local].tolist())
+                if len(entry["deleted"]) < entry["rows"]:
+                    entries.append(entry)
+            manifest["segments"] = entries
+            if not entries:
+                manifest["dim"] = None
+            self._publish(manifest)
+            self._compact()
+
+    def clear(self):
+        """Remove every document"""
+        with self._lock:
+            if self._state.manifest["segments"] or os.path.exists(os.path.join(self.path, METADATA_FILE)):
+                os.makedirs(self.path, exist_ok=True)
+                manifest = json.loads(json.dumps(self._state.manifest))
+                manifest.update(dim=None, segments=[])
+                self._publish(manifest)
+
+    def read_all(self) -> Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray]:
+        """(ids, documents, metadatas, float32 embeddings) of every live document in one generation"""
+        state = self._state
+        if not state.ids:
+            return [], [], [], np.zeros((0, 0), dtype=np.float32)
+        positions = np.arange(len(state.ids))
+        embeddings = self._gather(state, positions, "full")
+        if embeddings is None:
+            embeddings = np.asarray(self._gather(state, positions, "vectors"), dtype=np.float32)
+            scales = self._gather(state, positions, "scales")
+            if scales is not None:
+                embeddings = embeddings * scales[:, None]
+        return list(state.ids), list(state.documents), list(state.metadatas), \
+            np.asarray(embeddings, dtype=np.float32)
+
+    def get(self, limit: Optional[int] = None, offset: int = 0,
+            include: Optional[List[str]] = None,
+            ids: Optional[Iterable[str]] = None) -> Dict[str, List[Any]]:
+        """Return stored documents in insertion order (`include` is accepted for API parity)"""
+        state = self._state
+        all_ids, documents, metadatas, rows = state.ids, state.documents, state.metadatas, state.rows
+        if ids is not None:
+            found = [rows[doc_id] for doc_id in ids if doc_id in rows]
+            return {
+                "ids": [all_ids[row] for row in found],
+                "documents": [documents[row] for row in found],
+                "metadatas": [metadatas[row] for row in found],
+            }
+        ids = all_ids
+        end = None if limit is None else offset + limit
+        return {
+            "ids": ids[offset:end],
+            "documents": documents[offset:end],
+            "metadatas": metadatas[offset:end],
+        }
+
+    def query(self, query_texts: List[str], n_results: int = 10,
+              ids: Optional[Iterable[str]] = None) -> Dict[str, List[List[Any]]]:
+        """
+        Exact top-k search for one or more query texts
+
+        Distances are cosine distances (1 - cosine similarity).
+
+        Args:
+            query_texts: Texts to embed and search for
+            n_results: Number of results per query
+            ids: Optional candidate IDs; only these rows are scored
+        """
+        queries = normalize_rows(self.embedding_function(list(query_texts)))
+        return self.query_embeddings(queries, n_results, ids=ids)
+
+    @staticmethod
+    def _gather(state: IndexGeneration, positions: np.ndarray, field: str) -> Optional[np.ndarray]:
+        """Rows of a segment field for ascending live positions (None if a segment lacks the field)"""
+        owners = np.searchsorted(state.offsets, positions, side="right") - 1
+        parts = []
+        for index in np.unique(owners):
+            segment = state.segments[index]
+            source = getattr(segment, field)
+            if source is None:
+                return None
+            local = positions[owners == index] - state.offsets[index]
+            if segment.live is not None:
+                local = segment.live[local]
+            # Fancy indexing copies only these rows out of the mmap
+            parts.append(source[local])
+        return np.concatenate(parts)
+
+    def query_embeddings(self, queries: np.ndarray, n_results: int = 10,
+                         ids: Optional[Iterable[str]] = None) -> Dict[str, List[List[Any]]]:
+        """Top-k search for a (m, dim) matrix of normalized query vectors"""
+        results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        state = self._state
+        doc_ids, documents, metadatas, rows_by_id = state.ids, state.documents, state.metadatas, state.rows
+
+        candidate_rows = None
+        if ids is not None and doc_ids:
+            candidate_rows = np.fromiter(
+                sorted({rows_by_id[doc_id] for doc_id in ids if doc_id in rows_by_id}), dtype=np.int64
+            )
+        if not doc_ids or n_results <= 0 or (candidate_rows is not None and not len(candidate_rows)):
+            for _ in range(len(queries)):
+                for key in results:
+                    results[key].append([])
+            return results
+
+        if candidate_rows is not None:
+            scores = self._score(self._gather(state, candidate_rows, "vectors"),
+                                 self._gather(state, candidate_rows, "scales"), queries)
+        else:
+            scores = np.concatenate([self._score_segment(segment, queries) for segment in state.segments])
+        k = min(n_results, scores.shape[0])
+        rescore = self.rescore_factor > 0 and all(segment.full is not None for segment in state.segments)
+        shortlist = min(k * self.rescore_factor, scores.shape[0]) if rescore else k
+        for column in range(scores.shape[1]):
+            column_scores = scores[:, column]
+            if shortlist < len(column_scores):
+                top = np.argpartition(-column_scores, shortlist - 1)[:shortlist]
+            else:
+                top = np.arange(len(column_scores))
+            if rescore:
+                # Reorder the compact shortlist by full-precision similarity
+                shortlist_rows = candidate_rows[top] if candidate_rows is not None else top
+                order = np.argsort(shortlist_rows)
+                top, shortlist_rows = top[order], shortlist_rows[order]
+                exact = np.asarray(self._gather(state, shortlist_rows, "full"), dtype=np.float32) @ queries[column]
+                best = np.argsort(-exact)[:k]
+                top, top_scores = top[best], exact[best]
+            else:
+                top = top[np.argsort(-column_scores[top])]
+                top_scores = column_scores[top]
+            rows = candidate_rows[top] if candidate_rows is not None else top
+            results["ids"].append([doc_ids[i] for i in rows])
+            results["documents"].append([documents[i] for i in rows])
+            results["metadatas"].append([metadatas[i] for i in rows])
+            results["distances"].append([float(1.0 - score) for score in top_scores])
+        return results
+
+    def _score_segment(self, segment: Segment, queries: np.ndarray) -> np.ndarray:
+        """Similarities (live rows, m) for one segment"""
+        scores = self._score(segment.vectors, segment.scales, queries)
+        return scores if segment.live is None else scores[segment.live]
+
+    @staticmethod
+    def _score(vectors: np.ndarray, scales: Optional[np.ndarray], queries: np.ndarray) -> np.ndarray:
+        """Cosine similarities (n_docs, m) via matrix products over the stored rows"""
+        queries_t = np.ascontiguousarray(queries.T, dtype=np.float32)
+        if vectors.dtype == np.float32:
+            return vectors @ queries_t
+
+        # Widen compact rows chunk by chunk so BLAS does the heavy lifting
+        scores = np.empty((vectors.shape[0], queries_t.shape[1]), dtype=np.float32)
+        for start in range(0, vectors.shape[0], SCORE_CHUNK_ROWS):
+            stop = start + SCORE_CHUNK_ROWS
+            chunk = vectors[start:stop].astype(np.float32) @ queries_t
+            if scales is not None:
+                chunk *= scales[start:stop, None]
+            scores[start:stop] = chunk
+        return scores
@@ -0,0 +1,164 @@
+"""
+Cartesia voice catalog with an on-disk cache
+Avoids a blocking Cartesia API call on every agent process start by sharing a
+TTL'd cache file between processes, refreshed in the background when stale
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("livekit.agents")
+
+CARTESIA_VOICES_URL = "https://api.cartesia.ai/voices"
+CARTESIA_API_VERSION = "2024-08-01"
+
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "cartesia_voices.json")
+DEFAULT_TTL_SECONDS = 6 * 3600
+
+# Payload published when no catalog could be loaded at all
+EMPTY_ATTRIBUTE_PAYLOAD = "[]"
+
+
+class VoiceCatalog:
+    """
+    Cached list of Cartesia voices plus the pre-serialized participant attribute
+
+    Loading follows stale-while-revalidate: a fresh cache file is used as is, a
+    stale one is served immediately while a background thread refetches it, and
+    only a missing cache blocks on the network.
+    """
+
+    def __init__(self,
+                 cache_path: Optional[str] = None,
+                 ttl_seconds: Optional[float] = None,
+                 api_key: Optional[str] = None,
+                 request_timeout: float = 5.0):
+        """
+        Args:
+            cache_path: Cache file shared by all processes on the host
+            ttl_seconds: Age after which the cache is refreshed
+            api_key: Cartesia API key (defaults to CARTESIA_API_KEY)
+            request_timeout: Timeout in seconds for the Cartesia request
+        """
+        self.cache_path = cache_path or os.getenv("CARTESIA_VOICE_CACHE", DEFAULT_CACHE_PATH)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv("CARTESIA_VOICE_CACHE_TTL", DEFAULT_TTL_SECONDS)
+        )
+        self.api_key = api_key if api_key is not None else os.getenv("CARTESIA_API_KEY", "")
+        self.request_timeout = request_timeout
+
+        self.voices: List[Dict[str, Any]] = []
+        self.attribute_payload: str = EMPTY_ATTRIBUTE_PAYLOAD
+        self.fetched_at: float = 0.0
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at > self.ttl_seconds
+
+    def load(self) -> "VoiceCatalog":
+        """Load the catalog from disk, refreshing in the background if stale"""
+        if self._read_cache():
+            if self.is_stale:
+                self.refresh_in_background()
+            return self
+
+        # Nothing cached yet: this is the only case that waits on the network
+        self.refresh()
+        return self
+
+    def refresh(self) -> bool:
+        """Fetch voices from Cartesia and update the cache file"""
+        # Imported on first refresh; most processes only read the cache file
+        import requests
+
+        headers = {
+            "X-API-Key": self.api_key,
+            "Cartesia-Version": CARTESIA_API_VERSION,
+            "Content-Type": "application/json",
+        }
+        try:
+            response = requests.get(CARTESIA_VOICES_URL, headers=headers, timeout=self.request_timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Failed to fetch Cartesia voices: {e}")
+            return False
+
+        if response.status_code != 200:
+            logger.warning(f"Failed to fetch Cartesia voices: {response.status_code}")
+            return False
+
+        voices = response.json()
+        if isinstance(voices, dict):
+            # Newer API versions wrap the list in a paginated envelope
+            voices = voices.get("data", [])
+        self._set_voices(voices, time.time())
+        self._write_cache()
+        return True
+
+    def refresh_in_background(self):
+        """Refresh on a daemon thread; concurrent calls collapse into one fetch"""
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            finally:
+                with self._refresh_lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="cartesia-voice-refresh", daemon=True).start()
+
+    def _set_voices(self, voices: List[Dict[str, Any]], fetched_at: float):
+        self.voices = voices
+        self.fetched_at = fetched_at
+        self.attribute_payload = build_attribute_payload(voices)
+
+    def _read_cache(self) -> bool:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            voices = cached["voices"]
+            fetched_at = float(cached["fetched_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        self.voices = voices
+        self.fetched_at = fetched_at
+        self.attribute_payload = cached.get("attribute_payload") or build_attribute_payload(voices)
+        return True
+
+    def _write_cache(self):
+        # Write to a temp file and rename so readers never see a partial file
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".cartesia_voices.")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({
+                    "fetched_at": self.fetched_at,
+                    "voices": self.voices,
+                    "attribute_payload": self.attribute_payload,
+                }, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to write Cartesia voice cache {self.cache_path}: {e}")
+
+
+def build_attribute_payload(voices: List[Dict[str, Any]]) -> str:
+    """Serialize the name-sorted id/name list published as the `voices` attribute"""
+    entries = [
+        {"id": voice["id"], "name": voice["name"]}
+        for voice in voices
+        if "id" in voice and "name" in voice
+    ]
+    entries.sort(key=lambda x: x["name"])
+    return json.dumps(entries)
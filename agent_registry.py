@@ -0,0 +1,139 @@
+"""
+Agent registry shared by gateway workers
+Records which worker owns each voice agent process in Redis (or in memory for a
+single worker) and routes stop requests to the owning worker over pub/sub
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "agent:"
+CONTROL_CHANNEL_PREFIX = "agent-control:"
+
+
+def default_worker_id() -> str:
+    """Identifier of this gateway worker process"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class AgentRegistry:
+    """
+    Session -> voice agent registry visible to every gateway worker
+
+    Agent processes are children of the worker that spawned them, so only that
+    worker can signal them. Other workers look up the owner here and publish a
+    control message on the owner's channel instead.
+    """
+
+    def __init__(self, redis_client=None, worker_id: Optional[str] = None, ttl: int = 86400):
+        """
+        Args:
+            redis_client: redis.asyncio client (None keeps the registry in memory)
+            worker_id: Identifier of this worker (defaults to hostname:pid)
+            ttl: Seconds an entry survives without updates (guards against crashed workers)
+        """
+        self.redis_client = redis_client
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def control_channel(self) -> str:
+        return f"{CONTROL_CHANNEL_PREFIX}{self.worker_id}"
+
+    async def register(self, session_id: str, info: Dict[str, Any]):
+        """Record an agent owned by this worker"""
+        entry = dict(info, worker_id=self.worker_id)
+        if self.redis_client:
+            await self.redis_client.setex(f"{KEY_PREFIX}{session_id}", self.ttl, json.dumps(entry))
+        else:
+            self._local[session_id] = entry
+
+    async def update(self, session_id: str, **fields):
+        """Merge fields into an existing entry"""
+        entry = await self.get(session_id)
+        if entry is None:
+            return
+        entry.update(fields)
+        if self.redis_client:
+            await self.redis_client.setex(f"{KEY_PREFIX}{session_id}", self.ttl, json.dumps(entry))
+        else:
+            self._local[session_id] = entry
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if self.redis_client:
+            data = await self.redis_client.get(f"{KEY_PREFIX}{session_id}")
+            return json.loads(data) if data else None
+        entry = self._local.get(session_id)
+        return dict(entry) if entry is not None else None
+
+    async def remove(self, session_id: str):
+        if self.redis_client:
+            await self.redis_client.delete(f"{KEY_PREFIX}{session_id}")
+        else:
+            self._local.pop(session_id, None)
+
+    async def list(self) -> Dict[str, Dict[str, Any]]:
+        """All registered agents across workers"""
+        if not self.redis_client:
+            return {session_id: dict(entry) for session_id, entry in self._local.items()}
+
+        agents = {}
+        async for key in self.redis_client.scan_iter(match=f"{KEY_PREFIX}*"):
+            data = await self.redis_client.get(key)
+            if data:
+                agents[key[len(KEY_PREFIX):]] = json.loads(data)
+        return agents
+
+    async def request_stop(self, session_id: str) -> bool:
+        """
+        Ask the worker owning a session's agent to stop it
+
+        Returns:
+            True if the request was delivered to the owning worker
+        """
+        entry = await self.get(session_id)
+        if entry is None or not self.redis_client:
+            return False
+        owner = entry.get("worker_id")
+        message = json.dumps({"action": "stop", "session_id": session_id})
+        receivers = await self.redis_client.publish(f"{CONTROL_CHANNEL_PREFIX}{owner}", message)
+        if not receivers:
+            # Owner is gone: its agents died with it
+            logger.warning(f"Agent owner {owner} for session {session_id} is not running; dropping entry")
+            await self.remove(session_id)
+        return receivers > 0
+
+    def start_listener(self, stop_handler: Callable[[str], Awaitable[Any]]):
+        """Serve stop requests routed to this worker (no-op without Redis)"""
+        if self.redis_client and self._listener is None:
+            self._listener = asyncio.create_task(self._listen(stop_handler))
+
+    async def _listen(self, stop_handler: Callable[[str], Awaitable[Any]]):
+        pubsub = self.redis_client.pubsub()
+        await pubsub.subscribe(self.control_channel)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    request = json.loads(message["data"])
+                    if request.get("action") == "stop":
+                        await stop_handler(request["session_id"])
+                except Exception as e:
+                    logger.error(f"Failed to handle agent control message: {e}")
+        finally:
+            await pubsub.unsubscribe(self.control_channel)
+            await pubsub.close()
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
@@ -4,20 +4,18 @@ Designed for Railway deployment with widget integration
 """
 
 import os
+import hmac
 import json
 import uuid
 import asyncio
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, Request
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, Request, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import jwt
-from livekit import api
-import redis
 import logging
 from dotenv import load_dotenv
 
@@ -28,8 +26,19 @@ logger = logging.getLogger(__name__)
 # Import our agent components
 import sys
 sys.path.append('/app/agent')
-from agent.knowledge_base import KnowledgeBase
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent"))
+# Agent modules import each other by bare name; importing them as agent.<name>
+# here would load a second copy of each with its own state
+from knowledge_base import KnowledgeBase, DOCUMENT_FIELDS
+from voice_catalog import VoiceCatalog
+from response_cache import create_response_cache
 from session_manager import SessionManager
+from token_service import TokenMinter
+from admission import AdmissionController, AdmissionRejected
+from kb_warmup import KnowledgeBaseWarmup, KnowledgeBaseUnavailable
+from tenants import KnowledgeBasePool, TenantDirectory, UnknownTenant, TENANT_KEY_HEADER, collection_for_tenant
+from agent_registry import AgentRegistry
+from gateway_metrics import GatewayMetrics, MetricsMiddleware
 
 # Only load .env file if not in Railway (Railway provides env vars directly)
 if not os.getenv("RAILWAY_ENVIRONMENT"):
@@ -42,34 +51,51 @@ else:
 LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
 LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 LIVEKIT_URL = os.getenv("LIVEKIT_URL", "wss://localhost:7880")
-API_SECRET_KEY = os.getenv("API_SECRET_KEY", "your-secret-key-here")
+DEFAULT_API_SECRET_KEY = "your-secret-key-here"
+API_SECRET_KEY = os.getenv("API_SECRET_KEY", DEFAULT_API_SECRET_KEY)
 REDIS_URL = os.getenv("REDIS_URL")
 PORT = int(os.getenv("PORT", 8000))
+# Agents query the gateway's knowledge base instead of opening their own
+KB_SHARED_SERVICE = os.getenv("KB_SHARED_SERVICE", "").lower() in ("1", "true", "yes")
+
+# Gateway-wide metrics registry (rendered at /metrics)
+metrics = GatewayMetrics()
 
 # Voice Agent Service
 import subprocess
+import time
 import signal
-import psutil
-from typing import Set
 
 class VoiceAgentService:
     """Service to manage voice agent worker processes"""
     
-    def __init__(self):
+    def __init__(self, registry: Optional[AgentRegistry] = None):
+        # Agents spawned by this worker; `registry` is the view shared by all workers
         self.active_agents: Dict[str, Dict[str, Any]] = {}
         self.agent_processes: Dict[str, subprocess.Popen] = {}
+        self.registry = registry or AgentRegistry()
         
-    async def start_agent_for_session(self, session_id: str, room_name: str) -> bool:
-        """Start a voice agent for a specific session/room"""
+    async def start_agent_for_session(self, session_id: str, room_name: str,
+                                      tenant: Optional[str] = None) -> bool:
+        """Start a voice agent for a specific session/room (scoped to the tenant's knowledge base)"""
         try:
             if session_id in self.active_agents:
                 logger.info(f"Voice agent already running for session: {session_id}")
                 return True
+            
+            if not await admission.is_admitted(session_id):
+                try:
+                    await admission.admit(session_id)
+                except AdmissionRejected as e:
+                    logger.warning(f"Not starting voice agent for session {session_id}: {e}")
+                    return False
                 
             logger.info(f"🚀 Starting voice agent for session: {session_id}, room: {room_name}")
             
             # Set up environment for the agent process
             agent_env = os.environ.copy()
+            # Agents never need the gateway's client-facing key
+            agent_env.pop("API_SECRET_KEY", None)
             agent_env.update({
                 "LIVEKIT_URL": LIVEKIT_URL,
                 "LIVEKIT_API_KEY": LIVEKIT_API_KEY,
@@ -77,6 +103,16 @@ class VoiceAgentService:
                 "TARGET_ROOM": room_name,
                 "SESSION_ID": session_id
             })
+            if tenant:
+                agent_env.update({
+                    "KB_TENANT": tenant,
+                    "KB_COLLECTION": collection_for_tenant(tenant)
+                })
+            if KB_SHARED_SERVICE:
+                agent_env.update({
+                    "KB_SERVICE_URL": f"http://127.0.0.1:{PORT}",
+                    "KB_SERVICE_KEY": internal_service_key()
+                })
             
             # Command to run the voice agent (using knowledge base version)
             agent_cmd = [
@@ -90,6 +126,7 @@ class VoiceAgentService:
             ]
             
             # Start the agent process
+            spawn_start = time.perf_counter()
             process = subprocess.Popen(
                 agent_cmd,
                 env=agent_env,
@@ -98,16 +135,19 @@ class VoiceAgentService:
                 text=True,
                 preexec_fn=os.setsid  # Create new process group
             )
+            metrics.agent_spawn_latency.observe(time.perf_counter() - spawn_start)
             
             # Store process and session info
             self.agent_processes[session_id] = process
             self.active_agents[session_id] = {
                 "room_name": room_name,
+                "tenant": tenant,
                 "process_id": process.pid,
                 "started_at": datetime.now(timezone.utc).isoformat(),
                 "status": "starting"
             }
             
+            await self.registry.register(session_id, self.active_agents[session_id])
             logger.info(f"✅ Voice agent process started for session {session_id}, PID: {process.pid}")
             
             # Start monitoring task
@@ -117,6 +157,7 @@ class VoiceAgentService:
             
         except Exception as e:
             logger.error(f"❌ Failed to start voice agent for session {session_id}: {e}")
+            metrics.agent_spawn_failures_total += 1
             return False
     
     async def _monitor_agent_process(self, session_id: str):
@@ -132,6 +173,7 @@ class VoiceAgentService:
             # Check if process is still running
             if process.poll() is None:
                 self.active_agents[session_id]["status"] = "connected"
+                await self.registry.update(session_id, status="connected")
                 logger.info(f"🎉 Voice agent connected successfully for session: {session_id}")
             else:
                 # Process died, get error output
@@ -140,12 +182,26 @@ class VoiceAgentService:
                 logger.error(f"STDOUT: {stdout}")
                 logger.error(f"STDERR: {stderr}")
                 self.active_agents[session_id]["status"] = "failed"
+                await self.registry.update(session_id, status="failed")
+                self.agent_processes.pop(session_id, None)
+                await admission.release(session_id)
                 
         except Exception as e:
             logger.error(f"Error monitoring agent process for session {session_id}: {e}")
     
     async def stop_agent_for_session(self, session_id: str) -> bool:
-        """Stop voice agent for a session"""
+        """Stop voice agent for a session, wherever it runs"""
+        if session_id not in self.active_agents:
+            # Owned by another worker (or unknown): route the request to its owner
+            if await self.registry.request_stop(session_id):
+                logger.info(f"Forwarded stop request for session {session_id} to its owning worker")
+                return True
+            logger.warning(f"No active agent found for session: {session_id}")
+            return False
+        return await self._stop_local_agent(session_id)
+    
+    async def _stop_local_agent(self, session_id: str) -> bool:
+        """Stop a voice agent spawned by this worker"""
         try:
             if session_id not in self.active_agents:
                 logger.warning(f"No active agent found for session: {session_id}")
@@ -168,6 +224,8 @@ class VoiceAgentService:
                 del self.agent_processes[session_id]
                 
             del self.active_agents[session_id]
+            await self.registry.remove(session_id)
+            await admission.release(session_id)
             logger.info(f"✅ Voice agent stopped for session: {session_id}")
             return True
             
@@ -175,30 +233,85 @@ class VoiceAgentService:
             logger.error(f"❌ Failed to stop voice agent for session {session_id}: {e}")
             return False
     
-    def get_agent_status(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get status of voice agent for a session"""
-        return self.active_agents.get(session_id)
+    async def get_agent_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get status of voice agent for a session (from any worker)"""
+        return await self.registry.get(session_id)
     
-    def list_active_agents(self) -> Dict[str, Dict[str, Any]]:
-        """List all active voice agents"""
-        return self.active_agents.copy()
+    async def list_active_agents(self) -> Dict[str, Dict[str, Any]]:
+        """List all active voice agents across workers"""
+        return await self.registry.list()
     
     async def cleanup_all_agents(self):
-        """Clean up all active agents (called on shutdown)"""
+        """Clean up the agents spawned by this worker (called on shutdown)"""
         logger.info("🧹 Cleaning up all voice agents...")
         session_ids = list(self.active_agents.keys())
         for session_id in session_ids:
-            await self.stop_agent_for_session(session_id)
+            await self._stop_local_agent(session_id)
+
+async def stop_local_agent(session_id: str) -> bool:
+    """Serve a stop request another worker routed to this one"""
+    if voice_agent_service is None:
+        logger.warning(f"Stop requested for session {session_id}, but this worker runs no voice agents")
+        return False
+    return await voice_agent_service._stop_local_agent(session_id)
 
 # Initialize components - will be set during startup
 kb = None
 session_manager = None
 voice_agent_service = None
+agent_registry = None
+search_batcher = None
+token_minter = None
+# Caps agents on this host; sessions beyond capacity queue or get a 429
+admission = AdmissionController(
+    running_sessions=lambda: voice_agent_service.agent_processes.keys() if voice_agent_service else ()
+)
+# Shares its cache file with the agent processes spawned on this host
+voice_catalog = VoiceCatalog()
+
+startup_started_at = time.monotonic()
+
+# Answers generated by voice agents, shared by the default and tenant
+# knowledge bases (RESPONSE_CACHE; agents reach it through KB_SHARED_SERVICE)
+response_cache = create_response_cache()
+
+def open_knowledge_base() -> KnowledgeBase:
+    """Open the knowledge base and load the default file (runs in a worker thread)"""
+    global kb
+    
+    knowledge_base = KnowledgeBase(response_cache=response_cache)
+    logger.info("Knowledge base initialized successfully")
+    
+    # Load default knowledge base if available (read-only workers were
+    # seeded by the launcher before they started)
+    kb_file = os.getenv("DEFAULT_KB_FILE", "sample_knowledge.json")
+    if os.path.exists(kb_file) and not knowledge_base.read_only:
+        try:
+            knowledge_base.load_from_file(kb_file)
+            logger.info(f"Loaded knowledge base from {kb_file}")
+        except Exception as e:
+            logger.error(f"Failed to load knowledge base file: {e}")
+    kb = knowledge_base
+    return knowledge_base
+
+# Single-flight background loader; requests wait up to KB_READY_TIMEOUT for it
+kb_warmup = KnowledgeBaseWarmup(open_knowledge_base)
+KB_READY_TIMEOUT = float(os.getenv("KB_READY_TIMEOUT", 10))
+
+def open_tenant_knowledge_base(tenant: str) -> KnowledgeBase:
+    """Open a tenant's own collection (runs in a worker thread)"""
+    # Tenants never share the default KB_SNAPSHOT
+    return KnowledgeBase(collection_name=collection_for_tenant(tenant), snapshot="",
+                         response_cache=response_cache)
+
+# Widget API keys -> tenants, and the LRU pool of their opened collections
+tenant_directory = TenantDirectory()
+kb_pool = KnowledgeBasePool(open_tenant_knowledge_base)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
-    global kb, session_manager
+    global kb, session_manager, agent_registry
     
     # Startup
     logger.info("Starting API Gateway...")
@@ -212,37 +325,43 @@ async def lifespan(app: FastAPI):
     logger.info(f"PORT: {PORT}")
     logger.info("===================================")
     
+    # Warm the Cartesia voice cache without delaying startup
+    asyncio.create_task(asyncio.to_thread(voice_catalog.load))
+    
     # Initialize session manager (doesn't require OpenAI)
     try:
-        session_manager = SessionManager(redis_url=REDIS_URL)
+        session_manager = SessionManager(
+            redis_url=REDIS_URL,
+            latency_observer=metrics.observe_session_backend
+        )
         logger.info("Session manager initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize session manager: {e}")
         # Continue anyway - sessions might work without Redis
-        session_manager = SessionManager(redis_url=None)
+        session_manager = SessionManager(
+            redis_url=None,
+            latency_observer=metrics.observe_session_backend
+        )
     
-    # Try to initialize knowledge base, but don't fail if it can't
-    try:
-        kb = KnowledgeBase()
-        logger.info("Knowledge base initialized successfully")
-        
-        # Load default knowledge base if available
-        kb_file = os.getenv("DEFAULT_KB_FILE", "sample_knowledge.json")
-        if os.path.exists(kb_file):
-            try:
-                kb.load_from_file(kb_file)
-                logger.info(f"Loaded knowledge base from {kb_file}")
-            except Exception as e:
-                logger.error(f"Failed to load knowledge base file: {e}")
-    except Exception as e:
-        logger.error(f"Failed to initialize knowledge base: {e}")
-        logger.warning("Knowledge base endpoints will return 503 until OPENAI_API_KEY is set")
-        kb = None  # Knowledge base features will be disabled
+    # Agent ownership and admission slots are shared through the session store's Redis (if any)
+    agent_registry = AgentRegistry(session_manager.redis_client)
+    if voice_agent_service:
+        voice_agent_service.registry = agent_registry
+    agent_registry.start_listener(stop_local_agent)
+    admission.attach(session_manager.redis_client)
+    
+    # Open the knowledge base after the server starts accepting connections
+    kb_warmup.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down API Gateway...")
+    if search_batcher:
+        await search_batcher.close()
+    if agent_registry:
+        await agent_registry.close()
+    await admission.close()
     if session_manager:
         await session_manager.cleanup()
 
@@ -254,6 +373,18 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Expose component state to the metrics collector
+metrics.register_collector("knowledge_base", lambda: kb)
+metrics.register_collector("session_manager", lambda: session_manager)
+metrics.register_collector("voice_agent_service", lambda: voice_agent_service)
+metrics.register_collector("token_minter", lambda: token_minter)
+metrics.register_collector("admission", lambda: admission)
+metrics.register_collector("kb_pool", lambda: kb_pool)
+metrics.register_collector("response_cache", lambda: response_cache)
+
+# Request latency / WebSocket instrumentation
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
 # Configure CORS for widget integration
 app.add_middleware(
     CORSMiddleware,
@@ -274,6 +405,7 @@ class SessionResponse(BaseModel):
     token: str
     livekit_url: str
     created_at: str
+    queue_wait_seconds: float = 0.0
 
 class ChatMessage(BaseModel):
     session_id: str
@@ -283,12 +415,60 @@ class KnowledgeBaseDocument(BaseModel):
     content: str
     metadata: Optional[Dict[str, Any]] = {}
 
+class KnowledgeBaseFilter(BaseModel):
+    category: Optional[Union[str, List[str]]] = None
+    type: Optional[Union[str, List[str]]] = None
+    tags: Optional[Union[str, List[str]]] = None
+    added_after: Optional[str] = None
+    added_before: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    n_results: int = 3
+    filter: Optional[KnowledgeBaseFilter] = None
+
 class WidgetConfig(BaseModel):
     api_key: Optional[str] = None
     theme: Optional[str] = "default"
     position: Optional[str] = "bottom-right"
     primary_color: Optional[str] = "#8B2BE2"
 
+# Dependencies (defined before the routes that reference them)
+def get_token_minter() -> TokenMinter:
+    """Get the LiveKit token minter, creating it on first use"""
+    global token_minter
+    if token_minter is None:
+        token_minter = TokenMinter(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
+    return token_minter
+
+def get_tenant(request: Request) -> Optional[str]:
+    """Tenant named by the request's API key header (None: the default knowledge base)"""
+    api_key = request.headers.get(TENANT_KEY_HEADER)
+    # The gateway's own key (and no key) keeps addressing the default knowledge base
+    if not api_key or hmac.compare_digest(api_key.encode(), API_SECRET_KEY.encode()):
+        return None
+    try:
+        return tenant_directory.resolve(api_key)
+    except UnknownTenant as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+# Helper function to get the knowledge base once it is ready
+async def get_kb(tenant: Optional[str] = None):
+    """Get the tenant's knowledge base, or the default one once its warm-up finished"""
+    if tenant:
+        try:
+            return await kb_pool.get(tenant)
+        except Exception as e:
+            logger.error(f"Failed to open knowledge base for tenant {tenant}: {e}")
+            raise HTTPException(status_code=503, detail=f"Knowledge base not available for tenant {tenant}")
+    if kb is not None:
+        return kb
+    
+    try:
+        return await kb_warmup.get(timeout=KB_READY_TIMEOUT)
+    except KnowledgeBaseUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Knowledge base not available. {e}")
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -298,6 +478,7 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
+        "metrics": "/metrics",
         "debug": "/api/debug/env",
         "endpoints": {
             "sessions": "/api/sessions",
@@ -318,9 +499,42 @@ async def health_check():
         "components": {
             "knowledge_base": kb is not None,
             "session_manager": session_manager is not None
-        }
+        },
+        "capacity": admission.load(),
+        "worker_id": agent_registry.worker_id if agent_registry else None
     }
 
+# Liveness: the process is up and serving requests
+@app.get("/live")
+async def liveness():
+    """Liveness probe (no dependencies checked)"""
+    return {"status": "alive"}
+
+# Readiness: the knowledge base has finished warming up
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: 503 while the knowledge base is loading or after it failed"""
+    kb_status = kb_warmup.status()
+    ready = session_manager is not None and (kb is not None or kb_status["state"] == "ready")
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else kb_status["state"],
+            "uptime_seconds": round(time.monotonic() - startup_started_at, 3),
+            "knowledge_base": kb_status,
+            "session_manager": session_manager is not None
+        }
+    )
+
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of gateway metrics"""
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 # Debug endpoint for environment variables
 @app.get("/api/debug/env")
 async def debug_environment(api_key: Optional[str] = None):
@@ -354,48 +568,62 @@ async def debug_environment(api_key: Optional[str] = None):
 
 # Session Management Endpoints
 @app.post("/api/sessions/create", response_model=SessionResponse)
-async def create_session(request: SessionCreateRequest):
-    """Create a new voice chat session"""
+async def create_session(request: SessionCreateRequest, tenant: Optional[str] = Depends(get_tenant)):
+    """Create a new voice chat session (scoped to the tenant of the API key header, if any)"""
+    # Generate session ID and room name
+    session_id = str(uuid.uuid4())
+    room_name = f"voice-session-{session_id}"
+    
+    # Wait for voice capacity (bounded queue) or tell the client to back off.
+    # Without a local agent process to claim it, the slot lasts as long as the
+    # session: until it ends or its TTL runs out.
+    hold_for = None if voice_agent_service is not None else session_manager.session_ttl
+    try:
+        queue_wait = await admission.admit(session_id, hold_for=hold_for)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
     try:
-        # Generate session ID and room name
-        session_id = str(uuid.uuid4())
-        room_name = f"voice-session-{session_id}"
-        
-        # Generate LiveKit access token
-        token = api.AccessToken(LIVEKIT_API_KEY, LIVEKIT_API_SECRET)
-        token.with_identity(request.user_id or f"user-{session_id}")
-        token.with_name(request.user_id or "User")
-        token.with_grants(api.VideoGrants(
-            room_join=True,
-            room=room_name,
-            can_publish=True,
-            can_subscribe=True,
-            can_publish_data=True
-        ))
-        
-        jwt_token = token.to_jwt()
-        
         # Create session
         session_data = {
             "session_id": session_id,
             "room_name": room_name,
             "user_id": request.user_id,
             "metadata": request.metadata,
+            "tenant": tenant,
             "created_at": datetime.utcnow().isoformat(),
             "messages": []
         }
         
-        await session_manager.create_session(session_id, session_data)
+        # Persist the session while the token is signed; yielding once lets
+        # the storage call reach its first I/O before minting takes the CPU
+        persist = asyncio.create_task(session_manager.create_session(session_id, session_data))
+        await asyncio.sleep(0)
+        try:
+            jwt_token = get_token_minter().get_token(
+                request.user_id or f"user-{session_id}",
+                room_name,
+                name=request.user_id or "User"
+            )
+        finally:
+            await persist
+        metrics.sessions_created_total += 1
         
         return SessionResponse(
             session_id=session_id,
             room_name=room_name,
             token=jwt_token,
             livekit_url=LIVEKIT_URL,
-            created_at=session_data["created_at"]
+            created_at=session_data["created_at"],
+            queue_wait_seconds=queue_wait
         )
         
     except Exception as e:
+        await admission.release(session_id)
         logger.error(f"Failed to create session: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -418,101 +646,309 @@ async def end_session(session_id: str):
     session["ended_at"] = datetime.utcnow().isoformat()
     session["status"] = "ended"
     await session_manager.update_session(session_id, session)
+    await admission.release(session_id)
+    if token_minter is not None:
+        token_minter.invalidate(session.get("user_id") or f"user-{session_id}", session["room_name"])
     
     return {"message": "Session ended successfully", "session_id": session_id}
 
-# Helper function to check if kb is initialized
-def get_kb():
-    """Get the knowledge base instance, initialize if needed"""
-    global kb
-    
-    if kb is None:
-        # Try lazy initialization
-        try:
-            logger.info("Attempting lazy initialization of knowledge base...")
-            kb = KnowledgeBase()
-            logger.info("Knowledge base initialized successfully via lazy loading")
-            
-            # Try to load default knowledge base if available
-            kb_file = os.getenv("DEFAULT_KB_FILE", "sample_knowledge.json")
-            if os.path.exists(kb_file):
-                try:
-                    kb.load_from_file(kb_file)
-                    logger.info(f"Loaded knowledge base from {kb_file}")
-                except Exception as e:
-                    logger.error(f"Failed to load knowledge base file: {e}")
-        except Exception as e:
-            logger.error(f"Failed to initialize knowledge base: {e}")
-            raise HTTPException(
-                status_code=503, 
-                detail=f"Knowledge base not available. Error: {str(e)}. Please ensure OPENAI_API_KEY is set in Railway environment variables."
-            )
+@app.get("/api/sessions/{session_id}/agent")
+async def get_session_agent(session_id: str):
+    """Get the voice agent serving a session, whichever worker spawned it"""
+    agent_info = await agent_registry.get(session_id) if agent_registry else None
+    if not agent_info:
+        raise HTTPException(status_code=404, detail="No voice agent for session")
+    return {"session_id": session_id, "agent": agent_info}
+
+@app.post("/api/sessions/{session_id}/token")
+async def refresh_session_token(session_id: str):
+    """Get a LiveKit token to reconnect to an existing session's room"""
+    session = await session_manager.get_session(session_id)
+    if not session or session.get("status") == "ended":
+        raise HTTPException(status_code=404, detail="Session not found")
     
-    return kb
+    user_id = session.get("user_id")
+    jwt_token = get_token_minter().get_token(
+        user_id or f"user-{session_id}",
+        session["room_name"],
+        name=user_id or "User"
+    )
+    return {"session_id": session_id, "token": jwt_token, "livekit_url": LIVEKIT_URL}
 
 # Knowledge Base Endpoints
 @app.post("/api/knowledge-base/documents")
-async def add_document(document: KnowledgeBaseDocument):
+async def add_document(document: KnowledgeBaseDocument, tenant: Optional[str] = Depends(get_tenant)):
     """Add a document to the knowledge base"""
     try:
-        knowledge_base = get_kb()
-        doc_id = knowledge_base.add_document(
-            content=document.content,
-            metadata=document.metadata
+        knowledge_base = await get_kb(tenant)
+        doc_id = await asyncio.to_thread(
+            knowledge_base.add_document, document.content, document.metadata
         )
+        if tenant:
+            kb_pool.refresh_size(tenant)
         return {"document_id": doc_id, "message": "Document added successfully"}
     except HTTPException:
         raise
+    except PermissionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to add document: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Largest page served by the document listing endpoint
+MAX_LIST_LIMIT = int(os.getenv("MAX_LIST_LIMIT", 1000))
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Comma-separated projection, e.g. "id,metadata" """
+    if not fields:
+        return None
+    field_list = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = set(field_list) - set(DOCUMENT_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown document fields: {sorted(unknown)}")
+    return field_list
+
 @app.get("/api/knowledge-base/documents")
-async def list_documents(limit: int = 100):
-    """List all documents in the knowledge base"""
+async def list_documents(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    max_content_chars: Optional[int] = None,
+    tenant: Optional[str] = Depends(get_tenant)
+):
+    """List documents a page at a time; pass `next_cursor` back as `cursor` for the next page"""
+    if not 0 < limit <= MAX_LIST_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_LIST_LIMIT}")
     try:
-        knowledge_base = get_kb()
-        documents = knowledge_base.list_documents(limit=limit)
-        return {"documents": documents, "count": len(documents)}
+        knowledge_base = await get_kb(tenant)
+        documents, next_cursor = await asyncio.to_thread(
+            knowledge_base.page_documents, limit, cursor, parse_fields(fields), max_content_chars
+        )
+        return {"documents": documents, "count": len(documents), "next_cursor": next_cursor}
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to list documents: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/knowledge-base/documents/export")
+async def export_documents(fields: Optional[str] = None, tenant: Optional[str] = Depends(get_tenant)):
+    """Stream every document as NDJSON (one JSON object per line)"""
+    field_list = parse_fields(fields)
+    knowledge_base = await get_kb(tenant)
+    
+    async def ndjson_lines():
+        cursor = None
+        while True:
+            documents, cursor = await asyncio.to_thread(
+                knowledge_base.page_documents, 500, cursor, field_list
+            )
+            if documents:
+                yield "".join(json.dumps(doc) + "\n" for doc in documents)
+            if cursor is None:
+                return
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @app.post("/api/knowledge-base/search")
-async def search_knowledge_base(query: str, n_results: int = 3):
-    """Search the knowledge base"""
+async def search_knowledge_base(
+    query: str,
+    n_results: int = 3,
+    filter: Optional[KnowledgeBaseFilter] = Body(None, embed=True),
+    tenant: Optional[str] = Depends(get_tenant)
+):
+    """Search the knowledge base, optionally filtered by metadata"""
     try:
-        knowledge_base = get_kb()
-        results = knowledge_base.search(query, n_results=n_results)
+        knowledge_base = await get_kb(tenant)
+        filter_dict = filter.model_dump(exclude_none=True) if filter else None
+        results = await asyncio.to_thread(knowledge_base.search, query, n_results, filter_dict)
         return {"query": query, "results": results}
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to search knowledge base: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Internal retrieval service for agent processes (KB_SHARED_SERVICE); only
+# mounted when agents share the gateway's knowledge base
+internal_router = APIRouter(prefix="/internal/kb")
+
+def internal_service_key() -> str:
+    """
+    Shared secret agents present on internal routes (KB_SERVICE_KEY)
+
+    Kept apart from API_SECRET_KEY so agent processes never hold the gateway's
+    client-facing key.
+
+    Raises:
+        RuntimeError: If KB_SERVICE_KEY is unset, the placeholder default or
+            the same as API_SECRET_KEY
+    """
+    key = os.getenv("KB_SERVICE_KEY")
+    if not key or key in (DEFAULT_API_SECRET_KEY, API_SECRET_KEY):
+        raise RuntimeError("KB_SHARED_SERVICE requires KB_SERVICE_KEY, distinct from API_SECRET_KEY")
+    return key
+
+def verify_service_key(request: Request) -> None:
+    """Reject internal requests without the shared service key"""
+    from kb_service import SERVICE_KEY_HEADER
+    
+    presented = request.headers.get(SERVICE_KEY_HEADER, "")
+    if not hmac.compare_digest(presented.encode(), internal_service_key().encode()):
+        raise HTTPException(status_code=401, detail="Invalid service key")
+
+class InternalSearchRequest(BaseModel):
+    query: str
+    n_results: int = 5
+    filter: Optional[Dict[str, Any]] = None
+    tenant: Optional[str] = None
+
+@internal_router.post("/search", dependencies=[Depends(verify_service_key)])
+async def internal_kb_search(search: InternalSearchRequest):
+    """Batched knowledge base search used by agents sharing the gateway's index"""
+    global search_batcher
+    # Only needed when agents share the gateway's index (KB_SHARED_SERVICE)
+    from kb_service import SearchBatcher
+    
+    try:
+        knowledge_base = await get_kb(search.tenant)
+        if search.filter or search.tenant:
+            # Filtered and tenant searches are pushed down individually; the
+            # batcher would pin an evicted tenant's collection in memory
+            results = await asyncio.to_thread(
+                knowledge_base.search, search.query, search.n_results, search.filter
+            )
+            return {"query": search.query, "results": results}
+        
+        if search_batcher is None or search_batcher.kb is not knowledge_base:
+            search_batcher = SearchBatcher(knowledge_base)
+        results = await search_batcher.search(search.query, n_results=search.n_results)
+        return {"query": search.query, "results": results}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed internal knowledge base search: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+class AnswerLookupRequest(BaseModel):
+    query: str
+    scope: str = ""
+    tenant: Optional[str] = None
+
+class AnswerStoreRequest(BaseModel):
+    query: str
+    answer: str
+    version: str
+    scope: str = ""
+    tenant: Optional[str] = None
+
+@internal_router.post("/answers/lookup", dependencies=[Depends(verify_service_key)])
+async def internal_answer_lookup(lookup: AnswerLookupRequest):
+    """Semantic response cache lookup used by agents sharing the gateway's knowledge base"""
+    try:
+        knowledge_base = await get_kb(lookup.tenant)
+        answer, version = await asyncio.to_thread(knowledge_base.lookup_answer, lookup.query, lookup.scope)
+        return {"answer": answer, "version": version}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed response cache lookup: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@internal_router.post("/answers/store", dependencies=[Depends(verify_service_key)])
+async def internal_answer_store(store: AnswerStoreRequest):
+    """Cache an answer generated by an agent sharing the gateway's knowledge base"""
+    try:
+        knowledge_base = await get_kb(store.tenant)
+        await asyncio.to_thread(
+            knowledge_base.store_answer, store.query, store.answer, store.version, store.scope
+        )
+        return {"status": "ok"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to store cached answer: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+if KB_SHARED_SERVICE:
+    internal_service_key()  # refuse to start with an unset or default key
+    app.include_router(internal_router)
+
+# Maximum number of queries accepted by the batch search endpoint
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", 100))
+
+@app.post("/api/knowledge-base/search/batch")
+async def batch_search_knowledge_base(request: BatchSearchRequest, tenant: Optional[str] = Depends(get_tenant)):
+    """Search the knowledge base for many queries with one embedding call and one lookup"""
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_QUERIES} queries per batch"
+        )
+    try:
+        knowledge_base = await get_kb(tenant)
+        filter_dict = request.filter.model_dump(exclude_none=True) if request.filter else None
+        results = await asyncio.to_thread(
+            knowledge_base.search_many, request.queries, request.n_results, filter_dict
+        )
+        return {
+            "results": [
+                {"query": query, "results": documents}
+                for query, documents in zip(request.queries, results)
+            ]
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to batch search knowledge base: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/api/knowledge-base/documents/{doc_id}")
-async def delete_document(doc_id: str):
+async def delete_document(doc_id: str, tenant: Optional[str] = Depends(get_tenant)):
     """Delete a document from the knowledge base"""
     try:
-        knowledge_base = get_kb()
-        knowledge_base.delete_document(doc_id)
+        knowledge_base = await get_kb(tenant)
+        await asyncio.to_thread(knowledge_base.delete_document, doc_id)
+        if tenant:
+            kb_pool.refresh_size(tenant)
         return {"message": "Document deleted successfully", "document_id": doc_id}
     except HTTPException:
         raise
+    except PermissionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to delete document: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Cartesia voice catalog (served from the shared cache)
+@app.get("/api/voices")
+async def list_voices():
+    """List available Cartesia voices as a name-sorted id/name array"""
+    if voice_catalog.is_stale:
+        voice_catalog.refresh_in_background()
+    return Response(
+        content=voice_catalog.attribute_payload,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=300"}
+    )
+
 # Widget Configuration Endpoint
 @app.post("/api/widget/config")
 async def get_widget_config(config: WidgetConfig):
     """Get widget configuration for embedding"""
-    # Validate API key if provided
+    # Validate API key if provided (the gateway secret or a tenant's key)
+    tenant = None
     if config.api_key and config.api_key != API_SECRET_KEY:
-        raise HTTPException(status_code=401, detail="Invalid API key")
+        try:
+            tenant = tenant_directory.resolve(config.api_key)
+        except UnknownTenant:
+            raise HTTPException(status_code=401, detail="Invalid API key")
     
     return {
         "widget_url": f"{os.getenv('API_BASE_URL', 'http://localhost:8000')}/widget/embed.js",
@@ -521,6 +957,7 @@ async def get_widget_config(config: WidgetConfig):
             "position": config.position,
             "primaryColor": config.primary_color,
             "apiEndpoint": os.getenv('API_BASE_URL', 'http://localhost:8000'),
+            "tenant": tenant,
         }
     }
 
@@ -598,13 +1035,45 @@ async def general_exception_handler(request: Request, exc: Exception):
         }
     )
 
+def seed_knowledge_base():
+    """Load DEFAULT_KB_FILE once before read-only workers start (if the KB is empty)"""
+    kb_file = os.getenv("DEFAULT_KB_FILE", "sample_knowledge.json")
+    if not os.path.exists(kb_file) or os.getenv("KB_SNAPSHOT"):
+        return
+    try:
+        seed_kb = KnowledgeBase(read_only=False)
+        if seed_kb.collection.count() == 0:
+            seed_kb.load_from_file(kb_file)
+            logger.info(f"Seeded knowledge base from {kb_file}")
+    except Exception as e:
+        logger.error(f"Failed to seed knowledge base: {e}")
+
 if __name__ == "__main__":
     import uvicorn
     
-    # Run with Railway-compatible settings
-    uvicorn.run(
-        app,
-        host="0.0.0.0",  # Required for Railway
-        port=PORT,
-        log_level="info"
-    )
\ No newline at end of file
+    # Multi-worker mode: sessions and the agent registry must live in Redis so
+    # any worker can serve any session; workers open the KB read-only
+    workers = int(os.getenv("GATEWAY_WORKERS", os.getenv("WEB_CONCURRENCY", 1)))
+    if workers > 1 and not REDIS_URL:
+        logger.warning("GATEWAY_WORKERS > 1 requires REDIS_URL for shared session state; using 1 worker")
+        workers = 1
+    
+    if workers > 1:
+        seed_knowledge_base()
+        os.environ["KB_READ_ONLY"] = "1"
+        logger.info(f"Starting {workers} gateway workers")
+        uvicorn.run(
+            "api_gateway:app",
+            host="0.0.0.0",
+            port=PORT,
+            workers=workers,
+            log_level="info"
+        )
+    else:
+        # Run with Railway-compatible settings
+        uvicorn.run(
+            app,
+            host="0.0.0.0",  # Required for Railway
+            port=PORT,
+            log_level="info"
+        )
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end latency benchmark for the voice pipeline
+
+Usage:
+  python benchmarks/bench_e2e.py [--sessions 20] [--turns 5] [--backend numpy]
+                                 [--stt-ms 150] [--llm-ttft-ms 250] [--tts-ttfb-ms 120]
+                                 [--embed-ms 40] [--json results.json]
+
+Drives N concurrent simulated sessions through the real gateway app (in-process
+over ASGI), SessionManager (in-memory backend), KnowledgeBase and the
+RAGEnabledLLM retrieval path. STT, LLM, TTS and embeddings are local fakes with
+injected latency (see fakes.py), so the run needs no network access or API keys.
+
+Each turn: fake STT final transcript -> KB retrieval -> fake LLM first token ->
+first sentence -> fake TTS first audio frame. Reports throughput and per-stage
+p50/p99 so pipeline overhead regressions show up as deltas against the
+injected provider latency.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Dict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "agent"))
+
+# The gateway reads its configuration at import time: keep it hermetic
+os.environ.setdefault("LIVEKIT_API_KEY", "bench-key")
+os.environ.setdefault("LIVEKIT_API_SECRET", "bench-secret-bench-secret-bench-secret")
+os.environ["REDIS_URL"] = ""
+os.environ["KB_SHARED_SERVICE"] = ""
+
+import httpx
+
+import api_gateway
+from session_manager import SessionManager
+from knowledge_base import KnowledgeBase
+from latency import LatencyHistogram, TurnLatencyTracker, TURN_STAGES
+from rag_llm import RAGEnabledLLM
+from fakes import FakeEmbedder, FakeLLM, FakeSTT, FakeTTS, InjectedLatency
+
+UTTERANCES = [
+    "What is the company mission?",
+    "Which products do you offer?",
+    "How much does the pro plan cost?",
+    "How do I get started with the SDK?",
+    "Do you offer enterprise support?",
+    "Can I try it for free?",
+    "What does AudioScribe do?",
+    "How do I get my API keys?",
+]
+
+# Stages measured by the harness in addition to the agent's turn stages
+GATEWAY_STAGES = ("session_create", "session_end")
+
+
+async def run_session(index: int, args, client: httpx.AsyncClient, kb: KnowledgeBase,
+                      providers: Dict, aggregate: Dict[str, LatencyHistogram]):
+    """Simulate one caller: create a session, run its turns, end it"""
+    rng = random.Random(args.seed + index)
+
+    start = time.perf_counter()
+    response = await client.post("/api/sessions/create", json={"user_id": f"bench-{index}"})
+    response.raise_for_status()
+    aggregate["session_create"].observe(time.perf_counter() - start)
+    session_id = response.json()["session_id"]
+
+    tracker = TurnLatencyTracker(session_id=session_id)
+    rag_llm = RAGEnabledLLM(kb, providers["llm"], tracker)
+
+    for _ in range(args.turns):
+        utterance = rng.choice(UTTERANCES)
+        tracker.start_turn()
+
+        transcript = await providers["stt"].transcribe(utterance)
+        tracker.mark("stt_final")
+
+        context = await asyncio.to_thread(rag_llm.retrieve_context, transcript)
+
+        llm_start = time.monotonic()
+        sentence = ""
+        tts_stream = None
+        async for token in providers["llm"].stream(f"{context}\n{transcript}"):
+            if not sentence:
+                tracker.record_duration("llm_ttft", time.monotonic() - llm_start)
+            sentence += token
+            if tts_stream is None and token.endswith("."):
+                # First sentence is ready: start synthesis and wait for audio
+                tts_start = time.monotonic()
+                tts_stream = providers["tts"].synthesize(sentence)
+                await tts_stream.__anext__()
+                tracker.record_duration("tts_ttfb", time.monotonic() - tts_start)
+                tracker.end_turn()
+        if tts_stream is None:
+            tracker.end_turn()
+        else:
+            async for _ in tts_stream:
+                pass
+
+        # Pause between turns, as a caller would
+        await asyncio.sleep(args.think_ms / 1000.0)
+    tracker.flush()
+
+    start = time.perf_counter()
+    response = await client.post(f"/api/sessions/{session_id}/end")
+    response.raise_for_status()
+    aggregate["session_end"].observe(time.perf_counter() - start)
+
+    for stage, histogram in tracker.histograms.items():
+        aggregate[stage].merge(histogram)
+
+
+def format_ms(seconds) -> str:
+    return f"{seconds * 1000:.1f}" if seconds is not None else "-"
+
+
+async def main_async(args) -> Dict:
+    jitter = args.jitter
+    embedder = FakeEmbedder(latency=InjectedLatency(args.embed_ms, jitter), seed=args.seed)
+    providers = {
+        "stt": FakeSTT(InjectedLatency(args.stt_ms, jitter), seed=args.seed),
+        "llm": FakeLLM(InjectedLatency(args.llm_ttft_ms, jitter), InjectedLatency(args.llm_token_ms, jitter),
+                       seed=args.seed),
+        "tts": FakeTTS(InjectedLatency(args.tts_ttfb_ms, jitter), seed=args.seed),
+    }
+
+    with tempfile.TemporaryDirectory(prefix="kb-bench-") as persist_directory:
+        kb = KnowledgeBase(
+            collection_name="bench_kb",
+            persist_directory=persist_directory,
+            storage_backend=args.backend,
+            embedding_function=embedder,
+        )
+        kb.load_from_file(args.kb_file)
+
+        # lifespan does not run under ASGITransport: wire the components directly
+        api_gateway.kb = kb
+        api_gateway.session_manager = SessionManager(
+            redis_url=None,
+            latency_observer=api_gateway.metrics.observe_session_backend
+        )
+
+        window = max(2048, args.sessions * args.turns)
+        aggregate = {stage: LatencyHistogram(window=window) for stage in GATEWAY_STAGES + TURN_STAGES}
+
+        transport = httpx.ASGITransport(app=api_gateway.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                run_session(i, args, client, kb, providers, aggregate)
+                for i in range(args.sessions)
+            ))
+            elapsed = time.perf_counter() - start
+
+        turns = args.sessions * args.turns
+        return {
+            "config": vars(args),
+            "elapsed_seconds": elapsed,
+            "sessions_per_second": args.sessions / elapsed,
+            "turns_per_second": turns / elapsed,
+            "embedding_calls": embedder.calls,
+            "stages": {stage: histogram.summary() for stage, histogram in aggregate.items()
+                       if histogram.count},
+            "gateway_routes": {
+                f"{method} {route}": histogram.summary()
+                for (method, route), histogram in api_gateway.metrics.route_latency.items()
+            },
+        }
+
+
+def print_report(report: Dict):
+    config = report["config"]
+    print(f"Sessions: {config['sessions']}, turns/session: {config['turns']}, "
+          f"backend: {config['backend']}, elapsed: {report['elapsed_seconds']:.2f}s")
+    print(f"Throughput: {report['sessions_per_second']:.1f} sessions/s, "
+          f"{report['turns_per_second']:.1f} turns/s, embedding calls: {report['embedding_calls']}")
+
+    for title, rows in (("stage", report["stages"]), ("gateway route", report["gateway_routes"])):
+        print(f"\n{title:<40}{'count':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+        for name, summary in rows.items():
+            print(f"{name:<40}{summary['count']:>8}{format_ms(summary['p50']):>12}{format_ms(summary['p99']):>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session")
+    parser.add_argument("--backend", choices=("numpy", "chroma"), default="numpy", help="KB storage backend")
+    parser.add_argument("--kb-file", default=os.path.join(ROOT, "agent", "sample_knowledge.json"),
+                        help="Knowledge base JSON file to load")
+    parser.add_argument("--stt-ms", type=float, default=150, help="Fake STT final transcript delay")
+    parser.add_argument("--embed-ms", type=float, default=40, help="Fake embedding call latency")
+    parser.add_argument("--llm-ttft-ms", type=float, default=250, help="Fake LLM time to first token")
+    parser.add_argument("--llm-token-ms", type=float, default=15, help="Fake LLM inter-token latency")
+    parser.add_argument("--tts-ttfb-ms", type=float, default=120, help="Fake TTS time to first audio")
+    parser.add_argument("--think-ms", type=float, default=200, help="Caller pause between turns")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative +/- jitter on injected latency")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
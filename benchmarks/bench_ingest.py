@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Streaming ingestion benchmark for the numpy knowledge base backend
+
+Usage:
+  python benchmarks/bench_ingest.py [--docs 100000] [--batch-size 256] [--dim 256]
+                                    [--json results.json]
+
+Writes an NDJSON file of synthetic documents, then streams it into a fresh
+numpy-backed KnowledgeBase with fake embeddings (see fakes.py), so the run
+needs no network access or API keys. Reports throughput, the time spent
+writing batches at the start and the end of the load, and resident memory
+at each tenth of the file.
+
+No index file is rewritten per batch: each add writes one segment, and
+merges rewrite each row O(log n) times. Batch time still grows slowly with
+the index, from copying its in-memory id, document and metadata lists into
+each new generation. Resident memory grows with the index by those lists
+and the mapped pages of its matrices. Parsing and embedding hold one batch.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import psutil
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT, "agent"))
+
+from fakes import FakeEmbedder
+from kb_ingest import IngestStats, iter_documents
+from knowledge_base import KnowledgeBase
+
+WORDS = ("trail", "running", "shoe", "cushion", "foam", "recycled", "return", "policy",
+         "shipping", "warranty", "lab", "mission", "fit", "size", "grip", "outsole")
+
+
+def write_corpus(path: str, count: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            words = " ".join(WORDS[(i * 7 + j * 3) % len(WORDS)] for j in range(40))
+            f.write(json.dumps({"content": f"Document {i}: {words}",
+                                "metadata": {"category": WORDS[i % len(WORDS)]}}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100000, help="Documents in the generated file")
+    parser.add_argument("--batch-size", type=int, default=256, help="Documents embedded and written per step")
+    parser.add_argument("--dim", type=int, default=256, help="Fake embedding dimensions")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    process = psutil.Process()
+    with tempfile.TemporaryDirectory(prefix="kb-ingest-") as workdir:
+        corpus = os.path.join(workdir, "corpus.ndjson")
+        write_corpus(corpus, args.docs)
+        kb = KnowledgeBase(collection_name="bench_ingest", persist_directory=workdir,
+                           storage_backend="numpy", embedding_function=FakeEmbedder(dim=args.dim))
+
+        batch_seconds = []
+        rss_mb = {}
+        last = [time.perf_counter()]
+        checkpoints = iter(range(1, 11))
+        next_checkpoint = [next(checkpoints)]
+
+        def on_batch(stats: IngestStats):
+            now = time.perf_counter()
+            batch_seconds.append(now - last[0])
+            last[0] = now
+            while next_checkpoint[0] is not None and stats.documents >= args.docs * next_checkpoint[0] / 10:
+                rss_mb[f"{next_checkpoint[0] * 10}%"] = round(process.memory_info().rss / 1e6, 1)
+                next_checkpoint[0] = next(checkpoints, None)
+
+        stats = IngestStats()
+        baseline_mb = process.memory_info().rss / 1e6
+        kb.add_documents_stream(iter_documents(corpus, stats), batch_size=args.batch_size,
+                                stats=stats, on_batch=on_batch)
+
+        tenth = max(1, len(batch_seconds) // 10)
+        results = {
+            "documents": stats.documents,
+            "documents_per_second": round(stats.documents_per_second),
+            "segments": len(kb.collection.generation.segments),
+            "first_tenth_batch_ms": round(statistics.median(batch_seconds[:tenth]) * 1000, 2),
+            "last_tenth_batch_ms": round(statistics.median(batch_seconds[-tenth:]) * 1000, 2),
+            "baseline_rss_mb": round(baseline_mb, 1),
+            "rss_mb": rss_mb,
+        }
+
+    print(f"Loaded {results['documents']:,} documents at {results['documents_per_second']:,} docs/s "
+          f"into {results['segments']} segments")
+    print(f"Median batch time: {results['first_tenth_batch_ms']} ms (first tenth), "
+          f"{results['last_tenth_batch_ms']} ms (last tenth)")
+    print(f"RSS: {results['baseline_rss_mb']} MB before, "
+          + ", ".join(f"{k}: {v} MB" for k, v in results["rss_mb"].items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
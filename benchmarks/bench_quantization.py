@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark compact embedding storage: reduced dimensions, float16/int8 and rescoring
+
+Usage:
+  python benchmarks/bench_quantization.py [--docs 50000] [--queries 200] [--k 5]
+                                          [--dims 1536,512,256] [--rescore 4]
+                                          [--vectors embeddings.npy]
+
+Builds a NumpyVectorIndex for every combination of embedding dimension and
+storage dtype (float16/int8 also with full-precision rescoring) and reports
+scanned index memory, on-disk size, single-query latency and recall@k against
+exact search over the full-dimension float32 vectors.
+
+By default the corpus is synthetic: clustered vectors whose variance decays
+along the dimensions, mimicking text-embedding-3 embeddings, which keep most
+of their information in the leading dimensions (shortening them is truncation
+plus renormalization). Pass --vectors with a (n, dim) float32 .npy of real
+embeddings, e.g. seg-00000001.vectors.npy from a float32 snapshot, to measure on your corpus;
+queries are then perturbed copies of random documents.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT, "agent"))
+
+from latency import LatencyHistogram
+from vector_index import NumpyVectorIndex, normalize_rows
+
+
+def synthetic_corpus(docs: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dim) / 64.0)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, docs)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((docs, dim)).astype(np.float32)
+    return normalize_rows(vectors * decay)
+
+
+def make_queries(corpus: np.ndarray, count: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    picks = corpus[rng.integers(0, len(corpus), count)]
+    noise = rng.standard_normal(picks.shape).astype(np.float32) / np.sqrt(corpus.shape[1])
+    return normalize_rows(picks + 0.5 * noise)
+
+
+def shorten(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """What requesting `dim` dimensions from the model returns: truncate and renormalize"""
+    return normalize_rows(vectors[:, :dim])
+
+
+def disk_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+               if name.endswith(".npy"))
+
+
+def run_config(corpus: np.ndarray, queries: np.ndarray, truth: List[set], dim: int,
+               dtype: str, rescore: int, k: int, workdir: str) -> Dict[str, float]:
+    vectors = shorten(corpus, dim) if dim < corpus.shape[1] else corpus
+    query_vectors = shorten(queries, dim) if dim < queries.shape[1] else queries
+    ids = [str(i) for i in range(len(vectors))]
+    path = tempfile.mkdtemp(dir=workdir)
+    index = NumpyVectorIndex(path=path, name="bench", embedding_function=None,
+                             dtype=dtype, rescore_factor=rescore)
+    index.replace_all(vectors, [""] * len(ids), [{}] * len(ids), ids)
+
+    # Warm the page cache so every configuration is measured from memory
+    index.query_embeddings(query_vectors[:1], n_results=k)
+    latency = LatencyHistogram()
+    hits = 0
+    for row, query in enumerate(query_vectors):
+        start = time.perf_counter()
+        result = index.query_embeddings(query[None, :], n_results=k)
+        latency.observe(time.perf_counter() - start)
+        hits += len(truth[row] & {int(doc_id) for doc_id in result["ids"][0]})
+
+    return {
+        "dim": dim,
+        "dtype": dtype,
+        "rescore": rescore,
+        "index_mb": index.nbytes / 1e6,
+        "disk_mb": disk_bytes(path) / 1e6,
+        "p50_ms": latency.percentile(50) * 1000,
+        "p99_ms": latency.percentile(99) * 1000,
+        "recall": hits / (len(truth) * k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=1536, help="Synthetic embedding dimension")
+    parser.add_argument("--clusters", type=int, default=500, help="Synthetic topic clusters")
+    parser.add_argument("--vectors", help="Real (n, dim) float32 embeddings (.npy) instead of synthetic ones")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5, help="Results per query (recall@k)")
+    parser.add_argument("--dims", default="1536,512,256", help="Comma-separated embedding dimensions")
+    parser.add_argument("--rescore", type=int, default=4, help="Shortlist factor for rescored runs")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    if args.vectors:
+        corpus = normalize_rows(np.load(args.vectors))
+    else:
+        corpus = synthetic_corpus(args.docs, args.dim, args.clusters, args.seed)
+    queries = make_queries(corpus, args.queries, args.seed)
+
+    # Ground truth: exact float32 search over the full-dimension vectors
+    scores = queries @ corpus.T
+    truth = [set(np.argpartition(-row, args.k - 1)[:args.k].tolist()) for row in scores]
+    del scores
+
+    dims = [d for d in (int(x) for x in args.dims.split(",")) if d <= corpus.shape[1]]
+    configs = []
+    for dim in dims:
+        configs.append((dim, "float32", 0))
+        for dtype in ("float16", "int8"):
+            configs.append((dim, dtype, 0))
+            if args.rescore:
+                configs.append((dim, dtype, args.rescore))
+
+    print(f"corpus: {len(corpus):,} x {corpus.shape[1]}, {len(queries)} queries, recall@{args.k} "
+          f"vs exact float32 {corpus.shape[1]}-dim")
+    print(f"{'dim':>6}{'dtype':>9}{'rescore':>9}{'index MB':>10}{'disk MB':>9}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'recall':>8}")
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for dim, dtype, rescore in configs:
+            result = run_config(corpus, queries, truth, dim, dtype, rescore, args.k, workdir)
+            results.append(result)
+            print(f"{dim:>6}{dtype:>9}{(f'x{rescore}' if rescore else '-'):>9}"
+                  f"{result['index_mb']:>10.1f}{result['disk_mb']:>9.1f}"
+                  f"{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['recall']:>8.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"docs": len(corpus), "dim": int(corpus.shape[1]), "k": args.k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark KnowledgeBase.search_many against N sequential search calls
+
+Usage:
+  python benchmarks/bench_search_many.py [--queries 32] [--rounds 5] [--n-results 3]
+
+Runs against the knowledge base configured in the environment
+(KB_STORAGE_BACKEND, OPENAI_API_KEY, ./chroma_db). Every round pays the
+embedding call and the vector lookup.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agent"))
+
+from dotenv import load_dotenv
+from knowledge_base import KnowledgeBase
+
+load_dotenv()
+
+BASE_QUERIES = [
+    "What is the company mission?",
+    "Which products are made from recycled materials?",
+    "How does the cushioning technology work?",
+    "What is the return policy?",
+    "Do you ship internationally?",
+    "Tell me about trail running shoes",
+    "Where is the lab located?",
+    "What are the core values?",
+]
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=32, help="Queries per round")
+    parser.add_argument("--rounds", type=int, default=5, help="Measured rounds")
+    parser.add_argument("--n-results", type=int, default=3, help="Results per query")
+    args = parser.parse_args()
+
+    kb = KnowledgeBase()
+    # Distinct texts so batching cannot benefit from deduplication
+    queries = [f"{BASE_QUERIES[i % len(BASE_QUERIES)]} ({i})" for i in range(args.queries)]
+
+    print(f"Backend: {kb.storage_backend}, documents: {kb.collection.count()}, "
+          f"queries/round: {len(queries)}, rounds: {args.rounds}")
+
+    # Warm up connections and lazily loaded state
+    kb.search(queries[0], n_results=args.n_results)
+
+    sequential = [
+        timed(lambda: [kb.search(q, n_results=args.n_results) for q in queries])
+        for _ in range(args.rounds)
+    ]
+    batched = [
+        timed(lambda: kb.search_many(queries, n_results=args.n_results))
+        for _ in range(args.rounds)
+    ]
+
+    seq_median = statistics.median(sequential)
+    batch_median = statistics.median(batched)
+    print(f"\n{'mode':<12}{'median (s)':>12}{'per query (ms)':>16}{'queries/s':>12}")
+    for name, median in (("sequential", seq_median), ("search_many", batch_median)):
+        print(f"{name:<12}{median:>12.3f}{median / len(queries) * 1000:>16.2f}{len(queries) / median:>12.1f}")
+    print(f"\nSpeedup: {seq_median / batch_median:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark LiveKit token minting and session creation throughput per core
+
+Usage:
+  python benchmarks/bench_tokens.py [--tokens 20000] [--sessions 5000] [--concurrency 50]
+
+Compares building every token with livekit.api.AccessToken (the previous
+create_session path) against TokenMinter's prebuilt claims template and its
+reconnect cache, then drives POST /api/sessions/create in-process (over ASGI,
+in-memory sessions) with each minting strategy. Rates are divided by CPU time
+consumed by this process, i.e. they are per core.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "agent"))
+
+os.environ.setdefault("LIVEKIT_API_KEY", "bench-key")
+os.environ.setdefault("LIVEKIT_API_SECRET", "bench-secret-bench-secret-bench-secret")
+os.environ["REDIS_URL"] = ""
+
+import httpx
+from livekit import api
+
+import api_gateway
+from session_manager import SessionManager
+from token_service import TokenMinter
+
+API_KEY = os.environ["LIVEKIT_API_KEY"]
+API_SECRET = os.environ["LIVEKIT_API_SECRET"]
+
+
+class AccessTokenMinter:
+    """Builds every token through livekit.api.AccessToken, as create_session used to"""
+
+    def get_token(self, identity: str, room: str, name=None) -> str:
+        token = api.AccessToken(API_KEY, API_SECRET)
+        token.with_identity(identity)
+        token.with_name(name or identity)
+        token.with_grants(api.VideoGrants(
+            room_join=True,
+            room=room,
+            can_publish=True,
+            can_subscribe=True,
+            can_publish_data=True
+        ))
+        return token.to_jwt()
+
+
+def per_cpu_second(count: int, fn) -> float:
+    start = time.process_time()
+    fn()
+    return count / max(time.process_time() - start, 1e-9)
+
+
+def bench_minting(count: int):
+    legacy = AccessTokenMinter()
+    minter = TokenMinter(API_KEY, API_SECRET)
+
+    rows = [
+        ("AccessToken builder", per_cpu_second(count, lambda: [
+            legacy.get_token(f"user-{i}", f"room-{i}") for i in range(count)])),
+        ("TokenMinter.mint", per_cpu_second(count, lambda: [
+            minter.mint(f"user-{i}", f"room-{i}") for i in range(count)])),
+    ]
+    minter.get_token("user-reconnect", "room-reconnect")
+    rows.append(("reconnect cache hit", per_cpu_second(count, lambda: [
+        minter.get_token("user-reconnect", "room-reconnect") for _ in range(count)])))
+
+    print(f"{'token minting':<24}{'tokens/s/core':>16}")
+    for name, rate in rows:
+        print(f"{name:<24}{rate:>16,.0f}")
+
+
+async def create_sessions(count: int, concurrency: int) -> float:
+    api_gateway.session_manager = SessionManager(redis_url=None)
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=api_gateway.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                response = await client.post("/api/sessions/create", json={"user_id": f"bench-{i}"})
+                response.raise_for_status()
+
+        start = time.process_time()
+        await asyncio.gather(*(one(i) for i in range(count)))
+        return count / max(time.process_time() - start, 1e-9)
+
+
+def bench_sessions(count: int, concurrency: int):
+    print(f"\n{'create_session':<24}{'sessions/s/core':>16}")
+    for name, minter in (("AccessToken builder", AccessTokenMinter()),
+                         ("TokenMinter", TokenMinter(API_KEY, API_SECRET))):
+        api_gateway.token_minter = minter
+        rate = asyncio.run(create_sessions(count, concurrency))
+        print(f"{name:<24}{rate:>16,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20000, help="Tokens minted per strategy")
+    parser.add_argument("--sessions", type=int, default=5000, help="Sessions created per strategy")
+    parser.add_argument("--concurrency", type=int, default=50, help="In-flight create requests")
+    args = parser.parse_args()
+
+    bench_minting(args.tokens)
+    bench_sessions(args.sessions, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
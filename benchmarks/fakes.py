@@ -0,0 +1,110 @@
+"""
+Offline stand-ins for the voice pipeline's external providers
+Deterministic fake embedding, STT, LLM and TTS providers with configurable
+injected latency, so benchmarks run without network access or API keys
+"""
+
+import asyncio
+import hashlib
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Sequence
+
+import numpy as np
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class InjectedLatency:
+    """Latency distribution for a fake provider call: mean +/- uniform jitter"""
+    mean_ms: float = 0.0
+    jitter: float = 0.2
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one latency in seconds"""
+        if self.mean_ms <= 0:
+            return 0.0
+        spread = self.mean_ms * self.jitter
+        return max(0.0, rng.uniform(self.mean_ms - spread, self.mean_ms + spread)) / 1000.0
+
+
+class FakeEmbedder:
+    """
+    Hashed bag-of-words embeddings
+
+    Texts sharing words get similar vectors, so retrieval results stay
+    meaningful. Usable as the KnowledgeBase embedding_function for both
+    storage backends (the parameter is named `input` as ChromaDB expects).
+    """
+
+    def __init__(self, dim: int = 256, latency: Optional[InjectedLatency] = None, seed: int = 0):
+        self.dim = dim
+        self.latency = latency or InjectedLatency()
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD_RE.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        self.calls += 1
+        # One provider round trip per call, whatever the batch size
+        time.sleep(self.latency.sample(self._rng))
+        return [self._embed(text).tolist() for text in input]
+
+
+class FakeSTT:
+    """Returns the scripted utterance as its final transcript after an injected delay"""
+
+    def __init__(self, latency: InjectedLatency, seed: int = 0):
+        self.latency = latency
+        self._rng = random.Random(seed)
+
+    async def transcribe(self, utterance: str) -> str:
+        await asyncio.sleep(self.latency.sample(self._rng))
+        return utterance
+
+
+class FakeLLM:
+    """Streams a canned answer: first token after `ttft`, then one token per `token_latency`"""
+
+    def __init__(self, ttft: InjectedLatency, token_latency: InjectedLatency,
+                 response_tokens: int = 40, seed: int = 0):
+        self.ttft = ttft
+        self.token_latency = token_latency
+        self.response_tokens = response_tokens
+        self._rng = random.Random(seed)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        words = _WORD_RE.findall(prompt.lower()) or ["ok"]
+        await asyncio.sleep(self.ttft.sample(self._rng))
+        for i in range(self.response_tokens):
+            if i:
+                await asyncio.sleep(self.token_latency.sample(self._rng))
+            token = words[i % len(words)]
+            # Sentence boundary every 12 tokens so TTS can start early
+            yield token + ("." if i % 12 == 11 else " ")
+
+
+class FakeTTS:
+    """Produces silent 20 ms PCM frames; the first frame arrives after `ttfb`"""
+
+    FRAME_BYTES = 640  # 20 ms of 16 kHz 16-bit mono
+
+    def __init__(self, ttfb: InjectedLatency, seed: int = 0):
+        self.ttfb = ttfb
+        self._rng = random.Random(seed)
+
+    async def synthesize(self, text: str) -> AsyncIterator[bytes]:
+        await asyncio.sleep(self.ttfb.sample(self._rng))
+        # Roughly 60 ms of audio per word
+        for _ in range(max(1, len(text.split()) * 3)):
+            yield b"\x00" * self.FRAME_BYTES
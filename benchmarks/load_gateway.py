@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Load generator for the API gateway
+
+Usage:
+  python benchmarks/load_gateway.py --url http://127.0.0.1:8000 [--scenario all]
+  python benchmarks/load_gateway.py --in-process [--session-backend memory|fakeredis]
+
+Scenarios (--scenario, repeatable; default: all):
+  sessions   Burst of POST /api/sessions/create -> GET -> POST /end at a fixed concurrency
+  websockets Long-lived /ws/{session_id} connections exchanging chat and ping messages
+  kb-search  Concurrent POST /api/knowledge-base/search requests
+
+Reports req/s, latency p50/p95/p99 and errors per operation, plus the gateway's
+resident memory (sampled from /metrics) before, during and after each scenario.
+
+With --in-process the gateway is started locally on a free port with a temporary
+knowledge base using fake embeddings (see fakes.py), and sessions stored either
+in memory or in fakeredis as a local Redis stand-in. Memory figures then include
+the load generator itself.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "agent"))
+
+import httpx
+import websockets
+
+from latency import LatencyHistogram
+
+SCENARIOS = ("sessions", "websockets", "kb-search")
+
+SEARCH_QUERIES = [
+    "What is the company mission?",
+    "Which products do you offer?",
+    "How much does the pro plan cost?",
+    "How do I get started?",
+    "Do you offer enterprise support?",
+    "What does AudioScribe do?",
+]
+
+
+class ScenarioStats:
+    """Per-operation latency histograms and error counts for one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.memory: Dict[str, Optional[int]] = {}
+
+    def observe(self, operation: str, seconds: float):
+        histogram = self.latency.get(operation)
+        if histogram is None:
+            histogram = self.latency[operation] = LatencyHistogram(window=1_000_000)
+        histogram.observe(seconds)
+
+    def error(self, operation: str):
+        self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    async def timed(self, operation: str, request):
+        """Await an httpx request coroutine, recording its latency and failures"""
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            self.error(operation)
+            return None
+        self.observe(operation, time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.error(operation)
+            return None
+        return response
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict:
+        operations = {}
+        for operation, histogram in self.latency.items():
+            summary = histogram.summary()
+            operations[operation] = {
+                "count": summary["count"],
+                "errors": self.errors.get(operation, 0),
+                "rps": summary["count"] / self.elapsed if self.elapsed else None,
+                "p50": summary["p50"],
+                "p95": summary["p95"],
+                "p99": summary["p99"],
+            }
+        for operation, count in self.errors.items():
+            operations.setdefault(operation, {"count": 0, "errors": count, "rps": 0.0,
+                                              "p50": None, "p95": None, "p99": None})
+        return {"elapsed_seconds": self.elapsed, "operations": operations, "memory_bytes": self.memory}
+
+
+async def gateway_rss(client: httpx.AsyncClient) -> Optional[int]:
+    """Resident memory of the gateway process as reported by /metrics"""
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return None
+    for line in response.text.splitlines():
+        if line.startswith("process_resident_memory_bytes "):
+            return int(float(line.split()[1]))
+    return None
+
+
+async def sample_peak_rss(client: httpx.AsyncClient, stats: ScenarioStats, stop: asyncio.Event):
+    peak = None
+    while not stop.is_set():
+        rss = await gateway_rss(client)
+        if rss is not None:
+            peak = max(peak or 0, rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+        except asyncio.TimeoutError:
+            pass
+    stats.memory["peak"] = peak
+
+
+async def create_session(client: httpx.AsyncClient, stats: ScenarioStats, index: int) -> Optional[str]:
+    response = await stats.timed("session_create",
+                                 client.post("/api/sessions/create", json={"user_id": f"load-{index}"}))
+    return response.json()["session_id"] if response is not None else None
+
+
+async def run_sessions(client: httpx.AsyncClient, args, stats: ScenarioStats):
+    """Session churn: create, read back and end sessions as fast as the gateway allows"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int):
+        async with semaphore:
+            session_id = await create_session(client, stats, index)
+            if session_id is None:
+                return
+            await stats.timed("session_get", client.get(f"/api/sessions/{session_id}"))
+            await stats.timed("session_end", client.post(f"/api/sessions/{session_id}/end"))
+
+    await asyncio.gather(*(one(i) for i in range(args.sessions)))
+
+
+async def run_websockets(client: httpx.AsyncClient, args, stats: ScenarioStats):
+    """Long-lived WebSockets sending chat/ping messages at a steady per-connection rate"""
+    ws_base = args.url.replace("http://", "ws://", 1).replace("https://", "wss://", 1).rstrip("/")
+    interval = 1.0 / args.ws_rate if args.ws_rate > 0 else 0.0
+    deadline = time.perf_counter() + args.duration
+
+    async def one(index: int):
+        rng = random.Random(args.seed + index)
+        session_id = await create_session(client, stats, index)
+        if session_id is None:
+            return
+
+        start = time.perf_counter()
+        try:
+            connection = await websockets.connect(f"{ws_base}/ws/{session_id}")
+        except (OSError, websockets.WebSocketException):
+            stats.error("ws_connect")
+            return
+        stats.observe("ws_connect", time.perf_counter() - start)
+
+        message_id = 0
+        try:
+            # Stagger connections so sends are not synchronized
+            await asyncio.sleep(rng.uniform(0, interval))
+            while time.perf_counter() < deadline:
+                message_id += 1
+                if rng.random() < args.chat_ratio:
+                    operation = "ws_chat"
+                    payload = {"type": "chat", "id": message_id, "content": rng.choice(SEARCH_QUERIES)}
+                else:
+                    operation = "ws_ping"
+                    payload = {"type": "ping"}
+
+                start = time.perf_counter()
+                await connection.send(json.dumps(payload))
+                await connection.recv()
+                stats.observe(operation, time.perf_counter() - start)
+                await asyncio.sleep(interval)
+        except websockets.WebSocketException:
+            stats.error("ws_message")
+        finally:
+            await connection.close()
+
+    await asyncio.gather(*(one(i) for i in range(args.websockets)))
+
+
+async def run_kb_search(client: httpx.AsyncClient, args, stats: ScenarioStats):
+    """Search storm against the knowledge base endpoint"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(index: int):
+        query = SEARCH_QUERIES[index % len(SEARCH_QUERIES)]
+        if args.distinct_queries:
+            # Unique texts, so results cannot come from any cache along the way
+            query = f"{query} ({index})"
+        async with semaphore:
+            await stats.timed("kb_search",
+                              client.post("/api/knowledge-base/search", params={"query": query, "n_results": 3}))
+
+    await asyncio.gather(*(one(i) for i in range(args.searches)))
+
+
+RUNNERS = {
+    "sessions": run_sessions,
+    "websockets": run_websockets,
+    "kb-search": run_kb_search,
+}
+
+
+async def run_scenario(name: str, client: httpx.AsyncClient, args) -> ScenarioStats:
+    stats = ScenarioStats(name)
+    stats.memory["before"] = await gateway_rss(client)
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_peak_rss(client, stats, stop))
+
+    stats.started = time.perf_counter()
+    await RUNNERS[name](client, args, stats)
+    stats.finish()
+
+    stop.set()
+    await sampler
+    stats.memory["after"] = await gateway_rss(client)
+    return stats
+
+
+class InProcessGateway:
+    """Runs the gateway app under uvicorn in a background thread"""
+
+    def __init__(self, session_backend: str):
+        self.session_backend = session_backend
+        self.server = None
+        self.thread: Optional[threading.Thread] = None
+        self.persist_directory = tempfile.TemporaryDirectory(prefix="kb-load-")
+
+    def start(self) -> str:
+        # Read by the gateway at import time
+        os.environ.setdefault("LIVEKIT_API_KEY", "load-key")
+        os.environ.setdefault("LIVEKIT_API_SECRET", "load-secret-load-secret-load-secret")
+        os.environ["REDIS_URL"] = ""
+
+        import uvicorn
+        import api_gateway
+        from knowledge_base import KnowledgeBase
+        from fakes import FakeEmbedder
+
+        redis_client = None
+        if self.session_backend == "fakeredis":
+            try:
+                import fakeredis
+            except ImportError:
+                raise SystemExit("--session-backend fakeredis requires: pip install fakeredis")
+            redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+        kb = KnowledgeBase(
+            collection_name="load_kb",
+            persist_directory=self.persist_directory.name,
+            storage_backend="numpy",
+            embedding_function=FakeEmbedder(),
+        )
+        kb.load_from_file(os.path.join(ROOT, "agent", "sample_knowledge.json"))
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        config = uvicorn.Config(api_gateway.app, host="127.0.0.1", port=port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, name="gateway", daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise SystemExit("In-process gateway failed to start")
+            time.sleep(0.05)
+
+        # Startup has run: swap in the fake knowledge base and session backend
+        api_gateway.kb = kb
+        if redis_client is not None:
+            api_gateway.session_manager.redis_client = redis_client
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.should_exit = True
+            self.thread.join(timeout=10)
+        self.persist_directory.cleanup()
+
+
+def format_ms(seconds) -> str:
+    return f"{seconds * 1000:.1f}" if seconds is not None else "-"
+
+
+def format_mb(value) -> str:
+    return f"{value / 1024 / 1024:.1f}" if value is not None else "-"
+
+
+def print_report(results: Dict[str, Dict]):
+    for name, result in results.items():
+        memory = result["memory_bytes"]
+        print(f"\n== {name} ({result['elapsed_seconds']:.2f}s) "
+              f"gateway RSS MB before/peak/after: {format_mb(memory.get('before'))}/"
+              f"{format_mb(memory.get('peak'))}/{format_mb(memory.get('after'))}")
+        print(f"{'operation':<16}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}")
+        for operation, row in result["operations"].items():
+            rps = f"{row['rps']:.1f}" if row["rps"] is not None else "-"
+            print(f"{operation:<16}{row['count']:>8}{row['errors']:>8}{rps:>10}"
+                  f"{format_ms(row['p50']):>11}{format_ms(row['p95']):>11}{format_ms(row['p99']):>11}")
+
+
+async def main_async(args) -> Dict[str, Dict]:
+    limits = httpx.Limits(max_connections=args.concurrency + 8, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        for name in args.scenarios:
+            stats = await run_scenario(name, client, args)
+            results[name] = stats.to_dict()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Gateway base URL")
+    parser.add_argument("--in-process", action="store_true", help="Start a local gateway instead of using --url")
+    parser.add_argument("--session-backend", choices=("memory", "fakeredis"), default="memory",
+                        help="Session storage for --in-process")
+    parser.add_argument("--scenario", dest="scenarios", action="append", choices=SCENARIOS + ("all",),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--concurrency", type=int, default=50, help="In-flight requests for sessions/kb-search")
+    parser.add_argument("--sessions", type=int, default=1000, help="Sessions created in the sessions scenario")
+    parser.add_argument("--websockets", type=int, default=200, help="Concurrent WebSocket connections")
+    parser.add_argument("--duration", type=float, default=30.0, help="WebSocket scenario duration in seconds")
+    parser.add_argument("--ws-rate", type=float, default=1.0, help="Messages per second per WebSocket")
+    parser.add_argument("--chat-ratio", type=float, default=0.5, help="Share of WebSocket messages that are chat")
+    parser.add_argument("--searches", type=int, default=2000, help="Requests in the kb-search scenario")
+    parser.add_argument("--distinct-queries", action="store_true", help="Make every search query unique")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if not args.scenarios or "all" in args.scenarios:
+        args.scenarios = list(SCENARIOS)
+
+    gateway = None
+    if args.in_process:
+        gateway = InProcessGateway(args.session_backend)
+        args.url = gateway.start()
+        print(f"Started in-process gateway at {args.url} (sessions: {args.session_backend})")
+
+    try:
+        results = asyncio.run(main_async(args))
+    finally:
+        if gateway is not None:
+            gateway.stop()
+
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "scenarios": results}, f, indent=2)
+        print(f"\nWrote {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Profile API gateway cold start: module import time and time to liveness/readiness
+
+Usage:
+  python benchmarks/profile_startup.py [--root .] [--top 15] [--no-serve]
+
+1. Imports api_gateway in a fresh interpreter with `python -X importtime` and
+   lists the slowest top-level imports by cumulative time.
+2. Starts `python api_gateway.py` on a free port and reports how long it takes
+   until /live, /health and /ready answer 200.
+
+To compare with an older revision, check it out into a worktree and point
+--root at it:
+  git worktree add /tmp/gateway-old <rev>
+  python benchmarks/profile_startup.py --root /tmp/gateway-old
+"""
+
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(root: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Import api_gateway under -X importtime
+
+    Returns:
+        (total seconds, [(top-level module, cumulative seconds)] slowest first)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api_gateway"],
+        cwd=root, capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing api_gateway failed:\n{result.stderr[-2000:]}")
+
+    top_level: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        # Nesting is shown by two spaces per level after the separator
+        if match and len(match.group(3)) == 1:
+            module = match.group(4)
+            top_level[module] = top_level.get(module, 0.0) + int(match.group(2)) / 1e6
+    ranked = sorted(top_level.items(), key=lambda item: item[1], reverse=True)
+    return top_level.get("api_gateway", sum(top_level.values())), ranked
+
+
+def wait_for(url: str, deadline: float) -> Optional[float]:
+    """Poll until `url` returns 200; returns the time it first did"""
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.monotonic()
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def profile_serve(root: str, timeout: float) -> Dict[str, Optional[float]]:
+    """Start the gateway and time /live, /health and /ready"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    env = dict(os.environ, PORT=str(port))
+    start = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "api_gateway.py"], cwd=root, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    timings: Dict[str, Optional[float]] = {}
+    try:
+        deadline = start + timeout
+        for path in ("/live", "/health", "/ready"):
+            reached = wait_for(f"http://127.0.0.1:{port}{path}", deadline)
+            timings[path] = reached - start if reached is not None else None
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Checkout containing api_gateway.py")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for readiness")
+    parser.add_argument("--no-serve", action="store_true", help="Only profile imports")
+    args = parser.parse_args()
+
+    total, ranked = profile_imports(args.root)
+    print(f"import api_gateway: {total * 1000:.0f} ms")
+    print(f"\n{'top-level import':<40}{'cumulative (ms)':>16}")
+    for module, seconds in ranked[:args.top]:
+        print(f"{module:<40}{seconds * 1000:>16.1f}")
+
+    if not args.no_serve:
+        timings = profile_serve(args.root, args.timeout)
+        print(f"\n{'endpoint':<40}{'first 200 after (s)':>20}")
+        for path, seconds in timings.items():
+            # Older checkouts may not have /live or /ready
+            print(f"{path:<40}{(f'{seconds:.2f}' if seconds is not None else 'n/a'):>20}")
+
+
+if __name__ == "__main__":
+    main()
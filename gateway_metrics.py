@@ -0,0 +1,267 @@
+"""
+Prometheus metrics for the API Gateway
+Low-overhead ASGI instrumentation plus collectors for sessions, voice agents,
+session storage and the knowledge base
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from latency import LatencyHistogram, render_histogram_family
+
+# Label used for requests that did not match any route (keeps cardinality bounded)
+UNMATCHED_ROUTE = "__unmatched__"
+
+
+class GatewayMetrics:
+    """
+    Registry of gateway metrics
+
+    Histograms are created once per (method, route template) and carry a
+    pre-rendered label string, so the request hot path only does a tuple lookup
+    and a bucket increment.
+    """
+
+    def __init__(self):
+        self.route_latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.route_errors: Dict[Tuple[str, str], int] = {}
+        self.active_websockets = 0
+        self.websocket_connections_total = 0
+        self.sessions_created_total = 0
+        self.agent_spawn_latency = LatencyHistogram()
+        self.agent_spawn_failures_total = 0
+        self.session_backend_latency: Dict[str, LatencyHistogram] = {}
+        # Callables returning objects inspected at scrape time
+        self.collectors: Dict[str, Callable[[], Any]] = {}
+
+    def route_histogram(self, method: str, route: str) -> LatencyHistogram:
+        """Get (or create once) the latency histogram for a route"""
+        key = (method, route)
+        histogram = self.route_latency.get(key)
+        if histogram is None:
+            histogram = LatencyHistogram(labels=f'method="{method}",route="{route}"')
+            self.route_latency[key] = histogram
+        return histogram
+
+    def observe_session_backend(self, operation: str, seconds: float):
+        """SessionManager latency_observer callback"""
+        histogram = self.session_backend_latency.get(operation)
+        if histogram is None:
+            histogram = LatencyHistogram(labels=f'operation="{operation}"')
+            self.session_backend_latency[operation] = histogram
+        histogram.observe(seconds)
+
+    def register_collector(self, name: str, getter: Callable[[], Any]):
+        """Register a getter for a component inspected at scrape time"""
+        self.collectors[name] = getter
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format"""
+        lines: List[str] = []
+        lines += render_histogram_family(
+            "gateway_request_duration_seconds",
+            "HTTP request latency by route",
+            self.route_latency.values(),
+        )
+        lines += _counter(
+            "gateway_request_errors_total",
+            "HTTP responses with status >= 500 by route",
+            [(f'method="{method}",route="{route}"', count) for (method, route), count in self.route_errors.items()],
+        )
+        lines += _gauge("gateway_active_websockets", "Open WebSocket connections", [("", self.active_websockets)])
+        lines += _counter("gateway_websocket_connections_total", "Accepted WebSocket connections",
+                          [("", self.websocket_connections_total)])
+        lines += _counter("gateway_sessions_created_total", "Voice sessions created", [("", self.sessions_created_total)])
+
+        lines += render_histogram_family(
+            "gateway_agent_spawn_seconds",
+            "Time to spawn a voice agent process",
+            [self.agent_spawn_latency],
+        )
+        lines += _counter("gateway_agent_spawn_failures_total", "Voice agent processes that failed to spawn",
+                          [("", self.agent_spawn_failures_total)])
+
+        voice_agent_service = self._collect("voice_agent_service")
+        if voice_agent_service is not None:
+            by_status: Dict[str, int] = {}
+            for info in voice_agent_service.active_agents.values():
+                status = info.get("status", "unknown")
+                by_status[status] = by_status.get(status, 0) + 1
+            lines += _gauge("gateway_voice_agents", "Voice agents by status",
+                            [(f'status="{status}"', count) for status, count in sorted(by_status.items())])
+            lines += _gauge("gateway_voice_agent_processes", "Tracked voice agent processes",
+                            [("", len(voice_agent_service.agent_processes))])
+
+        token_minter = self._collect("token_minter")
+        if token_minter is not None:
+            lines += _counter("gateway_tokens_minted_total", "LiveKit tokens signed", [("", token_minter.minted)])
+            lines += _counter("gateway_token_cache_hits_total", "LiveKit tokens served from the reconnect cache",
+                              [("", token_minter.cache_hits)])
+
+        admission = self._collect("admission")
+        if admission is not None:
+            lines += _gauge("gateway_admission_queue_depth", "Sessions waiting for voice capacity",
+                            [("", admission.queue_depth)])
+            lines += _gauge("gateway_admission_occupied_slots", "Running agents plus admitted sessions",
+                            [("", admission.occupied_slots())])
+            lines += _gauge("gateway_admission_max_agents", "Configured agent capacity", [("", admission.max_agents)])
+            lines += _counter("gateway_admission_admitted_total", "Sessions admitted", [("", admission.admitted_total)])
+            lines += _counter("gateway_admission_rejected_total", "Sessions rejected by reason",
+                              [(f'reason="{reason}"', count) for reason, count in sorted(admission.rejected_total.items())])
+            lines += render_histogram_family(
+                "gateway_admission_wait_seconds",
+                "Time sessions spent queued for capacity",
+                [admission.queue_wait],
+            )
+
+        kb_pool = self._collect("kb_pool")
+        if kb_pool is not None:
+            lines += _gauge("kb_tenant_pool_open", "Tenant knowledge bases currently open", [("", len(kb_pool))])
+            lines += _gauge("kb_tenant_pool_memory_bytes", "Estimated index memory of open tenant knowledge bases",
+                            [("", kb_pool.memory_bytes)])
+            lines += _counter("kb_tenant_pool_opens_total", "Tenant knowledge bases opened", [("", kb_pool.opens)])
+            lines += _counter("kb_tenant_pool_hits_total", "Tenant requests served by an open knowledge base",
+                              [("", kb_pool.hits)])
+            lines += _counter("kb_tenant_pool_evictions_total", "Tenant knowledge bases closed to respect pool limits",
+                              [("", kb_pool.evictions)])
+
+        response_cache = self._collect("response_cache")
+        if response_cache is not None:
+            lines += _gauge("kb_response_cache_entries", "Answers held by the semantic response cache",
+                            [("", len(response_cache))])
+            lines += _counter("kb_response_cache_hits_total", "Voice turns answered from the response cache",
+                              [("", response_cache.hits)])
+            lines += _counter("kb_response_cache_misses_total", "Response cache lookups without a similar answer",
+                              [("", response_cache.misses)])
+            lines += _counter("kb_response_cache_stores_total", "Answers added to the response cache",
+                              [("", response_cache.stores)])
+            lines += _counter("kb_response_cache_evictions_total", "Answers dropped to respect RESPONSE_CACHE_SIZE",
+                              [("", response_cache.evictions)])
+
+        session_manager = self._collect("session_manager")
+        lines += render_histogram_family(
+            "gateway_session_backend_seconds",
+            "SessionManager storage latency by operation",
+            self.session_backend_latency.values(),
+        )
+        if session_manager is not None:
+            lines += _gauge("gateway_session_backend_info", "Active session storage backend",
+                            [(f'backend="{session_manager.backend}"', 1)])
+
+        kb = self._collect("knowledge_base")
+        if kb is not None:
+            lines += render_histogram_family(
+                "kb_search_duration_seconds",
+                "Knowledge base vector search latency",
+                [kb.search_latency],
+            )
+
+        lines += _process_samples()
+        return "\n".join(lines) + "\n"
+
+    def _collect(self, name: str) -> Optional[Any]:
+        getter = self.collectors.get(name)
+        return getter() if getter else None
+
+
+def _process_samples() -> List[str]:
+    """Resident memory and open file descriptors of the gateway process"""
+    try:
+        import psutil
+    except ImportError:
+        return []
+    process = psutil.Process()
+    lines = _gauge("process_resident_memory_bytes", "Resident memory size in bytes",
+                   [("", process.memory_info().rss)])
+    if hasattr(process, "num_fds"):
+        lines += _gauge("process_open_fds", "Open file descriptors", [("", process.num_fds())])
+    return lines
+
+
+def _counter(name: str, help_text: str, samples: List[Tuple[str, float]]) -> List[str]:
+    return _family(name, help_text, "counter", samples)
+
+
+def _gauge(name: str, help_text: str, samples: List[Tuple[str, float]]) -> List[str]:
+    return _family(name, help_text, "gauge", samples)
+
+
+def _family(name: str, help_text: str, metric_type: str, samples: List[Tuple[str, float]]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    return lines
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency and WebSocket counts
+
+    Avoids BaseHTTPMiddleware (which wraps every request in extra tasks and
+    streams) and labels requests by route template rather than raw path.
+    """
+
+    def __init__(self, app, metrics: GatewayMetrics):
+        self.app = app
+        self.metrics = metrics
+        self._route_paths: Optional[Dict[Any, str]] = None
+
+    async def __call__(self, scope, receive, send):
+        scope_type = scope["type"]
+        if scope_type == "websocket":
+            await self._handle_websocket(scope, receive, send)
+            return
+        if scope_type != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            method = scope["method"]
+            route = self._route_template(scope)
+            self.metrics.route_histogram(method, route).observe(time.perf_counter() - start)
+            if status_code >= 500:
+                key = (method, route)
+                self.metrics.route_errors[key] = self.metrics.route_errors.get(key, 0) + 1
+
+    async def _handle_websocket(self, scope, receive, send):
+        accepted = False
+
+        async def send_wrapper(message):
+            nonlocal accepted
+            if message["type"] == "websocket.accept" and not accepted:
+                accepted = True
+                self.metrics.active_websockets += 1
+                self.metrics.websocket_connections_total += 1
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if accepted:
+                self.metrics.active_websockets -= 1
+
+    def _route_template(self, scope) -> str:
+        """Map the matched endpoint back to its route template"""
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_paths is None:
+            app = scope.get("app")
+            self._route_paths = {
+                getattr(r, "endpoint", None): r.path for r in getattr(app, "routes", []) if hasattr(r, "path")
+            }
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
@@ -0,0 +1,116 @@
+"""
+Background knowledge base warm-up for the API Gateway
+Opens the knowledge base once in a worker thread, tracks its state
+(idle/loading/ready/failed) and lets requests wait for it with a timeout
+instead of each trying to build it inline
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+IDLE = "idle"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class KnowledgeBaseUnavailable(Exception):
+    """The knowledge base failed to load or is still loading after the timeout"""
+
+
+class KnowledgeBaseWarmup:
+    """
+    Single-flight loader for the gateway's knowledge base
+
+    Every caller shares one loading task. After a failure, callers get the
+    error immediately; a new attempt is made once `retry_interval` seconds
+    have passed since the last one.
+    """
+
+    def __init__(self, factory: Callable[[], Any], retry_interval: float = 30.0):
+        """
+        Args:
+            factory: Blocking callable returning a ready KnowledgeBase (run in a thread)
+            retry_interval: Minimum seconds between attempts after a failure
+        """
+        self.factory = factory
+        self.retry_interval = retry_interval
+        self.state = IDLE
+        self.kb = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.warmup_seconds: Optional[float] = None
+        self._started_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Start loading unless a load is in flight or already succeeded"""
+        if self._task is not None and (self.state in (LOADING, READY) or not self._may_retry()):
+            return self._task
+        self.state = LOADING
+        self.error = None
+        self.attempts += 1
+        self._started_at = time.monotonic()
+        self._task = asyncio.create_task(self._load())
+        return self._task
+
+    def _may_retry(self) -> bool:
+        return time.monotonic() - self._started_at >= self.retry_interval
+
+    async def _load(self):
+        try:
+            kb = await asyncio.to_thread(self.factory)
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+            logger.error(f"Knowledge base warm-up failed (attempt {self.attempts}): {e}")
+            return
+        self.kb = kb
+        self.warmup_seconds = time.monotonic() - self._started_at
+        self.state = READY
+        logger.info(f"Knowledge base ready in {self.warmup_seconds:.2f}s")
+
+    async def get(self, timeout: float):
+        """
+        Return the knowledge base, waiting up to `timeout` seconds for warm-up
+
+        Raises:
+            KnowledgeBaseUnavailable: If loading failed or did not finish in time
+        """
+        if self.state == READY:
+            return self.kb
+        task = self.start()
+        try:
+            # shield: a caller timing out must not cancel the shared load
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise KnowledgeBaseUnavailable(f"Knowledge base is still loading (waited {timeout:.0f}s)")
+        if self.state != READY:
+            raise KnowledgeBaseUnavailable(f"Knowledge base failed to load: {self.error}")
+        return self.kb
+
+    def status(self) -> Dict[str, Any]:
+        """State, document count and warm-up timing for readiness reporting"""
+        status: Dict[str, Any] = {
+            "state": self.state,
+            "attempts": self.attempts,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+        }
+        if self.state == LOADING:
+            status["loading_seconds"] = round(time.monotonic() - self._started_at, 3)
+        if self.state == READY:
+            try:
+                status["documents"] = self.kb.collection.count()
+            except Exception as e:
+                status["documents"] = None
+                logger.warning(f"Failed to count knowledge base documents: {e}")
+            manifest = getattr(self.kb, "snapshot_manifest", None)
+            if manifest:
+                status["snapshot"] = manifest["snapshot_id"]
+        if self.error:
+            status["error"] = self.error
+        return status
@@ -4,12 +4,15 @@ Handles session storage with Redis (if available) or in-memory fallback
 """
 
 import json
+import time
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import TYPE_CHECKING, Callable, Dict, Any, Optional, List
 from datetime import datetime, timedelta
-import redis.asyncio as redis
 import logging
 
+if TYPE_CHECKING:
+    import redis.asyncio as redis
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,29 +21,45 @@ class SessionManager:
     Manages chat sessions with Redis support and in-memory fallback
     """
     
-    def __init__(self, redis_url: Optional[str] = None, session_ttl: int = 3600):
+    def __init__(self, redis_url: Optional[str] = None, session_ttl: int = 3600,
+                 latency_observer: Optional[Callable[[str, float], None]] = None):
         """
         Initialize session manager
         
         Args:
             redis_url: Redis connection URL (optional)
             session_ttl: Session TTL in seconds (default: 1 hour)
+            latency_observer: Optional callback receiving (operation, seconds) for
+                every storage backend call
         """
         self.redis_url = redis_url
         self.session_ttl = session_ttl
-        self.redis_client: Optional[redis.Redis] = None
+        self.latency_observer = latency_observer
+        self.redis_client: Optional["redis.Redis"] = None
         self.in_memory_store: Dict[str, Dict[str, Any]] = {}
         self._lock = asyncio.Lock()
         
         # Try to connect to Redis if URL provided
         if redis_url:
             try:
+                import redis.asyncio as redis
+                
                 self.redis_client = redis.from_url(redis_url, decode_responses=True)
                 logger.info("Connected to Redis for session storage")
             except Exception as e:
                 logger.warning(f"Failed to connect to Redis: {e}. Using in-memory storage.")
                 self.redis_client = None
     
+    @property
+    def backend(self) -> str:
+        """Name of the active storage backend"""
+        return "redis" if self.redis_client else "memory"
+    
+    def _observe(self, operation: str, start: float):
+        """Report backend latency for an operation started at `start`"""
+        if self.latency_observer:
+            self.latency_observer(operation, time.perf_counter() - start)
+    
     async def create_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
         """
         Create a new session
@@ -52,6 +71,7 @@ class SessionManager:
         Returns:
             bool: True if successful
         """
+        start = time.perf_counter()
         try:
             session_data["last_activity"] = datetime.utcnow().isoformat()
             
@@ -73,6 +93,8 @@ class SessionManager:
         except Exception as e:
             logger.error(f"Failed to create session {session_id}: {e}")
             return False
+        finally:
+            self._observe("create", start)
     
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -84,6 +106,7 @@ class SessionManager:
         Returns:
             Session data or None if not found
         """
+        start = time.perf_counter()
         try:
             if self.redis_client:
                 data = await self.redis_client.get(f"session:{session_id}")
@@ -109,6 +132,8 @@ class SessionManager:
         except Exception as e:
             logger.error(f"Failed to get session {session_id}: {e}")
             return None
+        finally:
+            self._observe("get", start)
     
     async def update_session(self, session_id: str, session_data: Dict[str, Any]) -> bool:
         """
@@ -121,6 +146,7 @@ class SessionManager:
         Returns:
             bool: True if successful
         """
+        start = time.perf_counter()
         try:
             session_data["last_activity"] = datetime.utcnow().isoformat()
             
@@ -143,6 +169,8 @@ class SessionManager:
         except Exception as e:
             logger.error(f"Failed to update session {session_id}: {e}")
             return False
+        finally:
+            self._observe("update", start)
     
     async def delete_session(self, session_id: str) -> bool:
         """
@@ -154,6 +182,7 @@ class SessionManager:
         Returns:
             bool: True if successful
         """
+        start = time.perf_counter()
         try:
             if self.redis_client:
                 await self.redis_client.delete(f"session:{session_id}")
@@ -168,6 +197,8 @@ class SessionManager:
         except Exception as e:
             logger.error(f"Failed to delete session {session_id}: {e}")
             return False
+        finally:
+            self._observe("delete", start)
     
     async def list_sessions(self, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,174 @@
+"""
+Per-tenant knowledge bases for the API Gateway
+Maps widget API keys to tenants, each with its own knowledge base collection,
+and keeps a bounded LRU pool of opened collections so a gateway serving many
+customer sites does not hold every index in memory at once
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Header carrying a tenant's API key on knowledge base and session requests
+TENANT_KEY_HEADER = "X-API-Key"
+
+# Collection names must be valid for ChromaDB (3-63 chars, alphanumeric edges)
+_TENANT_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,40}[A-Za-z0-9]$|^[A-Za-z0-9]$")
+
+
+class UnknownTenant(Exception):
+    """The API key does not belong to any configured tenant"""
+
+
+class TenantDirectory:
+    """
+    API key -> tenant ID mapping
+
+    Loaded from KB_TENANTS (JSON object) or the JSON file named by
+    KB_TENANTS_FILE, e.g. {"key-for-acme": "acme", "key-for-vertex": "vertex"}.
+    Requests without a key use the default (shared) knowledge base.
+    """
+
+    def __init__(self, tenants: Optional[Dict[str, str]] = None):
+        if tenants is None:
+            tenants = self._load_from_env()
+        for tenant in tenants.values():
+            if not _TENANT_ID.match(tenant):
+                raise ValueError(f"Invalid tenant ID {tenant!r}: use letters, digits, '-' and '_' (max 42)")
+        self.tenants = dict(tenants)
+
+    @staticmethod
+    def _load_from_env() -> Dict[str, str]:
+        path = os.getenv("KB_TENANTS_FILE")
+        if path:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        raw = os.getenv("KB_TENANTS")
+        return json.loads(raw) if raw else {}
+
+    def __len__(self) -> int:
+        return len(self.tenants)
+
+    def resolve(self, api_key: Optional[str]) -> Optional[str]:
+        """
+        Tenant for an API key (None for no key: the default knowledge base)
+
+        Raises:
+            UnknownTenant: If a key is given but not configured
+        """
+        if not api_key:
+            return None
+        tenant = self.tenants.get(api_key)
+        if tenant is None:
+            raise UnknownTenant("Invalid API key")
+        return tenant
+
+
+def collection_for_tenant(tenant: str, base: str = "voice_agent_kb") -> str:
+    """Collection name holding a tenant's documents"""
+    return f"{base}_{tenant}"
+
+
+def estimate_kb_bytes(kb) -> int:
+    """
+    Index memory released when an opened knowledge base is dropped
+
+    Only numpy indexes count: ChromaDB collections share one PersistentClient
+    whose segment caches outlive the collection handle, so dropping one frees
+    nothing.
+    """
+    return getattr(kb.collection, "nbytes", 0)
+
+
+class KnowledgeBasePool:
+    """
+    LRU pool of opened tenant knowledge bases
+
+    At most `max_open` collections stay open, and together their numpy
+    indexes stay under `max_memory_bytes` (if set). The least recently used
+    ones are dropped first. A collection is opened once even when many requests for the
+    same tenant arrive together.
+    """
+
+    def __init__(self, factory: Callable[[str], Any],
+                 max_open: Optional[int] = None,
+                 max_memory_bytes: Optional[int] = None):
+        """
+        Args:
+            factory: Blocking callable opening the knowledge base for a tenant (run in a thread)
+            max_open: Maximum open collections (defaults to KB_TENANT_POOL_SIZE, then 8)
+            max_memory_bytes: Memory cap for open numpy indexes (defaults to
+                KB_TENANT_POOL_MEMORY_MB, then unbounded)
+        """
+        self.factory = factory
+        self.max_open = max_open or int(os.getenv("KB_TENANT_POOL_SIZE", 8))
+        if max_memory_bytes is None:
+            max_memory_bytes = int(float(os.getenv("KB_TENANT_POOL_MEMORY_MB", 0)) * 1024 * 1024)
+        self.max_memory_bytes = max_memory_bytes or None
+        self.opens = 0
+        self.hits = 0
+        self.evictions = 0
+        self._open: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def opened(self):
+        """(tenant, knowledge base) pairs currently open, least recently used first"""
+        return list(self._open.items())
+
+    async def get(self, tenant: str):
+        """Return the tenant's knowledge base, opening it (and evicting others) if needed"""
+        kb = self._open.get(tenant)
+        if kb is not None:
+            self._open.move_to_end(tenant)
+            self.hits += 1
+            return kb
+
+        task = self._loading.get(tenant)
+        if task is None:
+            task = asyncio.create_task(asyncio.to_thread(self.factory, tenant))
+            self._loading[tenant] = task
+            try:
+                kb = await task
+            finally:
+                self._loading.pop(tenant, None)
+            self.opens += 1
+            self._open[tenant] = kb
+            self._sizes[tenant] = estimate_kb_bytes(kb)
+            self._evict(keep=tenant)
+            logger.info(f"Opened knowledge base for tenant {tenant} ({len(self._open)} open)")
+            return kb
+        return await asyncio.shield(task)
+
+    def _evict(self, keep: str):
+        while len(self._open) > 1 and (
+            len(self._open) > self.max_open
+            or (self.max_memory_bytes is not None and self.memory_bytes > self.max_memory_bytes)
+        ):
+            tenant = next(iter(self._open))
+            if tenant == keep:
+                break
+            del self._open[tenant]
+            self._sizes.pop(tenant, None)
+            self.evictions += 1
+            logger.info(f"Dropped knowledge base for tenant {tenant} from the pool (least recently used)")
+
+    def refresh_size(self, tenant: str):
+        """Re-estimate a tenant's index size after it changed"""
+        kb = self._open.get(tenant)
+        if kb is not None:
+            self._sizes[tenant] = estimate_kb_bytes(kb)
+            self._evict(keep=tenant)
@@ -0,0 +1,16 @@
+"""
+Shared test setup: make the gateway and agent modules importable and give the
+gateway the environment it reads at import time
+"""
+
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "agent"))
+
+os.environ.setdefault("LIVEKIT_API_KEY", "test-key")
+os.environ.setdefault("LIVEKIT_API_SECRET", "test-secret-test-secret-test-secret")
+os.environ["REDIS_URL"] = ""
+os.environ["RAILWAY_ENVIRONMENT"] = "test"
@@ -0,0 +1,97 @@
+"""Admission control for voice sessions"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from session_manager import SessionManager
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    import api_gateway
+    from admission import AdmissionController
+
+    monkeypatch.setattr(api_gateway, "session_manager", SessionManager(redis_url=None))
+    monkeypatch.setattr(api_gateway, "admission", AdmissionController(running_sessions=lambda: (), max_agents=2,
+                                                            max_cpu_percent=101, max_memory_percent=101))
+    return api_gateway
+
+
+def test_sessions_hold_slots_until_they_end_without_spawner(gateway, monkeypatch):
+    from admission import AdmissionController
+
+    monkeypatch.setattr(gateway, "voice_agent_service", None)
+    monkeypatch.setattr(gateway, "admission",
+                        AdmissionController(running_sessions=lambda: (), max_agents=2, queue_size=0,
+                                            max_cpu_percent=101, max_memory_percent=101,
+                                            reservation_ttl=0))
+    client = TestClient(gateway.app)
+    responses = [client.post("/api/sessions/create", json={}) for _ in range(3)]
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert "Retry-After" in responses[2].headers
+
+    client.post(f"/api/sessions/{responses[0].json()['session_id']}/end")
+    assert client.post("/api/sessions/create", json={}).status_code == 200
+
+
+def test_zero_max_agents_admits_nothing():
+    from admission import AdmissionController, AdmissionRejected
+
+    controller = AdmissionController(running_sessions=lambda: (), max_agents=0, queue_size=0,
+                                     max_cpu_percent=101, max_memory_percent=101)
+    with pytest.raises(AdmissionRejected):
+        asyncio.run(controller.admit("s1"))
+
+
+def test_spawning_gateway_rejects_beyond_max_agents(gateway, monkeypatch):
+    from admission import AdmissionController
+
+    monkeypatch.setattr(gateway, "voice_agent_service", gateway.VoiceAgentService())
+    monkeypatch.setattr(gateway, "admission",
+                        AdmissionController(running_sessions=lambda: (), max_agents=2, queue_size=0,
+                                            max_cpu_percent=101, max_memory_percent=101))
+    client = TestClient(gateway.app)
+    statuses = [client.post("/api/sessions/create", json={}).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+
+def test_registry_listener_starts_without_spawner(gateway, monkeypatch):
+    from agent_registry import AgentRegistry
+
+    handlers = []
+    monkeypatch.setattr(gateway, "voice_agent_service", None)
+    monkeypatch.setattr(AgentRegistry, "start_listener", lambda self, handler: handlers.append(handler))
+    with TestClient(gateway.app):
+        pass
+    assert handlers == [gateway.stop_local_agent]
+
+
+def test_workers_on_a_host_share_slots_through_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from admission import AdmissionController, AdmissionRejected
+
+    async def scenario():
+        redis_client = fakeredis.FakeAsyncRedis()
+        workers = [
+            AdmissionController(running_sessions=lambda: (), max_agents=2, queue_size=0,
+                                max_cpu_percent=101, max_memory_percent=101)
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.attach(redis_client)
+        try:
+            await workers[0].admit("s1")
+            await workers[1].admit("s2")
+            with pytest.raises(AdmissionRejected):
+                await workers[1].admit("s3")
+            await workers[0].release("s1")
+            await workers[1].admit("s3")
+            assert await workers[0].is_admitted("s3")
+        finally:
+            for worker in workers:
+                await worker.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+"""Cursor pagination over knowledge base documents"""
+
+import zlib
+
+import numpy as np
+import pytest
+
+
+class FakeEmbedder:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, texts):
+        vectors = np.full((len(texts), 16), 1e-3, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % 16] += 1.0
+        return vectors
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    import vector_index
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(vector_index, "OpenAIEmbedder", FakeEmbedder)
+    from knowledge_base import KnowledgeBase
+
+    kb = KnowledgeBase(persist_directory=str(tmp_path), storage_backend="numpy")
+    kb.add_documents_batch([{"content": f"document number {i}", "metadata": {"n": i}} for i in range(7)])
+    return kb
+
+
+def test_pages_cover_every_document_once(kb):
+    seen, cursor = [], None
+    while True:
+        page, cursor = kb.page_documents(limit=3, cursor=cursor)
+        seen.extend(doc["id"] for doc in page)
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 7
+    assert [doc["id"] for doc in kb.list_documents(limit=100)] == seen
+
+
+def test_cursor_is_stable_when_earlier_documents_are_deleted(kb):
+    first, cursor = kb.page_documents(limit=3)
+    expected, _ = kb.page_documents(limit=3, cursor=cursor)
+
+    kb.delete_document(first[0]["id"])
+    second, _ = kb.page_documents(limit=3, cursor=cursor)
+    assert [doc["id"] for doc in second] == [doc["id"] for doc in expected]
+
+
+def test_field_projection(kb):
+    page, _ = kb.page_documents(limit=2, fields=["id"], max_content_chars=4)
+    assert all(set(doc) == {"id"} for doc in page)
+    page, _ = kb.page_documents(limit=1, fields=["content"], max_content_chars=4)
+    assert page == [{"content": "docu", "truncated": True}]
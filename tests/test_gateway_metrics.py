@@ -0,0 +1,54 @@
+"""Prometheus metrics for the API gateway"""
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from gateway_metrics import GatewayMetrics, MetricsMiddleware
+
+
+def _client(metrics: GatewayMetrics) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return {"id": item_id}
+
+    @app.get("/broken")
+    async def broken():
+        raise HTTPException(status_code=503, detail="down")
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        from fastapi.responses import PlainTextResponse
+        return PlainTextResponse(metrics.render())
+
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+    return TestClient(app)
+
+
+def test_metrics_are_labelled_by_route_template():
+    metrics = GatewayMetrics()
+    client = _client(metrics)
+    client.get("/items/a")
+    client.get("/items/b")
+    client.get("/broken")
+    client.get("/nowhere")
+
+    text = client.get("/metrics").text
+    assert "# TYPE gateway_request_duration_seconds histogram" in text
+    assert 'gateway_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 2' in text
+    assert 'gateway_request_errors_total{method="GET",route="/broken"} 1' in text
+    assert 'route="__unmatched__"' in text
+    # Raw paths never become labels
+    assert 'route="/items/a"' not in text
+
+
+def test_session_backend_latency_and_collectors():
+    metrics = GatewayMetrics()
+    metrics.observe_session_backend("get", 0.002)
+    metrics.observe_session_backend("get", 0.004)
+    metrics.register_collector("session_manager", lambda: type("SM", (), {"backend": "memory"})())
+
+    text = metrics.render()
+    assert 'gateway_session_backend_seconds_count{operation="get"} 2' in text
+    assert 'gateway_session_backend_info{backend="memory"} 1' in text
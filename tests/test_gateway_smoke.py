@@ -0,0 +1,76 @@
+"""Smoke tests for the API gateway app"""
+
+from fastapi.testclient import TestClient
+
+
+def test_gateway_imports_and_serves():
+    import api_gateway
+
+    client = TestClient(api_gateway.app)
+    assert client.get("/live").json() == {"status": "alive"}
+    assert client.get("/health").status_code == 200
+
+
+def test_unknown_tenant_key_is_rejected(monkeypatch):
+    import api_gateway
+    from tenants import TenantDirectory
+
+    monkeypatch.setattr(api_gateway, "tenant_directory", TenantDirectory({"key-acme": "acme"}))
+    client = TestClient(api_gateway.app)
+    response = client.post("/api/knowledge-base/search", params={"query": "x"},
+                           headers={"X-API-Key": "wrong"})
+    assert response.status_code == 401
+
+
+def test_agent_modules_load_once():
+    import sys
+
+    import api_gateway  # noqa: F401
+
+    assert not [name for name in sys.modules if name.startswith("agent.")]
+    assert sys.modules["latency"].LatencyHistogram is sys.modules["admission"].LatencyHistogram
+
+
+def test_gateway_key_and_missing_key_use_default_tenant(monkeypatch):
+    import api_gateway
+    from starlette.requests import Request
+    from tenants import TenantDirectory
+
+    monkeypatch.setattr(api_gateway, "tenant_directory", TenantDirectory({"key-acme": "acme"}))
+
+    def request(headers):
+        raw = [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+        return Request({"type": "http", "headers": raw})
+
+    assert api_gateway.get_tenant(request({})) is None
+    assert api_gateway.get_tenant(request({"X-API-Key": api_gateway.API_SECRET_KEY})) is None
+    assert api_gateway.get_tenant(request({"X-API-Key": "key-acme"})) == "acme"
+
+
+def test_internal_routes_not_mounted_by_default():
+    import api_gateway
+
+    client = TestClient(api_gateway.app)
+    assert client.post("/internal/kb/search", json={"query": "x"}).status_code == 404
+
+
+def test_internal_routes_require_a_separate_service_key(monkeypatch):
+    import pytest
+    from fastapi import FastAPI
+
+    import api_gateway
+
+    monkeypatch.delenv("KB_SERVICE_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        api_gateway.internal_service_key()
+    monkeypatch.setenv("KB_SERVICE_KEY", api_gateway.API_SECRET_KEY)
+    with pytest.raises(RuntimeError):
+        api_gateway.internal_service_key()
+
+    monkeypatch.setenv("KB_SERVICE_KEY", "s3cret")
+    app = FastAPI()
+    app.include_router(api_gateway.internal_router)
+    client = TestClient(app)
+    response = client.post("/internal/kb/answers/lookup", json={"query": "x"},
+                           headers={"X-KB-Service-Key": "wrong"})
+    assert response.status_code == 401
@@ -0,0 +1,62 @@
+"""Metadata filters for knowledge base searches"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from kb_filters import MetadataIndex, SearchFilter, decode_metadata, encode_metadata
+
+
+def test_metadata_round_trip():
+    metadata = {"category": "products", "tags": ["trail", "shoe"], "added_at": "2025-01-02T00:00:00", "price": 120}
+    encoded = encode_metadata(metadata)
+
+    # Stored metadata is scalar only, as ChromaDB requires
+    assert all(isinstance(value, (str, int, float, bool)) for value in encoded.values())
+    decoded = decode_metadata(encoded)
+    assert decoded == dict(metadata, tags=["shoe", "trail"])
+
+
+def test_filter_from_dict():
+    search_filter = SearchFilter.from_dict({"category": "products", "tag": "trail", "added_after": "2025-01-01"})
+    assert search_filter.category == ("products",)
+    assert search_filter.tags == ("trail",)
+    assert search_filter.added_after is not None
+    assert SearchFilter.from_dict({}) is None
+    where = search_filter.to_chroma_where()
+    assert {"category": "products"} in where["$and"]
+
+
+def test_reserved_prefix_only():
+    assert decode_metadata(encode_metadata({"_source": "crm", "tags": ["a"]})) == {"_source": "crm", "tags": ["a"]}
+    with pytest.raises(ValueError):
+        encode_metadata({"__kb_added_ts": 1})
+
+
+def test_documents_without_internal_keys_match_filters():
+    index = MetadataIndex()
+    index.add("new", encode_metadata({"tags": ["trail"], "added_at": "2025-03-01T00:00:00"}))
+    # Stored by an earlier release: tags as written, no internal keys
+    index.add("old", {"tags": "trail, road", "added_at": "2025-02-01T00:00:00"})
+
+    search_filter = SearchFilter.from_dict({"tags": ["trail"], "added_after": "2025-01-01"})
+    assert index.candidates(search_filter) == {"new", "old"}
+    assert index.unencoded_ids == {"old"}
+    assert search_filter.uses_internal_keys
+    assert not SearchFilter.from_dict({"category": "products"}).uses_internal_keys
+
+
+def test_candidates_scored_without_a_where_clause():
+    from knowledge_base import KnowledgeBase
+
+    stored = {"ids": ["a", "b", "c"], "documents": ["A", "B", "C"],
+              "metadatas": [{}, {}, {}], "embeddings": [[1, 0], [0, 1], [0.6, 0.8]]}
+    kb = SimpleNamespace(
+        collection=SimpleNamespace(get=lambda ids, include: {k: [v[stored["ids"].index(i)] for i in ids]
+                                                              for k, v in stored.items()}),
+        embedding_function=lambda texts: np.array([[0.0, 1.0]] * len(texts)),
+    )
+    results = KnowledgeBase._query_candidates(kb, ["q"], 2, {"a", "b", "c"})
+    assert results["ids"] == [["b", "c"]]
+    assert results["distances"][0][0] == pytest.approx(0.0)
@@ -0,0 +1,23 @@
+"""Streaming document reader for knowledge base loads"""
+
+import kb_ingest
+from kb_ingest import IngestStats, iter_documents
+
+
+def test_invalid_ndjson_lines_are_skipped(tmp_path, monkeypatch):
+    # Small chunks so lines straddle reads
+    monkeypatch.setattr(kb_ingest, "READ_CHUNK_SIZE", 16)
+    path = tmp_path / "docs.ndjson"
+    path.write_text(
+        '{"content": "first", "metadata": {"n": 1}}\n'
+        '{"content": "broken",, }\n'
+        '{"content": "second"}\n'
+        '{"content": "unterminated\n'
+        '{"content": "third"}\n'
+        '{"content": "trailing',
+        encoding="utf-8",
+    )
+    stats = IngestStats()
+    documents = list(iter_documents(str(path), stats))
+    assert [doc["content"] for doc in documents] == ["first", "second", "third"]
+    assert stats.skipped == 3
@@ -0,0 +1,52 @@
+"""Knowledge base snapshot export and verification"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import kb_snapshot
+from kb_snapshot import SnapshotError, export_snapshot, verify_snapshot
+from vector_index import NumpyVectorIndex
+
+
+def _kb(tmp_path, texts):
+    index = NumpyVectorIndex(str(tmp_path / f"src-{len(texts)}"), "kb", embedding_function=None)
+    embeddings = np.eye(len(texts), 4, dtype=np.float32) + 0.1
+    index.replace_all(embeddings, texts, [{} for _ in texts], [f"id-{i}" for i in range(len(texts))])
+    return SimpleNamespace(storage_backend="numpy", collection=index, embedding_model="test")
+
+
+def test_export_switches_a_symlink_to_versioned_directories(tmp_path):
+    path = str(tmp_path / "snapshot")
+    versions = []
+    for count in (1, 2, 3):
+        manifest = export_snapshot(_kb(tmp_path, [f"doc {i}" for i in range(count)]), path)
+        assert os.path.islink(path)
+        versions.append(os.path.realpath(path))
+        assert manifest["snapshot_id"] in versions[-1]
+
+    # The current and the previous version survive; older ones are removed
+    assert [os.path.isdir(v) for v in versions] == [False, True, True]
+
+
+def test_checksums_are_verified_once_per_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(kb_snapshot, "VERIFIED_DIR", str(tmp_path / "verified"))
+    path = str(tmp_path / "snapshot")
+    export_snapshot(_kb(tmp_path, ["a", "b"]), path)
+    snapshot_dir = os.path.realpath(path)
+
+    verify_snapshot(snapshot_dir)
+    monkeypatch.setattr(kb_snapshot, "_sha256", lambda file_path: pytest.fail("re-hashed a verified snapshot"))
+    assert verify_snapshot(snapshot_dir)["count"] == 2
+
+    # Rewriting a file invalidates the marker
+    vectors = next(os.path.join(snapshot_dir, name) for name in os.listdir(snapshot_dir)
+                   if name.endswith(".vectors.npy"))
+    with open(vectors, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\x01")
+    monkeypatch.setattr(kb_snapshot, "_sha256", lambda file_path: "0" * 64)
+    with pytest.raises(SnapshotError):
+        verify_snapshot(snapshot_dir)
@@ -0,0 +1,53 @@
+"""Background knowledge base warm-up"""
+
+import asyncio
+import threading
+
+import pytest
+
+from kb_warmup import FAILED, IDLE, LOADING, READY, KnowledgeBaseUnavailable, KnowledgeBaseWarmup
+
+
+def test_state_transitions():
+    release = threading.Event()
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("index missing")
+        release.wait()
+        return "kb"
+
+    async def scenario():
+        warmup = KnowledgeBaseWarmup(factory, retry_interval=0)
+        assert warmup.state == IDLE
+
+        with pytest.raises(KnowledgeBaseUnavailable, match="index missing"):
+            await warmup.get(timeout=1)
+        assert warmup.state == FAILED and warmup.status()["error"] == "index missing"
+
+        # Retried; a caller timing out leaves the shared load running
+        with pytest.raises(KnowledgeBaseUnavailable, match="still loading"):
+            await warmup.get(timeout=0.05)
+        assert warmup.state == LOADING
+
+        release.set()
+        assert await warmup.get(timeout=1) == "kb"
+        assert warmup.state == READY and warmup.attempts == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_load_is_not_retried_before_the_interval():
+    def factory():
+        raise RuntimeError("boom")
+
+    async def scenario():
+        warmup = KnowledgeBaseWarmup(factory, retry_interval=60)
+        for _ in range(3):
+            with pytest.raises(KnowledgeBaseUnavailable):
+                await warmup.get(timeout=1)
+        assert warmup.attempts == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+"""Per-turn latency tracing"""
+
+import json
+
+from latency import TurnLatencyTracker
+
+
+def _span_names(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["name"] for line in f]
+
+
+def test_metrics_after_speaking_belong_to_their_turn(tmp_path):
+    trace_file = tmp_path / "spans.jsonl"
+    tracker = TurnLatencyTracker(session_id="s", trace_file=str(trace_file))
+
+    tracker.start_turn()
+    tracker.bind_speech("speech-1")
+    tracker.record_duration("end_of_utterance", 0.2, "speech-1")
+    tracker.end_turn()
+    assert tracker.completed_turns == 0
+
+    # LLM and TTS metrics are emitted when their streams finish, after "speaking"
+    tracker.record_duration("llm_ttft", 0.3, "speech-1")
+    tracker.record_duration("tts_ttfb", 0.1, "speech-1")
+
+    assert tracker.completed_turns == 1
+    assert tracker.histograms["llm_ttft"].count == 1
+    assert tracker.histograms["tts_ttfb"].count == 1
+    assert {"voice.turn", "voice.llm_ttft", "voice.tts_ttfb"} <= set(_span_names(trace_file))
+
+
+def test_next_turn_exports_a_turn_missing_late_metrics():
+    tracker = TurnLatencyTracker()
+
+    tracker.start_turn()
+    tracker.end_turn()
+    tracker.record_duration("llm_ttft", 0.3)
+    tracker.start_turn()
+
+    assert tracker.completed_turns == 1
+    assert tracker.histograms["llm_ttft"].count == 1
+    assert tracker.histograms["turn_total"].count == 1
+
+
+def test_final_transcript_before_turn_start_is_attached_to_the_next_turn():
+    tracker = TurnLatencyTracker()
+
+    tracker.mark("stt_final")
+    tracker.start_turn()
+
+    assert "stt_final" in tracker.current.marks
+    assert tracker.current.durations["stt_final"] == 0.0
+
+    tracker.end_turn()
+    tracker.start_turn()
+    assert "stt_final" not in tracker.current.marks
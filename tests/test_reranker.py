@@ -0,0 +1,46 @@
+"""Rerank stage latency cap"""
+
+import threading
+
+from reranker import MIN_TIMEOUT, RerankStage
+
+
+class BlockingScorer:
+    name = "blocking"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def score(self, query, documents):
+        self.calls += 1
+        self.release.wait()
+        return [float(i) for i in range(len(documents))]
+
+
+DOCUMENTS = [{"content": f"doc {i}", "distance": i / 10} for i in range(5)]
+
+
+def test_queries_skip_reranking_while_a_timed_out_call_runs():
+    scorer = BlockingScorer()
+    stage = RerankStage(scorer, candidates=5, top_k=2, timeout=0.01)
+
+    assert stage.rerank("q", DOCUMENTS) == DOCUMENTS[:2]
+    assert stage.fallbacks == 1
+    # The first call still holds the scoring thread: no second call is queued
+    assert stage.rerank("q", DOCUMENTS) == DOCUMENTS[:2]
+    assert stage.skipped == 1 and scorer.calls == 1
+
+    scorer.release.set()
+    stage._running.result()
+    reranked = stage.rerank("q", DOCUMENTS)
+    assert [doc["content"] for doc in reranked] == ["doc 4", "doc 3"]
+
+
+def test_calibrate_sets_timeout_from_measured_latency():
+    scorer = BlockingScorer()
+    scorer.release.set()
+    stage = RerankStage(scorer, candidates=5)
+    measured = stage.calibrate()
+    assert scorer.calls == 4
+    assert stage.timeout == max(MIN_TIMEOUT, measured * 2)
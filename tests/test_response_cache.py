@@ -0,0 +1,42 @@
+"""Semantic response cache"""
+
+import numpy as np
+
+import response_cache
+from response_cache import SemanticResponseCache
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_similar_question_hits():
+    cache = SemanticResponseCache(threshold=0.9)
+    assert cache.lookup("what are your hours", _unit(1, 0, 0), "kb", "v1") is None
+    cache.store("what are your hours", _unit(1, 0, 0), "9 to 5", "kb", "v1")
+
+    assert cache.lookup("when are you open", _unit(1, 0.1, 0), "kb", "v1") == "9 to 5"
+    assert cache.lookup("do you ship abroad", _unit(0, 1, 0), "kb", "v1") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_answers_are_scoped():
+    cache = SemanticResponseCache(threshold=0.9)
+    cache.store("q", _unit(1, 0), "products answer", "kb|products", "v1")
+    assert cache.lookup("q", _unit(1, 0), "kb|policies", "v1") is None
+    assert cache.lookup("q", _unit(1, 0), "kb|products", "v1") == "products answer"
+
+
+def test_new_version_and_ttl_invalidate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticResponseCache(threshold=0.9, ttl=60)
+    cache.store("q", _unit(1, 0), "old answer", "kb", "v1")
+
+    assert cache.lookup("q", _unit(1, 0), "kb", "v2") is None
+    assert len(cache) == 0
+
+    cache.store("q", _unit(1, 0), "answer", "kb", "v2")
+    now[0] += 61
+    assert cache.lookup("q", _unit(1, 0), "kb", "v2") is None
@@ -0,0 +1,62 @@
+"""Batched multi-query knowledge base search"""
+
+import zlib
+
+import numpy as np
+import pytest
+
+
+class FakeEmbedder:
+    """Bag-of-words hashing embedder; counts provider calls"""
+
+    calls = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, texts):
+        FakeEmbedder.calls += 1
+        vectors = np.full((len(texts), 32), 1e-3, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % 32] += 1.0
+        return vectors
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    import vector_index
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(vector_index, "OpenAIEmbedder", FakeEmbedder)
+    from knowledge_base import KnowledgeBase
+
+    kb = KnowledgeBase(persist_directory=str(tmp_path), storage_backend="numpy")
+    kb.add_documents_batch([
+        {"content": text, "metadata": {"category": category}}
+        for text, category in [
+            ("trail running shoes with grip", "products"),
+            ("return policy for unused items", "policies"),
+            ("shipping takes three days", "policies"),
+            ("waterproof hiking boots", "products"),
+            ("store opening hours", "info"),
+        ]
+    ])
+    return kb
+
+
+def test_search_many_matches_search(kb):
+    queries = ["hiking boots", "return policy", "hiking boots", "opening hours"]
+    FakeEmbedder.calls = 0
+    batched = kb.search_many(queries, n_results=2)
+    assert FakeEmbedder.calls == 1
+
+    for query, results in zip(queries, batched):
+        single = kb.search(query, n_results=2)
+        assert [doc["id"] for doc in results] == [doc["id"] for doc in single]
+        assert [doc["distance"] for doc in results] == pytest.approx([doc["distance"] for doc in single])
+
+
+def test_search_many_applies_the_filter_to_every_query(kb):
+    for results in kb.search_many(["hiking boots", "return policy"], n_results=5, filter={"category": "products"}):
+        assert results and all(doc["metadata"]["category"] == "products" for doc in results)
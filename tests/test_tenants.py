@@ -0,0 +1,27 @@
+"""Tenant knowledge base pool"""
+
+import asyncio
+from types import SimpleNamespace
+
+from tenants import KnowledgeBasePool, estimate_kb_bytes
+
+
+def _kb(nbytes=None):
+    collection = SimpleNamespace() if nbytes is None else SimpleNamespace(nbytes=nbytes)
+    return SimpleNamespace(collection=collection)
+
+
+def test_memory_cap_counts_numpy_indexes_only():
+    sizes = {"a": 600, "b": 600, "c": None}
+    pool = KnowledgeBasePool(lambda tenant: _kb(sizes[tenant]), max_open=8, max_memory_bytes=1000)
+
+    async def scenario():
+        await pool.get("c")
+        await pool.get("a")
+        await pool.get("b")
+
+    asyncio.run(scenario())
+    assert estimate_kb_bytes(_kb()) == 0
+    # Opening "b" went over the cap: tenants are dropped oldest first until the numpy total fits
+    assert [tenant for tenant, _ in pool.opened()] == ["b"]
+    assert pool.memory_bytes == 600
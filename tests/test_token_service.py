@@ -0,0 +1,46 @@
+"""LiveKit token minting"""
+
+from datetime import timedelta
+
+import jwt
+from livekit import api
+
+import token_service
+from token_service import TokenMinter
+
+KEY = "test-key"
+SECRET = "test-secret-test-secret-test-secret"
+
+
+def test_claims_match_access_token():
+    minter = TokenMinter(KEY, SECRET, ttl=timedelta(minutes=10))
+    claims = jwt.decode(minter.mint("user-1", "room-1", name="Ada"), SECRET, algorithms=["HS256"])
+
+    reference = api.AccessToken(KEY, SECRET).with_identity("user-1").with_name("Ada") \
+        .with_ttl(timedelta(minutes=10)) \
+        .with_grants(api.VideoGrants(room_join=True, room="room-1", can_publish=True,
+                                     can_subscribe=True, can_publish_data=True))
+    expected = jwt.decode(reference.to_jwt(), SECRET, algorithms=["HS256"])
+
+    assert set(claims) == set(expected)
+    assert claims["sub"] == "user-1" and claims["iss"] == KEY and claims["name"] == "Ada"
+    assert claims["video"] == expected["video"]
+    assert claims["exp"] - claims["nbf"] == 600
+
+
+def test_tokens_are_reused_within_the_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(token_service.time, "monotonic", lambda: now[0])
+    minter = TokenMinter(KEY, SECRET, reuse_window=60)
+
+    first = minter.get_token("user-1", "room-1")
+    assert minter.get_token("user-1", "room-1") == first
+    assert (minter.minted, minter.cache_hits) == (1, 1)
+
+    now[0] += 61
+    minter.get_token("user-1", "room-1")
+    assert minter.minted == 2
+
+    minter.invalidate("user-1", "room-1")
+    minter.get_token("user-1", "room-1")
+    assert minter.minted == 3
@@ -0,0 +1,103 @@
+"""Memory-mapped numpy vector index"""
+
+import json
+import os
+
+import numpy as np
+
+from vector_index import NumpyVectorIndex, normalize_rows
+
+
+def _embed(texts):
+    return np.array([[len(text), text.count("a"), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_queries_read_one_generation(tmp_path):
+    index = NumpyVectorIndex(str(tmp_path), "kb", _embed)
+    index.add(["a", "aa", "bbb"], [{}, {}, {}], ["x", "y", "z"])
+    index.delete(["x"])
+
+    generation = index.generation
+    assert generation.rows == {"y": 0, "z": 1}
+    assert index.row_of("z") == 1 and index.row_of("x") is None
+    assert index.nbytes == sum(segment.vectors.nbytes for segment in generation.segments)
+
+    results = index.query(["aa"], n_results=2, ids=["z", "x"])
+    assert results["ids"] == [["z"]]
+    assert index.get(ids=["y", "x"])["ids"] == ["y"]
+
+
+def _random_index(tmp_path, dtype="float32", rescore_factor=0):
+    return NumpyVectorIndex(str(tmp_path), "kb", None, dtype=dtype, rescore_factor=rescore_factor)
+
+
+def test_appends_write_new_segments_and_keep_older_files(tmp_path):
+    index = _random_index(tmp_path)
+    rng = np.random.default_rng(0)
+    index.add(["d0"] * 8, [{}] * 8, [f"a{i}" for i in range(8)], embeddings=rng.normal(size=(8, 4)))
+    first = tmp_path / "seg-00000001.vectors.npy"
+    stat = first.stat()
+
+    index.add(["d1"] * 2, [{}] * 2, ["b0", "b1"], embeddings=rng.normal(size=(2, 4)))
+    assert [segment.name for segment in index.generation.segments] == ["00000001", "00000002"]
+    assert (first.stat().st_ino, first.stat().st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+
+    # Segment sizes at least double towards the head
+    for i in range(30):
+        index.add(["d"], [{}], [f"c{i}"], embeddings=rng.normal(size=(1, 4)))
+    sizes = [segment.live_count for segment in index.generation.segments]
+    assert all(older > newer for older, newer in zip(sizes, sizes[1:]))
+    assert sum(sizes) == index.count() == 40
+
+
+def test_segments_and_tombstones_match_exact_search(tmp_path):
+    rng = np.random.default_rng(1)
+    index = _random_index(tmp_path, dtype="int8", rescore_factor=4)
+    vectors = rng.normal(size=(60, 8)).astype(np.float32)
+    ids = [f"id{i}" for i in range(60)]
+    for start in range(0, 60, 7):
+        stop = min(start + 7, 60)
+        index.add(["doc"] * (stop - start), [{}] * (stop - start), ids[start:stop], embeddings=vectors[start:stop])
+    index.delete(ids[::9])
+
+    live = [i for i in range(60) if i % 9]
+    query = normalize_rows(rng.normal(size=(1, 8)))
+    exact = np.argsort(-(normalize_rows(vectors[live]) @ query[0]))[:5]
+    assert index.query_embeddings(query, n_results=5)["ids"] == [[ids[live[j]] for j in exact]]
+    assert index.get()["ids"] == [ids[i] for i in live]
+
+    # Another process sees the same generation
+    reader = _random_index(tmp_path)
+    assert reader.get()["ids"] == index.get()["ids"]
+    assert reader.query_embeddings(query, n_results=5)["ids"] == index.query_embeddings(query, n_results=5)["ids"]
+
+
+def test_deletions_are_purged_past_the_threshold(tmp_path):
+    index = _random_index(tmp_path)
+    index.add(["d"] * 8, [{}] * 8, [f"id{i}" for i in range(8)], embeddings=np.eye(8))
+    index.delete(["id0"])
+    assert index.generation.segments[0].live is not None
+    index.delete(["id1", "id2"])
+    assert [segment.live for segment in index.generation.segments] == [None]
+    assert index.get()["ids"] == [f"id{i}" for i in range(3, 8)]
+    assert sorted(os.listdir(tmp_path)) == ["index.json", "seg-00000002.meta.json", "seg-00000002.vectors.npy"]
+
+
+def test_opens_and_converts_single_matrix_indexes(tmp_path):
+    vectors = normalize_rows(np.eye(3, 4, dtype=np.float32))
+    np.save(tmp_path / "vectors.npy", vectors)
+    (tmp_path / "meta.json").write_text(json.dumps({
+        "dtype": "float32", "dim": 4, "full_precision": False,
+        "ids": ["a", "b", "c"], "documents": ["A", "B", "C"], "metadatas": [{}, {}, {}],
+    }))
+
+    index = _random_index(tmp_path)
+    assert index.get()["ids"] == ["a", "b", "c"] and index.dim == 4
+    index.add(["D"], [{}], ["d"], embeddings=np.ones((1, 4)))
+    assert index.get()["ids"] == ["a", "b", "c", "d"]
+    assert [segment.name for segment in index.generation.segments] == ["legacy", "00000001"]
+
+    # Merging the original matrix away removes its files
+    index.add(["E", "F"], [{}, {}], ["e", "f"], embeddings=np.ones((2, 4)))
+    assert not (tmp_path / "meta.json").exists() and not (tmp_path / "vectors.npy").exists()
+    assert _random_index(tmp_path).get()["documents"] == ["A", "B", "C", "D", "E", "F"]
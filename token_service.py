@@ -0,0 +1,116 @@
+"""
+LiveKit access token minting for the API Gateway
+Signs room-join tokens from a prebuilt claims template instead of going through
+the AccessToken builder on every request, and caches tokens briefly so client
+reconnects reuse them
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import jwt
+
+# Default token lifetime (matches livekit.api.AccessToken)
+DEFAULT_TOKEN_TTL = timedelta(hours=6)
+
+# Placeholders used to build the claims template once
+_TEMPLATE_IDENTITY = "__identity__"
+_TEMPLATE_ROOM = "__room__"
+
+
+class TokenMinter:
+    """
+    Mints LiveKit room-join JWTs for voice sessions
+
+    The claims layout is taken once from a token built with livekit.api, so the
+    output matches what AccessToken would produce; per request only identity,
+    name, room and validity are filled in before HS256 signing. Issued tokens
+    are cached per (identity, room) and reused for `reuse_window` seconds.
+    """
+
+    def __init__(self, api_key: str, api_secret: str,
+                 ttl: timedelta = DEFAULT_TOKEN_TTL,
+                 reuse_window: float = 300.0,
+                 cache_size: int = 10000):
+        """
+        Args:
+            api_key: LiveKit API key (token issuer)
+            api_secret: LiveKit API secret (HS256 signing key)
+            ttl: Token lifetime
+            reuse_window: Seconds a minted token is served from the cache for reconnects
+            cache_size: Maximum number of cached tokens
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.ttl = ttl
+        self.reuse_window = reuse_window
+        self.cache_size = cache_size
+        self.minted = 0
+        self.cache_hits = 0
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._template = self._build_template()
+
+    def _build_template(self) -> Dict[str, Any]:
+        """Decode one AccessToken-built JWT to capture the exact claims layout"""
+        from livekit import api
+
+        token = api.AccessToken(self.api_key, self.api_secret)
+        token.with_identity(_TEMPLATE_IDENTITY)
+        token.with_name(_TEMPLATE_IDENTITY)
+        token.with_ttl(self.ttl)
+        token.with_grants(api.VideoGrants(
+            room_join=True,
+            room=_TEMPLATE_ROOM,
+            can_publish=True,
+            can_subscribe=True,
+            can_publish_data=True
+        ))
+        claims = jwt.decode(token.to_jwt(), options={"verify_signature": False})
+        for key in ("nbf", "exp", "iat"):
+            claims.pop(key, None)
+        return claims
+
+    def mint(self, identity: str, room: str, name: Optional[str] = None) -> str:
+        """Sign a new room-join token"""
+        claims = copy.deepcopy(self._template)
+        for key, value in claims.items():
+            if value == _TEMPLATE_IDENTITY:
+                claims[key] = identity
+        claims["name"] = name or identity
+        claims["video"]["room"] = room
+
+        now = int(time.time())
+        claims["nbf"] = now
+        claims["exp"] = now + int(self.ttl.total_seconds())
+        token = jwt.encode(claims, self.api_secret, algorithm="HS256")
+        self.minted += 1
+        return token
+
+    def get_token(self, identity: str, room: str, name: Optional[str] = None) -> str:
+        """Return a cached token for (identity, room) if recently minted, else mint one"""
+        key = (identity, room)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and now - cached[0] < self.reuse_window:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached[1]
+
+        token = self.mint(identity, room, name=name)
+        with self._lock:
+            self._cache[key] = (now, token)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return token
+
+    def invalidate(self, identity: str, room: str):
+        """Drop a cached token (e.g. when its session ends)"""
+        with self._lock:
+            self._cache.pop((identity, room), None)
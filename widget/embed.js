@@ -255,9 +255,11 @@
             // Create new session
             const response = await fetch(`${config.apiEndpoint}/api/sessions/create`, {
                 method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
+                headers: Object.assign(
+                    { 'Content-Type': 'application/json' },
+                    // Scopes the session to this site's knowledge base
+                    config.apiKey ? { 'X-API-Key': config.apiKey } : {}
+                ),
                 body: JSON.stringify({
                     metadata: {
                         source: 'widget',